@@ -0,0 +1,117 @@
+'''
+Throwaway Postgres Cluster
+===========================
+Creates a Postgres cluster in a temporary directory with `initdb`, starts
+it on a free port (listening only on a Unix socket) and deletes it
+afterwards, so benchmarks don't depend on a preconfigured database.
+
+ >>> with TemporaryCluster() as cluster:
+ ...     conn = cluster.connect()
+
+.. note:: Postgres refuses to run as root, so run the benchmarks as
+   a regular user.
+'''
+
+import psycopg2
+
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+
+def find_bin_dir(bin_dir=None):
+    ''' Locate the directory containing initdb and pg_ctl '''
+    if bin_dir:
+        return bin_dir
+
+    initdb = shutil.which('initdb')
+    if initdb:
+        return os.path.dirname(initdb)
+
+    try:
+        return subprocess.check_output(['pg_config', '--bindir'],
+            universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        raise FileNotFoundError('Could not find initdb. Add the Postgres '
+            'bin directory to PATH or pass in bin_dir.')
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+class TemporaryCluster(object):
+    '''
+    Args:
+        bin_dir:    str (default: None)
+                    Directory containing initdb and pg_ctl
+        settings:   dict (default: None)
+                    Extra server settings, e.g. {'fsync': 'off'}
+    '''
+
+    def __init__(self, bin_dir=None, settings=None):
+        self.bin_dir = find_bin_dir(bin_dir)
+        self.settings = settings or {}
+        self.dir = None
+        self.port = None
+        self.running = False
+
+    @property
+    def data_dir(self):
+        return os.path.join(self.dir, 'data')
+
+    @property
+    def conninfo(self):
+        ''' Keyword arguments for psycopg2.connect() '''
+        return dict(host=self.dir, port=self.port, user='postgres',
+            dbname='postgres')
+
+    def _run(self, program, *args):
+        subprocess.run([os.path.join(self.bin_dir, program)] + list(args),
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def start(self):
+        self.dir = tempfile.mkdtemp(prefix='pgreaper_bench_')
+        self.port = _free_port()
+
+        self._run('initdb', '-D', self.data_dir, '-U', 'postgres',
+            '-A', 'trust', '-E', 'UTF8', '--no-sync')
+
+        options = ["-k '{}'".format(self.dir), '-p {}'.format(self.port),
+            "-c listen_addresses=''"] + \
+            ['-c {}={}'.format(k, v) for k, v in self.settings.items()]
+
+        self._run('pg_ctl', '-D', self.data_dir, '-w', '-l',
+            os.path.join(self.dir, 'log'), '-o', ' '.join(options), 'start')
+        self.running = True
+
+    def stop(self):
+        try:
+            if self.running:
+                self._run('pg_ctl', '-D', self.data_dir, '-w', '-m', 'fast',
+                    'stop')
+                self.running = False
+        finally:
+            if self.dir:
+                shutil.rmtree(self.dir, ignore_errors=True)
+                self.dir = None
+
+    def connect(self, **kwargs):
+        return psycopg2.connect(**dict(self.conninfo, **kwargs))
+
+    def __enter__(self):
+        try:
+            self.start()
+        except subprocess.CalledProcessError as e:
+            self.stop()
+            raise RuntimeError('Could not start Postgres: {}'.format(
+                e.stderr.decode(errors='replace').strip()))
+        except:
+            self.stop()
+            raise
+
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
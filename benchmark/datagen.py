@@ -0,0 +1,93 @@
+'''
+Synthetic Data Generators
+==========================
+Deterministic (seeded) data for the ingest benchmarks, so results from
+different runs and machines can be compared.
+
+ * The first column is always an integer primary key named `id`
+ * The remaining columns cycle through `types`
+'''
+
+from pgreaper import Table
+from pgreaper.core.serialize import to_csv
+
+import datetime
+import json
+import random
+import string
+
+# timestamp isn't included because upserting into a timestamp column
+# currently fails (Postgres reports it as 'timestamp without time zone')
+DEFAULT_TYPES = ['bigint', 'double precision', 'text', 'boolean', 'jsonb']
+
+EPOCH = datetime.datetime(2017, 1, 1)
+LETTERS = string.ascii_letters + ' ,'
+
+def _text(rng):
+    # Includes commas so some CSV fields have to be quoted
+    return ''.join(rng.choice(LETTERS) for _ in range(rng.randint(5, 30)))
+
+GENERATORS = {
+    'bigint': lambda rng: rng.randint(-2 ** 40, 2 ** 40),
+    'integer': lambda rng: rng.randint(-2 ** 30, 2 ** 30),
+    'double precision': lambda rng: rng.uniform(-1e6, 1e6),
+    'text': _text,
+    'boolean': lambda rng: rng.random() > 0.5,
+    'jsonb': lambda rng: {'key': _text(rng), 'value': rng.randint(0, 1000),
+        'tags': [_text(rng) for _ in range(rng.randint(0, 3))]},
+    'timestamp': lambda rng: EPOCH + datetime.timedelta(
+        seconds=rng.randint(0, 10 ** 8)),
+}
+
+def make_columns(width, types=DEFAULT_TYPES):
+    ''' Return (column names, column types) for a table with width columns '''
+    unknown = set(types) - set(GENERATORS)
+    if unknown:
+        raise ValueError('No generator for types: {}. Valid types are '
+            '{}.'.format(', '.join(unknown), ', '.join(sorted(GENERATORS))))
+
+    col_types = ['bigint'] + [types[i % len(types)] for i in range(width - 1)]
+    col_names = ['id'] + ['col{}'.format(i) for i in range(1, width)]
+    return col_names, col_types
+
+def make_rows(n_rows, col_types, seed=0):
+    ''' Return a list of n_rows rows with unique ids '''
+    rng = random.Random(seed)
+    generators = [GENERATORS[i] for i in col_types[1:]]
+    return [[i] + [gen(rng) for gen in generators] for i in range(n_rows)]
+
+def make_table(name, n_rows, width, types=DEFAULT_TYPES, seed=0):
+    col_names, col_types = make_columns(width, types)
+    return Table(name, col_names=col_names, col_types=col_types,
+        row_values=make_rows(n_rows, col_types, seed), p_key=0)
+
+def make_df(table):
+    ''' Return a Table as a pandas DataFrame (jsonb columns as str) '''
+    import pandas
+
+    jsonb = [i for i, j in enumerate(table.col_types) if j == 'jsonb']
+    rows = [[json.dumps(v) if i in jsonb else v for i, v in enumerate(row)] \
+        for row in table]
+    return pandas.DataFrame(rows, columns=table.col_names)
+
+def write_csv(table, file):
+    ''' Write a Table to a CSV file with a header, returning its size '''
+    data = ','.join(table.col_names) + '\n' + to_csv(table, table.col_types)
+
+    with open(file, mode='w', encoding='utf-8', newline='') as outfile:
+        outfile.write(data)
+
+    return len(data.encode('utf-8'))
+
+def write_ndjson(table, file):
+    ''' Write a Table as newline-delimited JSON, returning its size '''
+    size = 0
+
+    with open(file, mode='w', encoding='utf-8', newline='\n') as outfile:
+        for row in table:
+            line = json.dumps(dict(zip(table.col_names, row)),
+                default=str) + '\n'
+            outfile.write(line)
+            size += len(line.encode('utf-8'))
+
+    return size
@@ -0,0 +1,316 @@
+'''
+Ingest Throughput Benchmarks
+=============================
+Measures rows/sec, MB/sec and peak RSS of PGReaper's loaders and
+`read_pg()` on synthetic data (see datagen.py).
+
+ * By default, a throwaway cluster is created with `initdb` (see
+   cluster.py). Use --dsn to benchmark against an existing server instead.
+ * Every run happens in a fresh process, so peak RSS isn't affected
+   by earlier runs. Only the loading itself is timed.
+ * MB/sec is relative to the size of the data as CSV (newline-delimited
+   JSON for copy_json)
+ * Results can be saved as JSON with --output and compared against
+   a previous run with --compare
+
+Example:
+    python benchmark/ingest_benchmark.py --rows 100000 --width 10 \\
+        --output results.json
+    python benchmark/ingest_benchmark.py --compare results.json
+'''
+
+from datagen import DEFAULT_TYPES, make_df, make_table, write_csv, \
+    write_ndjson
+from cluster import TemporaryCluster
+
+import pgreaper
+from pgreaper import copy_csv, copy_json, copy_table, read_pg
+from pgreaper._globals import import_package
+
+from collections import OrderedDict
+from contextlib import ExitStack
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import psycopg2
+import resource
+import sys
+import tempfile
+import time
+import traceback
+
+BENCH_DB = 'pgreaper_bench'
+
+# name --> (input, setup function, timed function)
+CASES = OrderedDict()
+
+def case(name, input='table', setup=None):
+    '''
+    Register a benchmark
+     * input is one of 'table', 'df', 'csv', 'json' or None
+     * setup(connect, data, config) is called before timing starts
+    '''
+    def decorator(func):
+        CASES[name] = (input, setup, func)
+        return func
+    return decorator
+
+def _make_table(config):
+    return make_table('bench', config['rows'], config['width'],
+        config['types'], config['seed'])
+
+def _reset(name, load=False):
+    '''
+    Return a setup function which drops a table, and optionally 
+    reloads it with the benchmark data
+    '''
+    def setup(connect, data, config):
+        conn = connect()
+        conn.cursor().execute('DROP TABLE IF EXISTS {}'.format(name))
+        conn.commit()
+
+        if load:
+            copy_table(_make_table(config), name=name, conn=conn)
+        else:
+            conn.close()
+    return setup
+
+@case('copy_table', setup=_reset('bench_copy_table'))
+def bench_copy_table(connect, data, config):
+    copy_table(data, name='bench_copy_table', conn=connect())
+
+@case('upsert', setup=_reset('bench_upsert', load=True))
+def bench_upsert(connect, data, config):
+    copy_table(data, name='bench_upsert', conn=connect(),
+        on_p_key='replace')
+
+@case('copy_csv', input='csv', setup=_reset('bench_copy_csv'))
+def bench_copy_csv(connect, data, config):
+    copy_csv(data, name='bench_copy_csv', verbose=False, conn=connect())
+
+@case('copy_json', input='json', setup=_reset('bench_copy_json'))
+def bench_copy_json(connect, data, config):
+    copy_json(data, name='bench_copy_json', conn=connect())
+
+@case('copy_df', input='df', setup=_reset('bench_copy_df'))
+def bench_copy_df(connect, data, config):
+    pgreaper.copy_df(data, name='bench_copy_df', p_key='id', conn=connect())
+
+@case('read_pg', input=None, setup=_reset('bench_read', load=True))
+def bench_read_pg(connect, data, config):
+    read_pg('SELECT * FROM bench_read', conn=connect())
+
+@case('read_pg_copy', input=None, setup=_reset('bench_read', load=True))
+def bench_read_pg_copy(connect, data, config):
+    read_pg('SELECT * FROM bench_read', conn=connect(), method='copy')
+
+def _peak_rss():
+    ''' Peak resident set size of this process in MB '''
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Bytes on macOS, kilobytes everywhere else
+    if sys.platform == 'darwin':
+        return peak / 2 ** 20
+    return peak / 2 ** 10
+
+def _measure(name, config, conninfo, files, results):
+    ''' Run one benchmark in a child process, putting its result in results '''
+
+    try:
+        input, setup, func = CASES[name]
+        connect = lambda: psycopg2.connect(**conninfo)
+
+        if input in ('table', 'df'):
+            data = _make_table(config)
+            if input == 'df':
+                data = make_df(data)
+        else:
+            data = files.get(input)
+
+        if setup:
+            setup(connect, data, config)
+
+        rss_before = _peak_rss()
+        start = time.perf_counter()
+        func(connect, data, config)
+        seconds = time.perf_counter() - start
+
+        results.put({'seconds': seconds, 'rss_before_mb': rss_before,
+            'peak_rss_mb': _peak_rss()})
+    except BaseException as e:
+        results.put({'error': '{}: {}'.format(type(e).__name__,
+            str(e).split('\n')[0]), 'traceback': traceback.format_exc()})
+
+def run_case(name, config, conninfo, files):
+    ''' Run one benchmark config['repeat'] times and summarize the results '''
+    context = multiprocessing.get_context('spawn')
+    runs = []
+
+    for _ in range(config['repeat']):
+        results = context.Queue()
+        process = context.Process(target=_measure,
+            args=(name, config, conninfo, files, results))
+        process.start()
+        result = results.get()
+        process.join()
+
+        if 'error' in result:
+            return result
+
+        runs.append(result)
+
+    best = min(run['seconds'] for run in runs)
+    size = files['json_size'] if CASES[name][0] == 'json' \
+        else files['csv_size']
+
+    return {
+        'seconds': best,
+        'rows_per_sec': config['rows'] / best,
+        'mb_per_sec': size / 1e6 / best,
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+        'rss_delta_mb': max(run['peak_rss_mb'] - run['rss_before_mb'] \
+            for run in runs),
+        'runs': [run['seconds'] for run in runs]
+    }
+
+def _server_version(conninfo):
+    conn = psycopg2.connect(**conninfo)
+    try:
+        cur = conn.cursor()
+        cur.execute('SHOW server_version')
+        return cur.fetchone()[0]
+    finally:
+        conn.close()
+
+def benchmark(config, conninfo, cases):
+    ''' Run the benchmarks in cases, returning a JSON-serializable dict '''
+
+    with tempfile.TemporaryDirectory() as dir:
+        table = _make_table(config)
+        files = {
+            'csv': os.path.join(dir, 'bench.csv'),
+            'json': os.path.join(dir, 'bench.json')
+        }
+        files['csv_size'] = write_csv(table, files['csv'])
+        files['json_size'] = write_ndjson(table, files['json'])
+        del table
+
+        results = OrderedDict()
+        for name in cases:
+            if CASES[name][0] == 'df' and not import_package('pandas'):
+                results[name] = {'skipped': 'pandas is not installed'}
+                continue
+
+            print('Running {}...'.format(name), file=sys.stderr)
+            results[name] = run_case(name, config, conninfo, files)
+
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'postgres': _server_version(conninfo),
+            'csv_mb': files['csv_size'] / 1e6,
+            'config': config
+        },
+        'results': results
+    }
+
+def report(output, baseline=None, threshold=0.1):
+    '''
+    Print a results table, and compare rows/sec against a baseline
+     * Returns False if any benchmark is slower than the baseline by
+       more than threshold (as a fraction)
+    '''
+
+    ok = True
+    if baseline and baseline['meta']['config'] != output['meta']['config']:
+        print('Warning: The baseline was run with different settings: '
+            '{}'.format(baseline['meta']['config']), file=sys.stderr)
+
+    print('{:<14} {:>10} {:>14} {:>10} {:>12}{}'.format('Benchmark',
+        'Seconds', 'Rows/sec', 'MB/sec', 'Peak RSS MB',
+        ' vs. baseline' if baseline else ''))
+
+    for name, result in output['results'].items():
+        if 'seconds' not in result:
+            reason = result.get('skipped') or result['error']
+            print('{:<14} {}'.format(name, reason))
+            continue
+
+        line = '{:<14} {:>10.3f} {:>14,.0f} {:>10.1f} {:>12.1f}'.format(name,
+            result['seconds'], result['rows_per_sec'], result['mb_per_sec'],
+            result['peak_rss_mb'])
+
+        old = (baseline or {}).get('results', {}).get(name, {})
+        if 'rows_per_sec' in old:
+            change = result['rows_per_sec'] / old['rows_per_sec'] - 1
+            line += ' {:>+12.1%}'.format(change)
+
+            if change < -threshold:
+                line += ' REGRESSION'
+                ok = False
+
+        print(line)
+
+    return ok
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='PGReaper ingest benchmarks')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--width', type=int, default=10,
+        help='Number of columns')
+    parser.add_argument('--types', nargs='+', default=DEFAULT_TYPES,
+        help='Column types to cycle through')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3,
+        help='Runs per benchmark (the fastest is reported)')
+    parser.add_argument('--cases', nargs='+', choices=list(CASES),
+        default=list(CASES))
+    parser.add_argument('--dsn', help='Use an existing server instead of '
+        'creating a cluster, e.g. "host=localhost dbname=postgres"')
+    parser.add_argument('--pg-bin', help='Directory containing initdb')
+    parser.add_argument('--output', help='Save results to this JSON file')
+    parser.add_argument('--compare', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+        help='Slowdown (as a fraction) reported as a regression')
+    args = parser.parse_args(argv)
+
+    config = {k: getattr(args, k) for k in
+        ('rows', 'width', 'types', 'seed', 'repeat')}
+
+    with ExitStack() as stack:
+        if args.dsn:
+            conninfo = psycopg2.extensions.parse_dsn(args.dsn)
+        else:
+            conninfo = stack.enter_context(
+                TemporaryCluster(bin_dir=args.pg_bin)).conninfo
+
+        # Run everything in a separate database
+        conn = psycopg2.connect(**conninfo)
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute('DROP DATABASE IF EXISTS {}'.format(BENCH_DB))
+        cur.execute('CREATE DATABASE {}'.format(BENCH_DB))
+
+        output = benchmark(config, dict(conninfo, dbname=BENCH_DB),
+            args.cases)
+        cur.execute('DROP DATABASE {}'.format(BENCH_DB))
+        conn.close()
+
+    if args.output:
+        with open(args.output, mode='w') as outfile:
+            json.dump(output, outfile, indent=4)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as infile:
+            baseline = json.load(infile)
+
+    return 0 if report(output, baseline, args.threshold) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
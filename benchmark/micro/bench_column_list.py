@@ -0,0 +1,23 @@
+''' Benchmarks for ColumnList '''
+
+from pgreaper.core import ColumnList
+
+import pytest
+
+@pytest.fixture(params=[10, 100, 1000], ids=lambda n: '{}cols'.format(n))
+def columns(request):
+    # Mixed case names with spaces, punctuation and duplicates
+    return ColumnList(
+        col_names=['Column #{}'.format(i % (request.param // 2 + 1)) \
+            for i in range(request.param)],
+        col_types=['text'] * request.param)
+
+def test_sanitize(benchmark, columns):
+    benchmark(columns.sanitize)
+
+def test_sanitized(benchmark, columns):
+    benchmark(lambda: columns.sanitized)
+
+def test_compare(benchmark, columns):
+    other = columns.sanitized
+    benchmark(lambda: (columns == other, columns / other, columns - other))
@@ -0,0 +1,17 @@
+''' Benchmarks for the HTML table parser '''
+
+from pgreaper.html.parser import get_tables_from_string, html_to_tree, \
+    tree_to_table
+
+def test_get_tables(benchmark, html):
+    benchmark(get_tables_from_string, html)
+
+def test_get_tables_stream(benchmark, html):
+    benchmark(get_tables_from_string, html, stream=True)
+
+def test_html_to_tree(benchmark, html):
+    benchmark(html_to_tree, html)
+
+def test_tree_to_table(benchmark, html):
+    tree = html_to_tree(html)
+    benchmark(tree_to_table, tree)
@@ -0,0 +1,35 @@
+''' Benchmarks for Table methods '''
+
+from pgreaper import Table
+
+def test_append(benchmark, table, rows):
+    def append():
+        new_table = Table('bench', col_names=table.col_names)
+        for row in rows:
+            new_table.append(row)
+
+    benchmark(append)
+
+def test_copy(benchmark, table):
+    benchmark(table.copy)
+
+def test_guess_type(benchmark, table):
+    benchmark(table.guess_type)
+
+def test_reorder(benchmark, table):
+    benchmark(table.reorder, *reversed(table.col_names))
+
+def test_groupby(benchmark, table):
+    # A boolean column, so there are two groups
+    benchmark(table.groupby, 'col2')
+
+def test_add_dicts(benchmark, table, dicts):
+    benchmark(lambda: Table('bench').add_dicts(dicts))
+
+def test_to_string(benchmark, table):
+    benchmark(table.to_string)
+
+def test_to_string_jsonb(benchmark, n_rows):
+    table = Table('bench', col_names=['id', 'data'], row_values=[
+        [i, {'id': i, 'tags': ['a', 'b']}] for i in range(n_rows)])
+    benchmark(table.to_string)
@@ -0,0 +1,51 @@
+'''
+Micro-Benchmark Fixtures
+=========================
+Inputs for the in-process benchmarks, at several sizes. Every fixture
+is deterministic so results can be compared between runs.
+
+ * Set PGREAPER_BENCH_SIZES (e.g. "1000,100000") to change the sizes
+'''
+
+import os
+import sys
+import pytest
+
+# Share the data generators with the ingest benchmarks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datagen import make_table
+
+SIZES = [int(i) for i in
+    os.environ.get('PGREAPER_BENCH_SIZES', '1000,10000').split(',')]
+
+# Column types of the synthetic tables (no jsonb, so groupby keys are hashable)
+TYPES = ['text', 'double precision', 'boolean', 'bigint']
+WIDTH = 10
+
+@pytest.fixture(params=SIZES, ids=lambda n: '{}rows'.format(n))
+def n_rows(request):
+    return request.param
+
+@pytest.fixture
+def table(n_rows):
+    return make_table('bench', n_rows, WIDTH, TYPES)
+
+@pytest.fixture
+def rows(table):
+    return [list(row) for row in table]
+
+@pytest.fixture
+def dicts(table):
+    return [dict(zip(table.col_names, row)) for row in table]
+
+@pytest.fixture
+def html(n_rows):
+    ''' A HTML document with one n_rows x 5 table '''
+    body = ''.join('<tr>{}</tr>'.format(''.join(
+        '<td>{}</td>'.format(i * j) for j in range(5))) for i in range(n_rows))
+    header = '<tr>{}</tr>'.format(''.join(
+        '<th>Column {}</th>'.format(j) for j in range(5)))
+
+    return '<html><body><p>Intro</p><table>{}{}</table></body></html>'.format(
+        header, body)
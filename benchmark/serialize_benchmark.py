@@ -0,0 +1,46 @@
+# Compares Table.to_string()'s Cython serializer against the old
+# csv.writer based implementation (no database required)
+from pgreaper import Table
+from pgreaper.core.serialize import to_csv
+
+from io import StringIO
+import csv
+import datetime
+import json
+import timeit
+
+N_ROWS = 200000
+
+def make_table():
+    now = datetime.datetime(2017, 6, 1, 12, 30)
+    return Table('benchmark',
+        col_names=['id', 'name', 'score', 'joined', 'data'],
+        col_types=['bigint', 'text', 'double precision', 'timestamp', 'jsonb'],
+        row_values=[[i, 'Name, number {}'.format(i), i / 7, now,
+            {'id': i, 'tags': ['a', 'b']}] for i in range(N_ROWS)])
+
+def old_to_string(table):
+    ''' The csv.writer implementation to_string() used to have '''
+    string = StringIO()
+    writer = csv.writer(string, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+    dict_encoder = json.JSONEncoder()
+    jsonb_cols = set([i for i, j in enumerate(table.col_types) if j == 'jsonb'])
+
+    for row in table:
+        # Copy so the table can be reused between runs
+        row = list(row)
+        for i in jsonb_cols:
+            row[i] = dict_encoder.encode(row[i])
+        writer.writerow(row)
+
+    string.seek(0)
+    return string
+
+table = make_table()
+
+print("Table Serialization Test ({} rows)".format(N_ROWS))
+for name, func in [('csv.writer', lambda: old_to_string(table)),
+                   ('to_csv', lambda: to_csv(table, table.col_types))]:
+    best = min(timeit.repeat(func, repeat=3, number=1))
+    print("{:<12} {:>8.3f} s {:>12,.0f} rows/sec".format(
+        name, best, N_ROWS / best))
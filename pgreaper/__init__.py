@@ -1,6 +1,7 @@
 # Public API
 from ._globals import PGREAPER_PATH
 from .config import settings, PG_DEFAULTS
+from .instrument import add_hook, remove_hook, LoadReport
 from .sqlite import *
 
 # Main Functions
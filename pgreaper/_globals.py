@@ -49,32 +49,30 @@ class ReusableContextManager(object):
             self.close()
             
 ''' Name cleaners '''
+'''
+Replacements for characters which can't appear in table and column names
+Ref: https://www.postgresql.org/docs/current/static/sql-syntax-lexical.html#SQL-SYNTAX-IDENTIFIERS
+'''
+NAME_TRANSLATION = str.maketrans(dict(
+    [(char, '_') for char in '/\\().,-:;$@~|`?!=+#<>*^[]'] +
+    [('%', 'percent'), ('&', 'and'), ("'", ''), ('\t', '')]))
+
+_LEADING_TRAILING_SPACES = re.compile('^ *| *$')
+_TRAILING_UNDERSCORES = re.compile('_*$')
+
+@functools.lru_cache(maxsize=4096)
 def strip(string):
-    ''' Removes or fixes no-nos from potential table and column names '''
-    
     '''
-    Replace bad characters
-    Ref: https://www.postgresql.org/docs/current/static/sql-syntax-lexical.html#SQL-SYNTAX-IDENTIFIERS
+    Removes or fixes no-nos from potential table and column names
+     * Results are cached, since the same names (e.g. JSON keys) tend to
+       be sanitized over and over again
     '''
     
-    offending_characters = set(
-        ['/', '\\', '(', ')', '.', ',', '-', ':', ';', '$',
-         '$', '@', '~', '|', '`', '?', '!',
-         '=', '+', '-', '#', '<', '>', '*', '^',
-         '[', ']'])
-    new_str = ""
-    
-    for char in string:
-        if char not in offending_characters:
-            new_str += char
-        else:
-            new_str += '_'
-    
-    # Replace bad characters with sensible replacements
-    new_str = new_str.replace('%', 'percent').replace('&', 'and').replace("'", '').replace('\t', '')
+    # Replace bad characters with underscores or sensible replacements
+    new_str = string.translate(NAME_TRANSLATION)
     
     # Remove leading and trailing whitespace
-    new_str = re.sub('^(?=) *|(?=) *$', repl='', string=new_str)
+    new_str = _LEADING_TRAILING_SPACES.sub('', new_str)
     
     # Replace whitespace with underscore
     new_str = new_str.replace(' ', '_')
@@ -84,12 +82,11 @@ def strip(string):
         new_str = "_" + new_str
         
     # Replace multiple underscores with just one
-    new_str = re.sub('_{2,}|_', repl='_', string=new_str)
+    while '__' in new_str:
+        new_str = new_str.replace('__', '_')
     
     # Remove trailing underscores
-    new_str = re.sub('_*$', repl='', string=new_str)
-
-    return new_str
+    return _TRAILING_UNDERSCORES.sub('', new_str)
     
 def preprocess(func):
     ''' Provides a default table name if needed '''
@@ -126,24 +123,26 @@ def resolve_duplicate(headers):
      * headers: A row of column headers
     '''
     
-    def rename_column(name, n=0):
-        '''
-        A recursive function which deals with the hopefully unlikely
-        possibility of 2 or more columns with the same name
-        '''
-        
+    headers_set = set()
+    
+    # Maps names to the next number to try attaching to them
+    next_num = {}
+    new_headers = []
+    
+    for name in headers:
         new_name = name
+        n = next_num.get(name, 0)
         
         # Attach a number next to duplicate column names
         if n > 0:
             new_name = "{name}_{num}".format(name=name, num=n)
         
-        if new_name in headers_set:
-            return rename_column(name, n=n+1)
-        else:
-            headers_set.add(new_name)
-            return new_name
-    
-    headers_set = set()
-    
-    return [rename_column(i) for i in headers]
\ No newline at end of file
+        while new_name in headers_set:
+            n += 1
+            new_name = "{name}_{num}".format(name=name, num=n)
+            
+        headers_set.add(new_name)
+        next_num[name] = n + 1
+        new_headers.append(new_name)
+        
+    return new_headers
\ No newline at end of file
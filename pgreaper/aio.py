@@ -0,0 +1,393 @@
+'''
+.. currentmodule:: pgreaper.aio
+
+Asynchronous Loaders
+---------------------
+The functions in this module are coroutine versions of PGReaper's main
+loaders. COPY data is streamed to and from Postgres without blocking the
+event loop or tying up a thread per load.
+
+Connections are made through one of the asynchronous drivers in 
+`pgreaper.postgres.async_drivers`:
+ * `psycopg <http://www.psycopg.org/psycopg3/>`_ (version 3, default)
+ * `asyncpg <https://github.com/MagicStack/asyncpg>`_
+
+**Basic Usage:**
+ >>> import asyncio
+ >>> from pgreaper import aio
+ >>> async def main():
+ ...     await aio.copy_json('tweets.json', name='tweets', dbname='twitter')
+ ...     return await aio.read_pg('SELECT * FROM tweets', dbname='twitter')
+ >>> asyncio.run(main())
+
+Connections are handled the same way as in the synchronous API: either
+pass in a `psycopg.AsyncConnection` or `asyncpg.Connection` through `conn`,
+or specify one or more of `dbname, user, password, host` (and optionally
+`driver='asyncpg'`) and the rest are filled in from the default settings.
+
+.. autofunction:: copy_table
+.. autofunction:: copy_csv
+.. autofunction:: copy_json
+.. autofunction:: read_pg
+'''
+
+from pgreaper._globals import preprocess
+from pgreaper.config import PG_DEFAULTS
+from pgreaper.core import assert_table, ColumnList, Table
+from pgreaper.io import JSONStreamingDecoder, zip
+from pgreaper.postgres.database import add_column, create_table, \
+    _create_table, _is_cursor_query, _CURSOR_IDS, SQL_DIR
+from pgreaper.postgres.async_drivers import DEFAULT_ASYNC_DRIVER, \
+    get_async_driver
+from pgreaper.postgres.drivers import COPY_BUFFER
+from pgreaper.postgres.json_loader import _is_ndjson
+from pgreaper.postgres.loader import COPY_BATCH_SIZE
+
+from inspect import signature
+import asyncio
+import functools
+import itertools
+import os
+
+async def connect(driver=DEFAULT_ASYNC_DRIVER, **kwargs):
+    '''
+    Create a new connection with an asynchronous driver, using the
+    default settings for any of `dbname, user, password, host` not specified
+    '''
+
+    return await get_async_driver(name=driver).connect(**PG_DEFAULTS(**kwargs))
+
+def postgres_connect(func):
+    '''
+    Makes sure the local variable `conn` in all coroutines this decorates
+    is a connection supported by an asynchronous driver
+    '''
+
+    # Keyword arguments which indicate user wants to connect to a Postgres database
+    pg_conn_args = set(['dbname', 'user', 'password', 'host'])
+
+    @functools.wraps(func)
+    async def inner(*args, **kwargs):
+        f_args = signature(func).bind(*args, **kwargs)
+        f_args.apply_defaults()
+
+        if get_async_driver(f_args.arguments['conn']):
+            return await func(*args, **kwargs)
+        elif set(kwargs.keys()).intersection(pg_conn_args):
+            return await func(conn=await connect(**kwargs), *args, **kwargs)
+        else:
+            raise ValueError("Must either pass in a psycopg AsyncConnection"
+            " or asyncpg Connection object, or describe one or more of "
+            "'dbname', 'host', 'user', 'password'.")
+
+    return inner
+
+####################
+# Helper Functions #
+####################
+
+async def _executor_blocks(read):
+    '''
+    Call read() in the default executor until it returns an empty block,
+    yielding each block, so reading a file doesn't block the event loop
+    '''
+
+    loop = asyncio.get_running_loop()
+
+    while True:
+        block = await loop.run_in_executor(None, read)
+        if not block:
+            break
+
+        yield block
+
+async def get_table_schema(name, conn):
+    ''' Return a table's schema as a ColumnList (empty if table DNE) '''
+
+    rows = await get_async_driver(conn).get_columns(conn, name)
+    return ColumnList(
+        col_names=[i[0] for i in rows],
+        col_types=[i[1] for i in rows])
+
+##############
+# Coroutines #
+##############
+
+@assert_table(dialect='postgres')
+@postgres_connect
+async def copy_table(table, name=None, null_values=None, conn=None,
+    commit=True, on_p_key='nothing', append=False, expand_sql=False,
+    **kwargs):
+    '''
+    Load a Table into a PostgreSQL database
+
+     * New tables, and existing tables without a primary key (or if
+       `append=True`), are loaded with `COPY FROM`
+     * Otherwise, the Table is copied into a temporary table and merged
+       with `INSERT... ON CONFLICT`
+     * Columns are matched by name, so input columns can be in any order
+       and columns missing from the input are filled with their defaults
+
+    Args:
+        table:          Table
+                        The Table to be loaded
+        null_values:    str (default: None)
+                        String representing null values
+        conn:           psycopg.AsyncConnection or asyncpg.Connection
+        commit:         bool (default: True)
+                        Commit transaction and close connection once finished
+        on_p_key:       'nothing', 'replace' or list[str] (default: 'nothing')
+                        What to do if a record conflicts with primary key
+                        constraint (see `pgreaper.copy_table()`)
+        append:         bool (default: False)
+                        Always use `COPY` even if the destination table has
+                        a primary key
+        expand_sql:     bool (default: False)
+                        Add new columns to SQL table if necessary
+    '''
+
+    driver = get_async_driver(conn)
+
+    if not name:
+        name = table.name
+    else:
+        table.name = name
+
+    table.guess_type()
+    table_cols = table.columns.sanitized
+
+    schema = await get_table_schema(name, conn)
+    p_key = await driver.get_pkey(conn, name)
+
+    if not schema:
+        await driver.execute(conn, create_table(table))
+    elif table_cols - schema:
+        if not expand_sql:
+            raise ValueError("The input table has columns that the SQL table "
+            "does not. If you would like to add the extra columns, please set "
+            "'expand_sql=True'.")
+
+        for col_name, col_type in (table_cols - schema).as_tuples():
+            await driver.execute(conn, add_column(name, col_name, col_type))
+
+    col_names = ', '.join(table_cols.col_names)
+
+    # Serializing a large Table would block the event loop
+    data = await asyncio.get_running_loop().run_in_executor(None,
+        table.to_string)
+
+    if null_values:
+        copy_opts = "(FORMAT csv, DELIMITER ',', NULL '{}')".format(null_values)
+    else:
+        copy_opts = "(FORMAT csv, DELIMITER ',')"
+
+    if (not schema) or (not p_key) or append:
+        await driver.copy_in(conn, 'COPY {0} ({1}) FROM STDIN {2}'.format(
+            name, col_names, copy_opts), data)
+    else:
+        # COPY into a temporary table, then UPSERT from it
+        temp = 'pgreaper_upsert_{}'.format(next(_CURSOR_IDS))
+        await driver.execute(conn, 'CREATE TEMP TABLE {0} (LIKE {1})'.format(
+            temp, name))
+        await driver.copy_in(conn, 'COPY {0} ({1}) FROM STDIN {2}'.format(
+            temp, col_names, copy_opts), data)
+
+        if on_p_key == 'nothing':
+            on_conflict = 'DO NOTHING'
+        else:
+            if on_p_key == 'replace':
+                on_p_key = table_cols.col_names
+            elif not isinstance(on_p_key, list):
+                raise ValueError("'on_p_key' should be 'replace', a list, "
+                    "or None.")
+
+            on_conflict = '({0}) DO UPDATE SET {1}'.format(p_key[0], ', '.join(
+                '{0} = excluded.{0}'.format(i) for i in on_p_key))
+
+        await driver.execute(conn, 'INSERT INTO {0} ({1}) SELECT {1} FROM {2} '
+            'ON CONFLICT {3}'.format(name, col_names, temp, on_conflict))
+        await driver.execute(conn, 'DROP TABLE {}'.format(temp))
+
+    if commit:
+        await driver.commit(conn)
+        await driver.close(conn)
+
+@preprocess
+@postgres_connect
+async def copy_csv(file, name, encoding=None, header=0, subset=[],
+    conn=None, compression=None, skiplines=0, commit=True, **kwargs):
+    '''
+    Upload a CSV file to PostgreSQL. Arguments are the same as
+    `pgreaper.copy_csv()`, except that progress bars and hooks aren't
+    supported.
+
+    Args:
+        commit:     bool (default: True)
+                    Commit transaction and close connection once finished
+
+    .. note:: Cleaning the CSV and inferring its schema is CPU-bound, so
+       that step is run in the default executor. The upload itself is
+       asynchronous.
+    '''
+
+    from csvmorph import to_csv
+
+    driver = get_async_driver(conn)
+
+    if encoding:
+        copy_stmt = ("COPY {0} FROM STDIN (FORMAT csv,"
+                      "HEADER, DELIMITER ','{1})").format(
+            name, ", ENCODING '{}'".format(encoding))
+    else:
+        copy_stmt = ("COPY {0} FROM STDIN (FORMAT csv,"
+                      "HEADER, DELIMITER ',')").format(name)
+
+    # Clean the CSV and calculate statistics
+    csv_meta = await asyncio.get_running_loop().run_in_executor(None,
+        functools.partial(to_csv, filename=file, output=file + '_temp.csv',
+            header=header, compression=compression, columns=subset,
+            skiplines=skiplines))
+    col_names = csv_meta['col_names']
+
+    col_types = []
+    for count in csv_meta['dtypes']:
+        if count['str']:
+            col_types.append('text')
+        elif count['float']:
+            col_types.append('double precision')
+        elif count['int']:
+            col_types.append('bigint')
+        else:
+            col_types.append('text')
+
+    try:
+        with zip.open(file + '_temp.csv', mode='rb') as temp_file:
+            cols = ColumnList(col_names, col_types)
+            await driver.execute(conn, _create_table(
+                name, col_names=cols.sanitize(), col_types=col_types))
+            await driver.copy_in(conn, copy_stmt, temp_file)
+    finally:
+        os.remove(file + '_temp.csv')
+
+    if commit:
+        await driver.commit(conn)
+        await driver.close(conn)
+
+@preprocess
+@postgres_connect
+async def copy_json(file, name, compression=None, flatten=None, conn=None,
+    null_values=None, commit=True, **kwargs):
+    '''
+    Stream a JSON file into Postgres. Arguments are the same as
+    `pgreaper.copy_json()`, except that progress bars and hooks aren't
+    supported.
+
+    Args:
+        null_values:    str (default: None)
+                        JSON objects whose text is equal to this string
+                        (e.g. '{}') are loaded as NULL
+        commit:         bool (default: True)
+                        Commit transaction and close connection once finished
+
+    .. note:: The file is read and decoded in the default executor, a
+       block at a time. The upload itself is asynchronous.
+    '''
+
+    driver = get_async_driver(conn)
+    await driver.execute(conn, "CREATE TABLE IF NOT EXISTS {0} (json_data jsonb)".format(
+        name))
+
+    if null_values:
+        copy_stmt = "COPY {0} FROM STDIN (FORMAT TEXT, NULL '{1}')".format(
+            name, null_values)
+    else:
+        copy_stmt = "COPY {0} FROM STDIN (FORMAT TEXT)".format(name)
+
+    with zip.open(file, compression=compression, mode='rb') as infile:
+        if _is_ndjson(file, compression=compression):
+            read = functools.partial(infile.read, COPY_BUFFER)
+        else:
+            # A generator, so it stays exhausted once the decoder
+            # has closed infile
+            lines = (line + b'\n' for line in JSONStreamingDecoder(
+                source=infile))
+
+            def read():
+                return b''.join(itertools.islice(lines, COPY_BATCH_SIZE))
+
+        await driver.copy_in(conn, copy_stmt, _executor_blocks(read))
+
+    if flatten == 'outer':
+        for sql_file in ('sanitize_name', 'flatten_json'):
+            with open(os.path.join(SQL_DIR, sql_file + '.sql'),
+                mode='r') as infile:
+                await driver.execute(conn, infile.read())
+
+        await driver.execute(conn, "SELECT flatten_json('{0}')".format(name))
+
+    if commit:
+        await driver.commit(conn)
+        await driver.close(conn)
+
+async def _fetch_tables(stream, col_names, chunksize):
+    '''
+    Regroup batches of rows from a driver's stream() into Tables of at
+    most chunksize rows each
+    '''
+
+    rows = []
+
+    async for batch in stream:
+        rows += batch
+
+        while len(rows) >= chunksize:
+            yield Table(name='SQL Query', dialect='postgres',
+                col_names=col_names, row_values=rows[:chunksize])
+            rows = rows[chunksize:]
+
+    if rows:
+        yield Table(name='SQL Query', dialect='postgres',
+            col_names=col_names, row_values=rows)
+
+@postgres_connect
+async def read_pg(sql, conn=None, itersize=2000, chunksize=None, **kwargs):
+    '''
+    Read a SQL query through a server-side cursor and return it as a Table
+     * Statements which can't be used in a cursor (e.g. SHOW) are run
+       normally, as in `pgreaper.read_pg()`
+
+    Args:
+        sql:        str
+                    A SQL query
+        itersize:   int (default: 2000)
+                    Number of rows to fetch from the server at a time
+        chunksize:  int (default: None)
+                    If specified, return an asynchronous iterator of Tables
+                    with at most this many rows each instead of a single
+                    Table
+
+    **Chunked Usage:**
+     >>> tables = await aio.read_pg('SELECT * FROM tweets', chunksize=1000,
+     ...     conn=conn)
+     >>> async for table in tables:
+     ...     print(len(table))
+    '''
+
+    if _is_cursor_query(sql):
+        name = 'pgreaper_read_pg_{}'.format(next(_CURSOR_IDS))
+    else:
+        name = None
+
+    stream = get_async_driver(conn).stream(conn, sql, name=name,
+        itersize=itersize)
+    col_names = await stream.__anext__()
+
+    if chunksize:
+        return _fetch_tables(stream, col_names, chunksize)
+
+    rows = []
+    async for batch in stream:
+        rows += batch
+
+    return Table(name='SQL Query', dialect='postgres', col_names=col_names,
+        row_values=rows)
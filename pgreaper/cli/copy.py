@@ -66,9 +66,11 @@ def copy_delim(file, zip, zipped_file, delim, header, skiplines,
     if zip and (zipped_file is None):
         raise ValueError('Please specify which file in the ZIP archive to upload.')
 
-    # Load the file
-    pgreaper.copy_csv(file, delimiter=delim, header=header, skiplines=skiplines,
-        dbname=dbname, user=user, host=host, password=password)
+    # Load the file, showing a progress bar
+    report = pgreaper.copy_csv(file, delimiter=delim, header=header,
+        skiplines=skiplines, dbname=dbname, user=user, host=host,
+        password=password, progress=True)
         
     # Print report
-    print('Finished loading file')
\ No newline at end of file
+    print('Finished loading file')
+    print(report)
\ No newline at end of file
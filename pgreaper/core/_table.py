@@ -7,10 +7,9 @@ Table Methods
 from pgreaper._globals import PYTHON_VERSION
 from .mappings import CaseInsensitiveDict
 from .schema import PY_TYPES, POSTGRES_COMPAT
+from .serialize import to_csv
 
-from io import StringIO, BytesIO
-import csv
-import json
+from io import StringIO
 
 def add_dicts(self, dicts, extract={}):
     '''
@@ -22,41 +21,71 @@ def add_dicts(self, dicts, extract={}):
                     A list of JSON dicts
         extract:    If adding nested dicts, pull out nested entries 
                     according to extract dict
+                    
+    Performance:
+     * Most records share the same keys, so the keys of each distinct 
+       "shape" (tuple of keys in order) are only looked up once
     '''
-
-    # Inspect all dicts for columns we'll need to add and add them
-    all_keys = set(self.columns.col_names_lower)
+    
+    columns = self.columns
+    
+    # Add columns for keys we haven't seen before (in the order they appear)
+    known = set(columns.col_names_lower)
+    shapes = set()
+    
     for d in dicts:
-        all_keys = all_keys.union(set([k.lower() for k in d.keys()]))
-    for k in all_keys:
-        if k not in self.columns.col_names_lower:
-            self.add_col(k, None)
+        shape = tuple(d)
+        
+        if shape not in shapes:
+            shapes.add(shape)
+            
+            for k in shape:
+                k = k.lower()
+                if k not in known:
+                    known.add(k)
+                    self.add_col(k, None)
     
     # Add necessary columns according to extract dict
-    for col, path in zip(extract.keys(), extract.values()):
-        if col.lower() not in self.columns:
+    for col in extract:
+        if col.lower() not in known:
+            known.add(col.lower())
             self.add_col(col, None)
+            
+    n_cols = self.n_cols
+    extract = [(columns.index(col), path) for col, path in extract.items()]
+    
+    # Maps shapes to the column index of each key, or None if the keys
+    # are exactly the Table's columns in order
+    identity = list(range(n_cols))
+    indices = {}
     
-    for row in dicts:
-        new_row = []
+    for d in dicts:
+        shape = tuple(d)
         
+        try:
+            shape_idx = indices[shape]
+        except KeyError:
+            shape_idx = [columns.index(k) for k in shape]
+            if shape_idx == identity:
+                shape_idx = None
+            indices[shape] = shape_idx
+            
+        if shape_idx is None:
+            new_row = list(d.values())
+        else:
+            new_row = [None] * n_cols
+            for i, value in zip(shape_idx, d.values()):
+                new_row[i] = value
+            
         # Extract values according to extract dict
-        for col, path in zip(extract.keys(), extract.values()):
+        for i, path in extract:
             try:
-                value = row
+                value = d
                 for k in path:
                     value = value[k]
-                row[col] = value
+                new_row[i] = value
             except (KeyError, IndexError) as e:
-                row[col] = None
-    
-        # Map column indices to keys and create the new row
-        map = self.columns.map(*row)
-        for i in range(0, self.n_cols):
-            try:
-                new_row.append(row[map[i]])
-            except KeyError:
-                new_row.append(None)
+                new_row[i] = None
                 
         self.append(new_row)
         
@@ -72,32 +101,24 @@ def guess_type(self):
             if i not in final_types:
                 final_types[i] = PY_TYPES['postgres'][type.__name__]
             else:
-                final_types[i] = POSTGRES_COMPAT[type.__name__][final_types[i]]
+                final_types[i] = POSTGRES_COMPAT[
+                    PY_TYPES['postgres'][type.__name__]][final_types[i]]
                 
     # Nulls --> 'text'
     for k, v in zip(final_types.keys(), final_types.values()):
         if v == 'null':
             final_types[k] = self.null_col
 
-    self.col_types = [final_types[i] for i in self.col_names]
+    col_types = []
+    for i in self.col_names:
+        try:
+            col_types.append(final_types[i])
+        except KeyError:
+            # Column has no data yet
+            col_types.append(self.null_col)
+
+    self.col_types = col_types
     
-def to_string(table):
+def to_string(table, strict_null=False):
     ''' Return table as a StringIO object for writing via copy() '''
-    
-    string = StringIO()
-    writer = csv.writer(string, delimiter=",", quoting=csv.QUOTE_MINIMAL)
-    dict_encoder = json.JSONEncoder()
-    
-    jsonb_cols = set([i for i, j in enumerate(table.col_types) if j == 'jsonb'])
-    datetime_cols = set([i for i, j in enumerate(table.col_types) if j == 'datetime'])
-    
-    for row in table:
-        for i in jsonb_cols:
-            row[i] = dict_encoder.encode(row[i])
-        for i in datetime_cols:
-            row[i] = psycopg2.extensions.adapt(i)
-    
-        writer.writerow(row)
-        
-    string.seek(0)
-    return string
\ No newline at end of file
+    return StringIO(to_csv(table, table.col_types, strict_null=strict_null))
\ No newline at end of file
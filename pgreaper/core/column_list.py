@@ -29,33 +29,63 @@ class ColumnList(object):
                         An auto-updating mapping of integer indices to column names
         _inverted_idx:  dict
                         An auto-updating mapping of column names to integer indices
+        _lower:         list
+                        Lowercased column names, kept in sync with _idx
+        _types:         tuple
+                        Cached (col_types, col_types_no_pkey), or None if
+                        the types or primary key changed since last time
+        _sanitized:     list
+                        Cached stripped and de-duplicated column names, or
+                        None if the names changed since last time
+                        
+    Performance:
+     * Adding a column updates the indices in place instead of rebuilding
+       them, so building a Table with thousands of columns one at a time
+       (e.g. with `add_dicts()`) isn't quadratic
+     * Comparisons use the column name index instead of scanning lists
     '''
     
     __slots__ = ['n_cols', 'table', 'placeholder', '_col_names', '_col_types',
-        '_p_key', '_idx', '_inverted_idx']
+        '_p_key', '_idx', '_inverted_idx', '_lower', '_types', '_sanitized']
     
     def __init__(self, col_names=[], col_types=[], table=None, p_key=None):
         self.table = table
         self.placeholder = 'text'
+        self._types = None
         self.col_names = col_names
         self.col_types = col_types
         self.p_key = p_key
-        self._update_idx()
         
     def add_col(self, name, type=None):    
         ''' The correct method for adding a column '''
         if not type:
             type = self.placeholder
         
+        lower = name.lower()
+        self._idx[self.n_cols] = lower
+        self._inverted_idx[lower] = self.n_cols
+        self._lower.append(lower)
+        self._sanitized = None
+        self.n_cols += 1
+        
         self._col_names.append(name)
         self._col_types.append(type)
-        self._update_idx()
+        self._types = None
+        
+    def copy(self, table=None):
+        ''' Return a copy with its own lists of column names and types '''
+        new_cols = ColumnList(col_names=list(self._col_names),
+            col_types=list(self._col_types), table=table, p_key=self._p_key)
+        new_cols.placeholder = self.placeholder
+        return new_cols
         
     def del_col(self, index):
         ''' Remove column at index '''
         del self._col_names[index]
         del self._col_types[index]
-        self._update_idx()
+        del self._lower[index]
+        self._types = None
+        self._update_idx(lowered=True)
         
     def get_col_type(self, col):
         '''
@@ -76,18 +106,29 @@ class ColumnList(object):
                         Don't include primary key label in types
         '''
         
+        col_types, col_types_no_pkey = self._get_types()
+        
         if no_pkey:
-            return [(x, y) for x, y in zip(self.col_names_lower,
-                self.col_types_no_pkey)]
+            return list(zip(self._lower, col_types_no_pkey))
         else:
-            return [(x, y) for x, y in zip(self.col_names_lower,
-                self.col_types)]
+            return list(zip(self._lower, col_types))
+        
+    def _update_idx(self, lowered=False):
+        '''
+        Update self._idx and self._inverted_idx
         
-    def _update_idx(self):
-        ''' Update self._idx and self._inverted_idx '''
-        self.n_cols = len(self.col_names)
-        self._idx = {i: j.lower() for i, j in enumerate(self.col_names)}
-        self._inverted_idx = {j.lower(): i for i, j in enumerate(self.col_names)}
+        Args:
+            lowered:    bool
+                        self._lower is already up to date
+        '''
+        
+        if not lowered:
+            self._lower = [i.lower() for i in self._col_names]
+            
+        self._sanitized = None
+        self.n_cols = len(self._lower)
+        self._idx = dict(enumerate(self._lower))
+        self._inverted_idx = {j: i for i, j in enumerate(self._lower)}
         
     def index(self, name):
         '''
@@ -129,7 +170,7 @@ class ColumnList(object):
     @property
     def col_names_lower(self):
         ''' Return lowercased column names '''
-        return [i.lower() for i in self._col_names]
+        return list(self._lower)
     
     @col_names.setter
     def col_names(self, value):
@@ -138,13 +179,7 @@ class ColumnList(object):
         else:
             self._col_names = value
         
-        self.n_cols = len(self._col_names)
-        
-        # Will fail if ColumnList is being initialized
-        try:
-            self._update_idx()
-        except KeyError:
-            pass
+        self._update_idx()
         
     @property
     def col_types(self):
@@ -153,20 +188,33 @@ class ColumnList(object):
     @property
     def col_types_no_pkey(self):
         ''' Don't tack on PRIMARY KEY label '''
-        return [str(i) for i in self._col_types]
+        return list(self._get_types()[1])
         
     @col_types.getter
     def col_types(self):
         ''' Tack on PRIMARY KEY label if appropriate '''
-        col_types = [str(i) for i in self._col_types]
-    
-        # If we have a composite primary key, let the table creating
-        # function deal with that
-        if (self.p_key is not None) and (not isinstance(self.p_key, tuple)):
-            col_types[self.p_key] += ' primary key'
-            return col_types
-        else:
-            return col_types
+        return list(self._get_types()[0])
+        
+    def _get_types(self):
+        '''
+        Return (column types, column types without PRIMARY KEY label),
+        which are cached until the types or primary key change
+         * Don't modify the returned lists
+        '''
+        
+        if self._types is None:
+            col_types_no_pkey = [str(i) for i in self._col_types]
+            col_types = list(col_types_no_pkey)
+        
+            # If we have a composite primary key, let the table creating
+            # function deal with that
+            if (self.p_key is not None) and \
+                (not isinstance(self.p_key, tuple)):
+                col_types[self.p_key] += ' primary key'
+                
+            self._types = (col_types, col_types_no_pkey)
+            
+        return self._types
         
     @col_types.setter
     def col_types(self, value):
@@ -179,6 +227,7 @@ class ColumnList(object):
             raise ValueError('Column types should either be a list, tuple, or string.')
             
         self._col_types = value
+        self._types = None
         
     @property
     def sanitized(self):
@@ -207,6 +256,7 @@ class ColumnList(object):
         
         error_message = 'Primary keys must either be integer indices or' + \
             ' strings. Composite keys should be specified with tuples.'
+        self._types = None
         
         def set_int(val):
             if val >= self.n_cols:
@@ -237,7 +287,7 @@ class ColumnList(object):
             raise TypeError(error_message)
         
     def __iter__(self):
-        return iter(self.col_names_lower)
+        return iter(self._lower)
         
     def __bool__(self):
         return bool(len(self.col_names))
@@ -247,13 +297,11 @@ class ColumnList(object):
         Partial Ordering
          * Return "True" if column names are STRICT superset of other
         '''
-        return set(self.col_names_lower).issuperset(set(other.col_names_lower)) and \
-            set(self.col_names_lower) != set(other.col_names_lower)
+        return self._inverted_idx.keys() > other._inverted_idx.keys()
             
     def __lt__(self, other):
         ''' Return "True" if column names are a STRICT subset of other '''
-        return set(self.col_names_lower).issubset(set(other.col_names_lower)) and \
-            set(self.col_names_lower) != set(other.col_names_lower)
+        return self._inverted_idx.keys() < other._inverted_idx.keys()
             
     def __eq__(self, other):
         '''
@@ -263,12 +311,9 @@ class ColumnList(object):
          * 2:   Column names are the same with the same order
         '''
 
-        self_names = self.col_names_lower
-        other_names = other.col_names_lower
-        
-        if self_names == other_names:
+        if self._lower == other._lower:
             return 2
-        elif set(self_names) == set(other_names):
+        elif self._inverted_idx.keys() == other._inverted_idx.keys():
             return 1
         else:
             return 0
@@ -282,7 +327,7 @@ class ColumnList(object):
         
         new_columns = ColumnList(self.col_names_lower, self.col_types)
         for x, y in other.as_tuples():
-            if x not in self.col_names_lower:
+            if x not in self._inverted_idx:
                 new_columns.add_col(x, y)
         
         return new_columns
@@ -294,7 +339,7 @@ class ColumnList(object):
         
         new_columns = ColumnList()
         for x, y in self.as_tuples():
-            if x not in other.col_names_lower:
+            if x not in other._inverted_idx:
                 new_columns.add_col(x, y)
         
         return new_columns
@@ -307,8 +352,11 @@ class ColumnList(object):
         '''
         
         new_columns = ColumnList()
+        other_types = other._get_types()[1]
+        
         for x, y in self.as_tuples(no_pkey=True):
-            if (x in other.col_names_lower) and (other.get_col_type(x) != y):
+            i = other._inverted_idx.get(x)
+            if (i is not None) and (other_types[i] != y):
                 new_columns.add_col(x, y)
                 
         return new_columns
@@ -327,9 +375,12 @@ class ColumnList(object):
         reserved:       A set of column names that should not be allowed
         '''
         
-        # Fix column names
-        new_col_names = [strip(name) for name in self.col_names_lower]
-        new_col_names = resolve_duplicate(new_col_names)
+        # Fix column names (cached until the names change)
+        if self._sanitized is None:
+            self._sanitized = resolve_duplicate(
+                [strip(name) for name in self._lower])
+            
+        new_col_names = list(self._sanitized)
 
         # Add a trailing underscore to reserved column names
         if reserved:
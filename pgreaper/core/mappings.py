@@ -33,6 +33,11 @@ class CaseInsensitiveDict(dict):
         if isinstance(key, str):
             key = key.lower()
         super(CaseInsensitiveDict, self).__delitem__(key)
+        
+    def __contains__(self, key):
+        if isinstance(key, str):
+            key = key.lower()
+        return super(CaseInsensitiveDict, self).__contains__(key)
                 
 class SymmetricIndex(dict):
     '''    
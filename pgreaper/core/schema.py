@@ -71,7 +71,7 @@ POSTGRES_COMPAT['jsonb'] + {
 POSTGRES_COMPAT['text'] + {
     'bigint': 'text',
     'double precision': 'text',
-    'datetime': 'text',
+    'timestamp': 'text',
     'boolean': 'text'
 }
 POSTGRES_COMPAT['double precision'] + {
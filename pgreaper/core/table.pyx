@@ -249,6 +249,25 @@ class Table(BaseTable):
         return Table(name=table_.name, dialect=table_.dialect,
             columns=table_.columns, row_values=row_values)
     
+    def copy(self):
+        '''
+        Return a copy of this Table
+         * Rows are copied, but not the values in them, which is much
+           faster than deepcopy() (values are usually strings or numbers)
+        '''
+        
+        new_table = Table(name=self.name, dialect=self.dialect,
+            columns=self.columns.copy(), null_col=self.null_col)
+        list.extend(new_table, [list(row) for row in self])
+        
+        for col, counts in self._type_cnt.items():
+            new_table._type_cnt[col].update(counts)
+            
+        if self._pk_idx:
+            new_table._create_pk_index()
+            
+        return new_table
+    
     def __getitem__(self, key):
         '''
         In addition to the standard Python slice syntax for lists,
@@ -278,7 +297,8 @@ class Table(BaseTable):
                     return self._pk_idx[key[0]][key[1]]
         elif isinstance(key, str):
             # Support indexing by column name
-            return [row[self.columns.index(key)] for row in self]
+            index = self.columns.index(key)
+            return [row[index] for row in self]
         else:
             return super(Table, self).__getitem__(key)
     
@@ -302,9 +322,9 @@ class Table(BaseTable):
                 
             super(Table, self).append(value)
     
-    def to_string(self):
+    def to_string(self, strict_null=False):
         ''' Return this table as a StringIO object for writing via copy() '''
-        return to_string(self)
+        return to_string(self, strict_null=strict_null)
     
     ''' Table merging functions '''
     def widen(self, w, placeholder='', in_place=True):
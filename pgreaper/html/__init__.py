@@ -1,3 +1,5 @@
 from .parser import get_tables_from_file as from_file, \
     get_tables_from_url as from_url, \
-    get_tables_from_string as from_string
\ No newline at end of file
+    get_tables_from_string as from_string, \
+    iter_tables_from_file as iter_file
+from .batch import get_tables_from_files as from_files, group_tables
\ No newline at end of file
@@ -11,12 +11,9 @@ def count_cols(rows):
     for row in rows:
         n_cols = 0
         
-        for cell in row['children']:
-            if cell['tag'] in ['td', 'th']:
-                try:
-                    n_cols += cell['colspan']
-                except KeyError:  # No colspan
-                    n_cols += 1
+        for cell in row.children:
+            if cell.tag in ['td', 'th']:
+                n_cols += cell.span('colspan')
                     
         n_cols_counts.append(n_cols)
 
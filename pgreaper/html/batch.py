@@ -0,0 +1,197 @@
+'''
+.. currentmodule:: pgreaper.html
+
+Batch Parsing
+==============
+Parse many saved HTML files at once with a pool of processes.
+
+ >>> import pgreaper.html as html_table
+ >>> result = html_table.from_files('reports/', n_procs=8)
+ >>> result.errors
+ OrderedDict([('reports/broken.html', 'UnicodeDecodeError: ...')])
+ >>> tables = html_table.group_tables(result.results)
+
+.. autofunction:: get_tables_from_files
+.. autofunction:: group_tables
+'''
+
+# Files sent to a worker process at a time
+BATCH_CHUNK_SIZE = 16
+
+# Files parsed when given a directory
+HTML_PATTERNS = ('*.html', '*.htm')
+
+from .parser import TableBrowser, iter_tables_from_file
+from .table import html_table
+
+from collections import namedtuple, OrderedDict
+import glob
+import multiprocessing
+import os
+
+'''
+Result of a batch
+ * results: OrderedDict mapping files (or target tables) to results
+ * errors:  OrderedDict mapping files which couldn't be parsed to
+            error messages
+'''
+BatchResult = namedtuple('BatchResult', ['results', 'errors'])
+
+def _list_files(files, recursive=False):
+    '''
+    Expand a directory, glob pattern, or list of either into a sorted
+    list of files, without duplicates
+    '''
+
+    if isinstance(files, str):
+        files = [files]
+
+    found = OrderedDict()
+
+    for path in files:
+        if os.path.isdir(path):
+            dirs = [os.path.join(path, '**')] if recursive else [path]
+            matches = sorted(i for dir in dirs for pattern in HTML_PATTERNS
+                for i in glob.glob(os.path.join(dir, pattern),
+                recursive=recursive))
+        elif glob.has_magic(path):
+            matches = sorted(glob.glob(path, recursive=recursive))
+        else:
+            matches = [path]
+
+        for match in matches:
+            found[match] = None
+
+    return list(found)
+
+def _parse_file(args):
+    '''
+    Parse one file in a worker process
+     * Tables can't be pickled, so they're returned as
+       (name, col_names, col_types, rows) tuples
+     * Exceptions are returned as messages instead of being raised, so
+       one bad file doesn't stop the batch
+    '''
+
+    file, encoding = args
+
+    try:
+        return file, [(table.name, table.col_names, table.col_types,
+            list(table)) for table in iter_tables_from_file(file,
+            encoding=encoding)], None
+    except Exception as e:
+        return file, None, '{}: {}'.format(type(e).__name__, e)
+
+def _to_table(name, col_names, col_types, rows):
+    table = html_table(n_cols=len(col_names), name=name,
+        col_names=col_names, row_values=rows)
+    table.col_types = col_types
+    return table
+
+def _iter_parsed(files, n_procs=None, encoding='utf-8'):
+    ''' Yield (file, tables, error) for every file, in order '''
+
+    n_procs = min(n_procs or os.cpu_count() or 1, len(files))
+    args = ((file, encoding) for file in files)
+
+    if n_procs <= 1:
+        for parsed in map(_parse_file, args):
+            yield parsed
+    else:
+        pool = multiprocessing.get_context('spawn').Pool(n_procs)
+
+        try:
+            for parsed in pool.imap(_parse_file, args,
+                chunksize=BATCH_CHUNK_SIZE):
+                yield parsed
+        finally:
+            pool.terminate()
+            pool.join()
+
+def get_tables_from_files(files, n_procs=None, encoding='utf-8',
+    recursive=False):
+    '''
+    Parse many HTML files in a pool of processes
+
+     * Files are parsed with the streaming parser (see `from_file()`)
+     * A file which can't be read or parsed is recorded in `errors`
+       instead of stopping the batch
+     * Like any use of `multiprocessing`, scripts should be guarded
+       with `if __name__ == '__main__'`
+
+    Basic Usage:
+     >>> import pgreaper.html as html_table
+     >>> tables, errors = html_table.from_files('reports/*.html')
+
+    Args:
+        files:      str or list
+                    A directory (every .html and .htm file in it), a glob
+                    pattern, a filename, or a list of any of these
+        n_procs:    int (default: number of CPUs)
+                    Number of processes (1 parses everything in this
+                    process)
+        encoding:   str (default: 'utf-8')
+        recursive:  bool (default: False)
+                    Search subdirectories of directories, and allow
+                    '**' in glob patterns
+
+    Returns:
+        A `BatchResult` whose results map each file to a `TableBrowser`
+    '''
+
+    files = _list_files(files, recursive=recursive)
+    result = BatchResult(OrderedDict(), OrderedDict())
+
+    for file, tables, error in _iter_parsed(files, n_procs=n_procs,
+        encoding=encoding):
+        if error:
+            result.errors[file] = error
+        else:
+            browser = TableBrowser(source=file)
+            for table in tables:
+                browser.append(_to_table(*table))
+
+            result.results[file] = browser
+
+    return result
+
+def group_tables(tables):
+    '''
+    Merge tables with identical column names
+
+     * Each group is named after its first table, and groups are in
+       the order their first table was found
+     * Tables without a header are grouped with tables of the same
+       width which also don't have one
+     * Column types are guessed again for the merged rows
+
+    Args:
+        tables:     A list of Tables, a `TableBrowser`, or a dict
+                    mapping files to `TableBrowser`s (e.g. the results
+                    of `from_files()`)
+
+    Returns:
+        A list of Tables
+    '''
+
+    if isinstance(tables, dict):
+        tables = [table for browser in tables.values() for table in browser]
+
+    groups = OrderedDict()
+
+    for table in tables:
+        key = tuple(table.col_names)
+
+        if key not in groups:
+            groups[key] = html_table(n_cols=len(key), name=table.name,
+                col_names=list(key))
+
+        group = groups[key]
+        for row in table:
+            group.append(row)
+
+    for group in groups.values():
+        if group:
+            group.guess_type()
+
+    return list(groups.values())
@@ -1,13 +1,15 @@
 TABLEBROWSER_MAX_REPR = 30
 
+# Number of characters read at a time when streaming a file
+STREAM_CHUNK_SIZE = 2 ** 16
+
 from pgreaper._globals import import_package
 from .table import html_table
 from ._parser import *
-from .tree import HTMLNode
+from .tree import HTMLNode, TagIndex
 requests = import_package('requests')
 
 from collections import deque
-from copy import deepcopy
 from html.parser import HTMLParser
 import functools
 
@@ -34,6 +36,9 @@ class HTMLTreeParser(HTMLParser):
         self.head_node = None
         self.current_node = None
         
+        # Nodes by tag, in document order
+        self.index = TagIndex()
+        
     def handle_starttag(self, tag, attrs):
         if tag not in HTMLTreeParser.ignore:
             if self.head_node:
@@ -44,38 +49,164 @@ class HTMLTreeParser(HTMLParser):
                 ('alt', 'The Python logo')
                 '''
             
-                attr_dict = {}
-                
-                for attr in attrs:
-                    attr_dict[attr[0]] = attr[1]
-            
-                new_node = HTMLNode(tag=tag,
-                    parent=self.current_node, **attr_dict)
-                    
-                self.current_node = new_node
+                self.current_node = HTMLNode(tag, self.current_node,
+                    dict(attrs) if attrs else None, self.index)
             else:
-                self.head_node = self.current_node = HTMLNode(tag=tag)
+                self.head_node = self.current_node = HTMLNode(tag, None,
+                    dict(attrs) if attrs else None, self.index)
 
     def handle_endtag(self, tag):
         # If current_node = None, do nothing
         if (tag not in HTMLTreeParser.ignore) and self.current_node:
+            self.index.close(self.current_node)
             self.current_node = self.current_node.parent
             
+    def close(self):
+        super(HTMLTreeParser, self).close()
+        
+        # Close any nodes which are still open
+        node = self.current_node
+        while node is not None:
+            self.index.close(node)
+            node = node.parent
+            
     def handle_data(self, data):
         '''
         Rules:
          1. If current node is a "container", e.g. a table cell, add data as a string to children
          2. Otherwise, store in data attribute
         '''
-        try:
-            if self.current_node['tag'] in HTMLTreeParser.containers:
-                self.current_node['children'].append(data)
+        node = self.current_node
+        
+        # There's data but no current node (!!!)
+        if node is None:
+            return
+        
+        if node.tag in HTMLTreeParser.containers:
+            node.children.append(data)
+        else:
+            node.data += data
+
+class TableStreamParser(HTMLTreeParser):
+    '''
+    Parses through an HTML document, but only creates trees for tables
+    (and headings, which are used to name tables)
+    
+     * Other elements are only kept while they are open, with placeholders
+       for their children, so tables can still be named after the nearest
+       preceding heading
+     * Tables are parsed as soon as they're closed and put in self.tables
+     * Tables are found in document order
+     * Void elements (e.g. <img>, <meta>) are ignored, since they never
+       have closing tags
+     * Cells and rows without closing tags are closed by </table>, and a
+       table which is never closed is parsed by `close()`
+    '''
+    
+    capture = set(['table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+    ignore = HTMLTreeParser.ignore | set(['area', 'base', 'col', 'embed',
+        'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'])
+    
+    def __init__(self):
+        super(TableStreamParser, self).__init__()
+        
+        # Open elements outside of tables and headings, as lists of
+        # placeholders for their children (or HTMLNodes once a table or 
+        # heading is found inside of them)
+        self.stack = [[]]
+        
+        # Root of the table or heading being built
+        self.root = None
+        self.tables = deque()
+        
+    def handle_starttag(self, tag, attrs):
+        if tag in TableStreamParser.ignore:
+            return
+            
+        if self.root is not None:
+            self.current_node = HTMLNode(tag, self.current_node,
+                dict(attrs) if attrs else None, self.index)
+        elif tag in TableStreamParser.capture:
+            parent = self.stack[-1]
+            
+            if isinstance(parent, list):
+                placeholders = parent
+                parent = self.stack[-1] = HTMLNode(tag=None)
+                parent.children.extend(placeholders)
+                
+            self.index = TagIndex()
+            self.root = self.current_node = HTMLNode(tag, parent,
+                dict(attrs) if attrs else None, self.index)
+        else:
+            parent = self.stack[-1]
+            
+            if isinstance(parent, list):
+                parent.append(None)
             else:
-                self.current_node['data'] += data
+                parent.children.append(None)
                 
-        # There's data but no current node (!!!)
-        except TypeError:
-            pass
+            self.stack.append([])
+            
+    def handle_endtag(self, tag):
+        if tag in TableStreamParser.ignore:
+            return
+            
+        if self.root is None:
+            if len(self.stack) > 1:
+                self.stack.pop()
+            return
+            
+        node = self.current_node
+        
+        # Elements whose end tags were left out (e.g. <td> without </td>)
+        # are closed along with the table or heading they're in
+        if tag in TableStreamParser.capture:
+            while node.tag != tag and node is not self.root:
+                node = node.parent
+                
+            if node.tag != tag:
+                node = self.current_node
+        
+        self._close_through(node)
+        
+        if node is self.root:
+            self._finish()
+        else:
+            self.current_node = node.parent
+            
+    def close(self):
+        # Skip HTMLTreeParser.close(): open nodes outside of the current
+        # table or heading are placeholders
+        HTMLParser.close(self)
+        
+        # Parse a table which was never closed
+        if self.root is not None:
+            self._close_through(self.root)
+            self._finish()
+            
+    def _close_through(self, node):
+        ''' Close open nodes from the current node up to and including node '''
+        
+        current = self.current_node
+        self.index.close(current)
+        
+        while current is not node:
+            current = current.parent
+            self.index.close(current)
+            
+    def _finish(self):
+        ''' Parse a completed table (or tables inside of a heading) '''
+        
+        root = self.root
+        self.root = self.current_node = None
+        
+        if root.tag == 'table':
+            self.tables.extend(TableParser(root).parse())
+            
+            # Only headings are needed for naming later tables
+            root.parent.replace_child(-1, None)
+        elif root.search_tag('table'):
+            self.tables.extend(TableParser(root).parse())
 
 class TableBrowser(list):
     '''
@@ -109,8 +240,16 @@ class TableBrowser(list):
         self.source = source
     
     def __getitem__(self, key):
-        ''' Return a copy of a Table instead of the original Table '''
-        return deepcopy(super(TableBrowser, self).__getitem__(key))
+        '''
+        Return a copy of a Table instead of the original Table
+         * Only rows are copied, not the values in them (see `Table.copy()`)
+        '''
+        
+        item = super(TableBrowser, self).__getitem__(key)
+        
+        if isinstance(key, slice):
+            return [table.copy() for table in item]
+        return item.copy()
     
     def __repr__(self):
         repr_str = "{source}\n{num_tbl} tables found".format(
@@ -167,27 +306,17 @@ class TableBrowser(list):
          * kwargs:      Attributes of the new table
         '''
 
+        # Get the original Tables, and only copy the first one: rows from
+        # the others are copied as they're added
         if isinstance(i, slice):
-            k = i.start  # Index of current table
-            
-            if i.stop:
-                stop = i.stop
-            else:
-                stop = len(self)
-            if i.step:
-                step = i.step
-            else:
-                step = 1
-            
-            # Initialize
-            new_table = self[k]
-            k += step
-            
-            while k < stop:
-                new_table += self[k]
-                k += step
+            tables = super(TableBrowser, self).__getitem__(i)
         else:
-            new_table = i + j
+            tables = [super(TableBrowser, self).__getitem__(k) for k in (i, j)]
+            
+        new_table = tables[0].copy()
+        
+        for table in tables[1:]:
+            new_table += [list(row) for row in table]
             
         for attr in kwargs:
             setattr(new_table, attr, kwargs[attr])
@@ -232,14 +361,14 @@ class TableParser(object):
         
         Rules:
         1. Nested tables get unnested 
+        2. Tables are returned in document order
         '''
         
         tables = []
         
-        if self.html_tree['tag'] == 'table':
+        if self.html_tree.tag == 'table':
             tables.append(self.html_tree)
             
-        # tables += self.html_tree.search(tag='table')
         tables += self.html_tree.search_tag('table')
         
         return tables
@@ -253,7 +382,7 @@ class TableParser(object):
             * A table node (if it has no thead or tbody)
         '''
         
-        for row in node['children']:
+        for row in node.children:
             child_tags = row.get_child_tags()
             th = child_tags['th']
             td = child_tags['td']
@@ -308,7 +437,7 @@ class TableParser(object):
             
             # Get cells from this row
             try:
-                cell = node['children'][last_cell]
+                cell = node.children[last_cell]
                 cell_data = self._handle_cell(node=cell, i=cell_index)
                 last_cell += 1
                 
@@ -339,12 +468,8 @@ class TableParser(object):
         if isinstance(node, HTMLNode):
             cells = []
             cell_data = node.get_data()
-            colspan = rowspan = 1
-            
-            if 'colspan' in node.keys():
-                colspan = node['colspan']
-            if 'rowspan' in node.keys():
-                rowspan = node['rowspan']
+            colspan = node.span('colspan')
+            rowspan = node.span('rowspan')
              
             # If cell has rowspan attribute, save for future use
             saved_rowspan = _SavedRowspan()
@@ -394,7 +519,7 @@ class TableParser(object):
             caption = table.get_child('caption')
             
             if caption:
-                new_table.name = caption['data']
+                new_table.name = caption.data
             
             # <thead> Handling
             thead = table.get_child('thead')
@@ -443,6 +568,7 @@ def html_to_tree(html):
     
     parser = HTMLTreeParser()
     parser.feed(html)
+    parser.close()
     
     return parser.head_node
     
@@ -452,15 +578,58 @@ def tree_to_table(tree):
     parser = TableParser(tree)
     return parser.parse()
 
-def get_tables_from_string(html):
-    ''' Parse HTML code from direct input '''
+def get_tables_from_string(html, stream=False):
+    '''
+    Parse HTML code from direct input
+     * stream: Use a `TableStreamParser` (see `get_tables_from_file()`)
+    '''
 
-    html_tree = html_to_tree(html.replace('\n', ''))    
-    tables = tree_to_table(html_tree)
+    if stream:
+        parser = TableStreamParser()
+        parser.feed(html.replace('\n', ''))
+        parser.close()
+        
+        tables = TableBrowser()
+        for table in parser.tables:
+            tables.append(table)
+    else:
+        html_tree = html_to_tree(html.replace('\n', ''))    
+        tables = tree_to_table(html_tree)
+        
     tables.source = "Direct Input"    
     return tables
     
-def get_tables_from_file(file, encoding='utf-8'):
+def iter_tables_from_file(file, encoding='utf-8'):
+    '''
+    Parse a file with a `TableStreamParser`, yielding each Table as soon
+    as it's been parsed. The file is read in chunks, so memory use depends 
+    on the size of the largest table, not the size of the file.
+    
+    Basic Usage:
+     >>> import pgreaper.html as html_table
+     >>> for table in html_table.iter_file(filename):
+     ...     print(table.name)
+    '''
+    
+    parser = TableStreamParser()
+    
+    with open(file, encoding=encoding, mode='r') as html_file:
+        while True:
+            chunk = html_file.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+                
+            parser.feed(chunk.replace('\n', ''))
+            
+            while parser.tables:
+                yield parser.tables.popleft()
+            
+    parser.close()
+    
+    while parser.tables:
+        yield parser.tables.popleft()
+    
+def get_tables_from_file(file, encoding='utf-8', stream=False):
     '''
     Given a filename, parse it and return a list of tables.
     
@@ -468,15 +637,25 @@ def get_tables_from_file(file, encoding='utf-8'):
      >>> import pgreaper.html as html_table
      >>> tables = html_table.from_file(filename)
      >>> tables
+     
+    Args:
+        stream:     bool (default: False)
+                    Only build trees for tables and headings instead of 
+                    the whole document, which is much faster for large 
+                    pages where tables are a small part of the HTML.
     '''
     
-    if file:
+    if stream:
+        tables = TableBrowser()
+        for table in iter_tables_from_file(file, encoding=encoding):
+            tables.append(table)
+    else:
         with open(file, encoding=encoding, mode='r') as html_file:
             html = ''.join(html_file.readlines()).replace('\n', '')
             
-    html_tree = html_to_tree(html)
-    
-    tables = tree_to_table(html_tree)
+        html_tree = html_to_tree(html)
+        tables = tree_to_table(html_tree)
+        
     tables.source = file    
     
     return tables
@@ -1,145 +1,253 @@
 ''' A tree created by parsing HTML '''
 
+from bisect import bisect_right
 from collections import Counter, defaultdict
+from operator import attrgetter
 
-class HTMLNode(dict):
-    ''' Represents an HTML tag with all its attributes and child nodes '''
+class TagIndex(object):
+    '''
+    Document-wide index of nodes by tag, built while parsing
     
-    def __init__(self, tag, parent=None, **kwargs):
-        ''' Arguments:
+     * Nodes are numbered in document order as they're added, and
+       their position and the position of their last descendant are
+       stored on them, so searching inside of a node only takes a 
+       binary search plus the number of matches
+    '''
+    
+    __slots__ = ['nodes', 'positions', 'count']
+    
+    def __init__(self):
+        self.nodes = defaultdict(list)
+        self.positions = defaultdict(list)
+        self.count = 0
+        
+    def add(self, node):
+        ''' Add a node which was just opened '''
+        node.pos = self.count
+        self.nodes[node.tag].append(node)
+        self.positions[node.tag].append(self.count)
+        self.count += 1
+        
+    def close(self, node):
+        ''' Mark the end of a node (after all of its descendants) '''
+        node.end = self.count - 1
+        
+    def search(self, tags, node=None, n=-1):
+        '''
+        Return nodes with any of tags in document order
+        
+        Args:
+            tags:   list
+            node:   HTMLNode (default: None)
+                    Only return descendants of node
+            n:      int (default: -1)
+                    Maximum number of nodes to return (-1 for all)
+        '''
+        
+        results = []
         
+        for tag in tags:
+            if tag not in self.nodes:
+                continue
+            
+            if node is None:
+                results += self.nodes[tag]
+            else:
+                # Nodes which are never closed contain the rest of the document
+                end = self.count - 1 if node.end is None else node.end
+                positions = self.positions[tag]
+                results += self.nodes[tag][bisect_right(positions, node.pos):
+                    bisect_right(positions, end)]
+            
+        if len(tags) > 1:
+            results.sort(key=attrgetter('pos'))
+        if n > 0:
+            del results[n:]
+            
+        return results
+
+class HTMLNode(object):
+    '''
+    Represents an HTML tag with all its attributes and child nodes
+
+    Attributes:
+        tag:        str
+                    What HTML tag this is
+        attrs:      dict
+                    HTML attributes
+        data:       str
+                    Text directly inside of this tag
+        children:   list
+                    Child nodes (and strings of text in table cells)
+        parent:     HTMLNode
+                    Pointer to parent node
+
+    Performance:
+     * Documents can have millions of nodes, so nodes are slotted
+       and only store a dict of attributes if they have any
+     * The index of children by tag is only built once it's needed
+       (by `get_child()`)
+     * Nodes created by a parser are also added to a `TagIndex`, which
+       `search_tag()` uses instead of walking the tree
+    '''
+
+    __slots__ = ['tag', 'attrs', 'data', 'children', 'parent', 'index',
+        'pos', 'end', '_tags']
+
+    # Shared by nodes without attributes (don't modify)
+    NO_ATTRS = {}
+
+    def __init__(self, tag, parent=None, attrs=None, index=None):
+        ''' Arguments:
+
         * tag:      What HTML tag this is
         * parent:   Pointer to parent node
-        * kwargs:   HTML attributes
+        * attrs:    A dict of HTML attributes
+        * index:    `TagIndex` of the document
         '''
-        
-        super(HTMLNode, self).__init__()
-        
-        self['tag'] = tag
-        self['data'] = ''
-        self['children'] = HTMLNodeChildren()
-        
-        # Load attributes
-        for attr in kwargs:
-            self[attr] = kwargs[attr]
-        
+
+        self.tag = tag
+        self.attrs = attrs or HTMLNode.NO_ATTRS
+        self.data = ''
+        self.children = []
         self.parent = parent
-        
+        self.index = index
+        self.pos = self.end = None
+        self._tags = None
+
+        if index is not None:
+            index.add(self)
+
         # Add itself to parent's list of children
-        if parent:
-            parent['children'].append(self)
-                
-    def __setitem__(self, key, attr):
-        # Type-cast numeric attributes to numbers
-        if key in ['colspan', 'rowspan']:
-            super(HTMLNode, self).__setitem__(key, int(attr))
-        else:
-            super(HTMLNode, self).__setitem__(key, attr)
-    
+        if parent is not None:
+            parent.children.append(self)
+            parent._tags = None
+
+    def __repr__(self):
+        return '<HTMLNode {}>'.format(self.tag)
+
+    @property
+    def tags(self):
+        ''' Mapping of tags to immediate children with that tag '''
+
+        if self._tags is None:
+            self._tags = {}
+
+            for node in self.children:
+                if isinstance(node, HTMLNode):
+                    self._tags.setdefault(node.tag, []).append(node)
+
+        return self._tags
+
+    def span(self, attr):
+        '''
+        Return the colspan or rowspan of a cell as an integer
+        (1 if not specified)
+        '''
+
+        if attr in self.attrs:
+            return int(self.attrs[attr])
+        return 1
+
+    def replace_child(self, i, node):
+        ''' Replace the i-th child, e.g. with a placeholder '''
+        self.children[i] = node
+        self._tags = None
+
     def get_child_tags(self):
         ''' From immediate children, count number of each tag '''
-        return Counter(self['children'].tags_())
-        
+        return Counter(node.tag for node in self.children if \
+            isinstance(node, HTMLNode))
+
     def before(self, tags=None, n_look=10):
         '''
          * Get the node before
          * If tag is specified, go up to 10 nodes back and
            return nearest node matching tag '''
-        
-        node_index = self.parent['children'].index(self)
-        
+
+        siblings = self.parent.children
+        node_index = siblings.index(self)
+
         if (not tags) and node_index:
-            return self.parent['children'][node_index - 1]
-        
+            return siblings[node_index - 1]
+
         if node_index < n_look:
             n_look = node_index
-           
+
         i = 0
-           
+
         while i < n_look:
-            current_node = self.parent['children'][node_index - i]
-            
+            current_node = siblings[node_index - i]
+
             if isinstance(current_node, HTMLNode) and \
-                current_node['tag'] in tags:
+                current_node.tag in tags:
                 return current_node
-                
+
             i += 1
-            
+
         return None
-    
+
     def get_data(self):
         ''' Unnest children which contain text data e.g. link anchors,
             em, b, etc... '''
-            
+
         target_tags = set(['a', 'abbr', 'span', 'em', 'b',
             'strong', 'i', 'font', 'div', 'tt'])
-        
+
         data = ''
-        data += self['data']
-        
-        for node in self['children']:
+        data += self.data
+
+        for node in self.children:
             if isinstance(node, str):
                 data += node
-            elif node['tag'] in target_tags:
+            elif node.tag in target_tags:
                 data += node.get_data()  # Recursive part
-            
+
         return data
-    
+
     def get_child(self, tag, n=0):
         ''' Get the n-th child with specified tag '''
-        
+
         try:
-            if tag in self['children'].tags_():
-                return self['children'].tags[tag][n]
-            else:
-                return None
-        except IndexError:
+            return self.tags[tag][n]
+        except (KeyError, IndexError):
             return None
-    
+
     def search_tag(self, tags, n=-1, recurse=True):
-        ''' Like search() but less flexible (can only search for tags)
-            but faster
-           
-            Arguments:
-             * tags:    A tag or list of tags            
         '''
-        
+        Return descendants (or if recurse=False, children) with any
+        of tags, in document order
+
+        Arguments:
+         * tags:    A tag or list of tags
+         * n:       Maximum number of nodes to return (-1 for all)
+        '''
+
         # Only one tag to parse
         if isinstance(tags, str):
             tags = [tags]
-        
-        results = []
-            
-        # Add tags that are immediate children
-        for tag in tags:
-            results += self['children'].tags[tag]
-            
-        # Recursively walk down tree
-        if recurse:
-            for node in self['children']:
-                if (n > 0) and (len(results) > n):
-                    break
-                elif isinstance(node, HTMLNode):
-                    results += node.search_tag(tag)
-            
+
+        if not recurse:
+            results = [node for node in self.children if \
+                isinstance(node, HTMLNode) and node.tag in tags]
+        elif self.index is not None:
+            return self.index.search(tags, node=self, n=n)
+        else:
+            # Walk down the tree (without recursion)
+            results = []
+            stack = [iter(self.children)]
+
+            while stack:
+                for node in stack[-1]:
+                    if isinstance(node, HTMLNode):
+                        if node.tag in tags:
+                            results.append(node)
+                        stack.append(iter(node.children))
+                        break
+                else:
+                    stack.pop()
+
+        if n > 0:
+            del results[n:]
+
         return results
-        
-class HTMLNodeChildren(list):
-    ''' A list of child nodes which also keeps some indices for 
-        faster lookups '''
-        
-    def __init__(self, *args):
-        super(HTMLNodeChildren, self).__init__(*args)
-        self.tags = defaultdict(lambda: [])
-        
-    def append(self, node):
-        super(HTMLNodeChildren, self).append(node)
-    
-        if isinstance(node, HTMLNode):
-            self.tags[node['tag']].append(node)
-            
-        # Other case: Strings containing data
-        
-    def tags_(self):
-        ''' Return tags of child nodes '''
-        return self.tags.keys()
\ No newline at end of file
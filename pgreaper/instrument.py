@@ -0,0 +1,385 @@
+'''
+.. currentmodule:: pgreaper
+
+Load Instrumentation
+=====================
+`copy_table()`, `copy_csv()`, `copy_json()` and `copy_df()` time each phase
+of a load and return a `LoadReport`.
+
+ >>> report = pgreaper.copy_csv('huge_file.csv', dbname='postgres')
+ >>> report
+ Load Report: huge_file (12.345 s)
+ Phase            Seconds       %         Rows          Bytes    Rejects
+ ...
+
+Phases
+-------
+ * clean:       Cleaning the input and inferring types (`copy_csv()`),
+                or decoding a JSON array (`copy_json()`)
+ * convert:     Converting a DataFrame to a Table (`copy_df()`)
+ * infer:       Inferring column types of a Table
+ * schema:      Looking up the schema of the destination table
+ * ddl:         Creating or altering tables
+ * copy:        COPY
+ * upsert:      INSERT... ON CONFLICT
+ * flatten:     Flattening JSON into columns (`copy_json()`)
+ * index:       Building primary keys and indexes after a load
+                (`sqlite_db_to_postgres()`)
+ * commit:      Committing the transaction
+
+Rejects are rows from the input which weren't loaded, e.g. rows skipped
+by `on_p_key='nothing'` because of a primary key conflict.
+
+Hooks
+------
+Hooks are functions which receive an `Event` at the start and end of
+every phase, e.g. for sending metrics to a monitoring system. Hooks can
+be registered for every load with `add_hook()`, or for one call with the
+`hooks` keyword argument.
+
+ >>> def send_metrics(event):
+ ...     if event.kind == 'end':
+ ...         statsd.timing('pgreaper.' + event.phase, event.seconds)
+ >>> pgreaper.add_hook(send_metrics)
+
+Exceptions raised by hooks are turned into warnings, so a broken hook
+won't interrupt a load.
+
+Progress
+---------
+Loaders also accept a `progress` argument to monitor long COPYs. It can
+be `True` to print a progress bar, or a function which is periodically
+called with a `Progress` tuple. Progress is tracked by wrapping the file
+object handed to COPY, so it adds almost no overhead.
+
+ >>> pgreaper.copy_table(huge_table, dbname='postgres',
+ ...     progress=lambda p: print(p.rows, p.rows_per_sec, p.eta))
+
+.. autofunction:: add_hook
+.. autofunction:: remove_hook
+.. autoclass:: LoadReport
+   :members:
+.. autoclass:: ProgressBar
+'''
+
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+import datetime
+import sys
+import time
+import warnings
+
+'''
+Event passed to hooks
+ * kind:    'start' or 'end'
+ * phase:   Name of the phase
+ * table:   Name of the table being loaded
+ * seconds: Duration of the phase (None for 'start')
+ * rows, bytes, rejects: Counts for this phase (0 for 'start')
+'''
+Event = namedtuple('Event',
+    ['kind', 'phase', 'table', 'seconds', 'rows', 'bytes', 'rejects'])
+
+HOOKS = []
+
+def add_hook(func):
+    ''' Call func with an `Event` at the start and end of every load phase '''
+    if func not in HOOKS:
+        HOOKS.append(func)
+
+def remove_hook(func):
+    ''' Unregister a hook added by `add_hook()` '''
+    HOOKS.remove(func)
+
+class Phase(object):
+    ''' Counts for one phase, which the loader fills in '''
+
+    __slots__ = ['rows', 'bytes', 'rejects']
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.rejects = 0
+
+class LoadReport(object):
+    '''
+    Timings and counts for one call to a loader
+
+    Attributes:
+        name:       str
+                    Name of the table
+        timings:    OrderedDict
+                    Mapping of phases to seconds, in the order they started
+        rows:       int
+                    Number of rows loaded
+        bytes:      int
+                    Number of bytes (or characters) sent to Postgres
+        rejects:    int
+                    Number of input rows which weren't loaded
+    '''
+
+    def __init__(self, name=None, hooks=None):
+        self.name = name
+        self.hooks = list(hooks or [])
+        self.timings = OrderedDict()
+        self.counts = OrderedDict()
+        self.rows = 0
+        self.bytes = 0
+        self.rejects = 0
+
+    @property
+    def seconds(self):
+        ''' Total time spent in all phases '''
+        return sum(self.timings.values())
+
+    def _emit(self, event):
+        for hook in HOOKS + self.hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                warnings.warn('Load hook {} raised {}: {}'.format(
+                    getattr(hook, '__name__', hook), type(e).__name__, e))
+
+    def _record(self, phase, seconds, counts):
+        self.timings[phase] = self.timings.get(phase, 0) + seconds
+        old = self.counts.get(phase, (0, 0, 0))
+        self.counts[phase] = (old[0] + counts.rows, old[1] + counts.bytes,
+            old[2] + counts.rejects)
+
+        self.rows += counts.rows
+        self.bytes += counts.bytes
+        self.rejects += counts.rejects
+
+    @contextmanager
+    def phase(self, phase):
+        '''
+        Time a phase of a load. Yields a `Phase` whose counts (rows,
+        bytes, rejects) can be filled in by the loader.
+
+         >>> with report.phase('copy') as counts:
+         ...     counts.rows = driver.copy_in(conn, copy_stmt, file)
+        '''
+
+        counts = Phase()
+        self._emit(Event('start', phase, self.name, None, 0, 0, 0))
+        start = time.perf_counter()
+
+        try:
+            yield counts
+        finally:
+            seconds = time.perf_counter() - start
+            self._record(phase, seconds, counts)
+            self._emit(Event('end', phase, self.name, seconds, counts.rows,
+                counts.bytes, counts.rejects))
+
+    def update(self, other):
+        ''' Add the timings and counts of another report to this one '''
+        for phase, seconds in other.timings.items():
+            counts = Phase()
+            counts.rows, counts.bytes, counts.rejects = other.counts[phase]
+            self._record(phase, seconds, counts)
+
+    def as_dict(self):
+        ''' Return this report as a JSON-serializable dict '''
+        return {
+            'name': self.name,
+            'seconds': self.seconds,
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'rejects': self.rejects,
+            'phases': OrderedDict((phase, {
+                'seconds': seconds,
+                'rows': self.counts[phase][0],
+                'bytes': self.counts[phase][1],
+                'rejects': self.counts[phase][2]
+            }) for phase, seconds in self.timings.items())
+        }
+
+    def __repr__(self):
+        total = self.seconds
+        lines = ['Load Report: {} ({:.3f} s)'.format(self.name, total),
+            '{:<12} {:>10} {:>7} {:>12} {:>14} {:>10}'.format(
+                'Phase', 'Seconds', '%', 'Rows', 'Bytes', 'Rejects')]
+
+        for phase, seconds in self.timings.items():
+            rows, bytes, rejects = self.counts[phase]
+            lines.append('{:<12} {:>10.3f} {:>6.1f}% {:>12,} {:>14,} '
+                '{:>10,}'.format(phase, seconds,
+                100 * seconds / total if total else 0, rows, bytes, rejects))
+
+        return '\n'.join(lines)
+
+class CountingReader(object):
+    '''
+    Wraps a file-like object passed to COPY, counting the number of
+    bytes (or characters) read from it
+    '''
+
+    def __init__(self, file):
+        self.file = file
+        self.bytes = 0
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.bytes += len(data)
+        return data
+
+    def readline(self, size=-1):
+        data = self.file.readline(size)
+        self.bytes += len(data)
+        return data
+
+    def readable(self):
+        return True
+
+'''
+Progress passed to progress callbacks
+ * bytes:           Bytes (or characters) read from the source so far
+ * total_bytes:     Size of the source, or None if unknown
+ * rows:            Rows (lines) sent so far
+ * total_rows:      Number of rows being loaded, or None if unknown
+ * seconds:         Time elapsed
+ * bytes_per_sec, rows_per_sec: Current throughput
+ * eta:             Estimated seconds left, or None if unknown
+ * done:            True for the last call
+'''
+Progress = namedtuple('Progress', ['bytes', 'total_bytes', 'rows',
+    'total_rows', 'seconds', 'bytes_per_sec', 'rows_per_sec', 'eta', 'done'])
+
+class ProgressReader(CountingReader):
+    '''
+    A `CountingReader` which also counts lines and periodically passes a
+    `Progress` to callback
+    
+    Args:
+        file:           File-like object
+        callback:       function
+        total_bytes:    int (default: None)
+                        Number of bytes which will be read, if known
+        total_rows:     int (default: None)
+                        Number of rows which will be read, if known
+        interval:       float (default: 0.5)
+                        Minimum seconds between calls to callback
+    '''
+    
+    def __init__(self, file, callback, total_bytes=None, total_rows=None,
+        interval=0.5):
+        super(ProgressReader, self).__init__(file)
+        self.callback = callback
+        self.total_bytes = total_bytes
+        self.total_rows = total_rows
+        self.interval = interval
+        self.rows = 0
+        self.done = False
+        self.start = time.perf_counter()
+        self.last = self.start
+        
+    def _update(self, data):
+        if data:
+            self.rows += data.count(b'\n' if isinstance(data, bytes) else '\n')
+            
+            now = time.perf_counter()
+            if now - self.last >= self.interval:
+                self.last = now
+                self.callback(self.progress(now))
+        elif not self.done:
+            # EOF
+            self.done = True
+            self.callback(self.progress(time.perf_counter()))
+            
+        return data
+        
+    def progress(self, now=None):
+        ''' Return the current `Progress` '''
+        seconds = (now or time.perf_counter()) - self.start
+        bytes_per_sec = self.bytes / seconds if seconds else 0
+        rows_per_sec = self.rows / seconds if seconds else 0
+        eta = None
+        
+        if self.done:
+            eta = 0
+        elif self.total_bytes and bytes_per_sec:
+            eta = max(self.total_bytes - self.bytes, 0) / bytes_per_sec
+        elif self.total_rows and rows_per_sec:
+            eta = max(self.total_rows - self.rows, 0) / rows_per_sec
+            
+        return Progress(self.bytes, self.total_bytes, self.rows,
+            self.total_rows, seconds, bytes_per_sec, rows_per_sec, eta,
+            self.done)
+        
+    def read(self, size=-1):
+        return self._update(super(ProgressReader, self).read(size))
+
+    def readline(self, size=-1):
+        return self._update(super(ProgressReader, self).readline(size))
+        
+class ProgressBar(object):
+    '''
+    Progress callback which draws a progress bar
+    
+    Args:
+        name:   str
+                Label shown before the bar
+        file:   File-like object (default: sys.stderr)
+        width:  int (default: 30)
+                Width of the bar in characters
+    '''
+    
+    def __init__(self, name=None, file=None, width=30):
+        self.name = name
+        self.file = file or sys.stderr
+        self.width = width
+        self.length = 0
+        
+    def __call__(self, progress):
+        parts = [self.name] if self.name else []
+        
+        if progress.total_bytes:
+            done = min(progress.bytes / progress.total_bytes, 1)
+        elif progress.total_rows:
+            done = min(progress.rows / progress.total_rows, 1)
+        else:
+            done = None
+            
+        if done is not None:
+            filled = int(done * self.width)
+            parts.append('[{}{}] {:5.1f}%'.format('#' * filled,
+                ' ' * (self.width - filled), 100 * done))
+            
+        parts.append('{:,} rows {:.1f} MB ({:.1f} MB/s)'.format(progress.rows,
+            progress.bytes / 1e6, progress.bytes_per_sec / 1e6))
+        
+        if progress.done:
+            parts.append('in {}'.format(_format_seconds(progress.seconds)))
+        elif progress.eta is not None:
+            parts.append('ETA {}'.format(_format_seconds(progress.eta)))
+            
+        # Pad with spaces to cover up a longer previous line
+        line = ' '.join(parts)
+        self.file.write('\r' + line.ljust(self.length) + ('\n' if \
+            progress.done else ''))
+        self.file.flush()
+        self.length = 0 if progress.done else len(line)
+        
+def _format_seconds(seconds):
+    return str(datetime.timedelta(seconds=int(seconds)))
+
+def copy_reader(file, progress=None, name=None, total_bytes=None,
+    total_rows=None):
+    '''
+    Wrap a file-like object handed to COPY
+    
+    Args:
+        progress:   None, True, or function
+                    None:       Only count bytes (a `CountingReader`)
+                    True:       Show a `ProgressBar`
+                    function:   Progress callback
+    '''
+    
+    if not progress:
+        return CountingReader(file)
+    elif progress is True:
+        progress = ProgressBar(name)
+        
+    return ProgressReader(file, progress, total_bytes=total_bytes,
+        total_rows=total_rows)
@@ -0,0 +1,119 @@
+'''
+Pipelined File-Like Objects
+============================
+COPY FROM reads its input with repeated `read()` calls. `PipelinedReader`
+is a file-like object whose data is produced by a background thread, so
+formatting the next batch of rows overlaps with the driver sending the
+previous one over the network (and the server ingesting it).
+
+ * The producer is any iterable of strings (or bytes)
+ * At most `maxsize` produced blocks are buffered at a time, so memory
+   use stays bounded no matter how large the input is
+ * Exceptions raised by the producer are re-raised by `read()`
+'''
+
+import queue
+import threading
+
+class PipelinedReader(object):
+    '''
+    Read-only file-like object over blocks produced in a background thread
+
+    Args:
+        blocks:     iterable
+                    Iterable of str or bytes, consumed in a separate thread
+        maxsize:    int (default: 4)
+                    Maximum number of blocks waiting to be read
+    '''
+
+    # Sentinel marking the end of the producer's output
+    _END = object()
+
+    def __init__(self, blocks, maxsize=4):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.stopped = threading.Event()
+        self.error = None
+        self.block = None
+        self.pos = 0
+        self.eof = False
+
+        self.thread = threading.Thread(target=self._produce, args=(blocks,),
+            daemon=True)
+        self.thread.start()
+
+    def _put(self, item):
+        ''' Put an item in the queue unless the reader was closed '''
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def _produce(self, blocks):
+        try:
+            for block in blocks:
+                if block and not self._put(block):
+                    return
+        except BaseException as e:
+            self.error = e
+
+        self._put(self._END)
+
+    def _next_block(self):
+        ''' Wait for the next block, returning False if there are no more '''
+        item = self.queue.get()
+
+        if item is self._END:
+            self.eof = True
+            self.thread.join()
+
+            if self.error:
+                raise self.error
+            return False
+
+        self.block = item
+        self.pos = 0
+        return True
+
+    def read(self, size=-1):
+        ''' Return at most size characters (all remaining data if size < 0) '''
+
+        if size is None or size < 0:
+            parts = [] if self.block is None else [self.block[self.pos:]]
+            while not self.eof and self._next_block():
+                parts.append(self.block)
+
+            self.block = None
+            return parts[0][:0].join(parts) if parts else ''
+
+        if self.block is None or self.pos >= len(self.block):
+            if self.eof or not self._next_block():
+                return self.block[:0] if self.block is not None else ''
+
+        data = self.block[self.pos: self.pos + size]
+        self.pos += size
+        return data
+
+    def readable(self):
+        return True
+
+    def close(self):
+        ''' Stop the producer and discard anything still buffered '''
+        self.stopped.set()
+
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
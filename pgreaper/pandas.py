@@ -18,15 +18,39 @@ The `copy_df()` function also supports any keyword arguments that
 
 Details
 --------
-The `copy_df()` function simply converts a DataFrame into PGReaper's `Table` object and then calls `table_to_pg()`. This implies that new tables are populated using `COPY FROM` while existing tables are modified using `INSERT INTO`.
+When the destination table does not exist yet, `copy_df()` maps the
+DataFrame's dtypes to Postgres types (see `NUMPY_TO_PG`), creates the table,
+and streams the DataFrame's CSV output straight into `COPY FROM` without
+building an intermediate `Table`. Only `object` columns are scanned to
+infer their types.
+
+DataFrames that don't fit comfortably in memory can be loaded 
+incrementally, either by passing `chunksize` or by passing an iterator
+of DataFrames (e.g. from `read_csv(chunksize=...)`).
+
+If the destination table already exists, the DataFrame is converted
+into PGReaper's `Table` object and passed to `table_to_pg()`. This implies
+that new tables are populated using `COPY FROM` while existing tables
+are modified using `INSERT INTO`.
 '''
 
+# How missing values are written when COPYing DataFrames (a text value 
+# which is exactly this string is also loaded as NULL)
+DF_NULL = '\\N'
+
 from pgreaper._globals import import_package
+from .core import ColumnList
+from .core.schema import NUMPY_TO_PG, PY_TYPES, POSTGRES_COMPAT
 from .core.table import Table
 from .postgres import table_to_pg
 from .postgres.conn import postgres_connect
+from .postgres.database import create_table, get_table_schema
+from .postgres.drivers import get_driver
+from .instrument import LoadReport, copy_reader
 
+from io import StringIO
 import functools
+import json
 pandas = import_package('pandas')
     
 def _assert_pandas(func):
@@ -39,14 +63,47 @@ def _assert_pandas(func):
             
     return inner
     
+def _to_series(values, pg_type):
+    '''
+    Convert a list of column values to a pandas Series according
+    to the column's Postgres type
+     * Integer and boolean columns with missing values use pandas'
+       nullable dtypes
+    '''
+    
+    has_nulls = None in values
+    
+    try:
+        if pg_type in ('bigint', 'integer', 'smallint'):
+            return pandas.Series(values, dtype='Int64' if has_nulls else 'int64')
+        elif pg_type in ('double precision', 'real'):
+            return pandas.Series(values, dtype='float64')
+        elif pg_type == 'boolean':
+            return pandas.Series(values, dtype='boolean' if has_nulls else 'bool')
+        elif pg_type.startswith('timestamp'):
+            return pandas.Series(pandas.to_datetime(values))
+    except (OverflowError, TypeError, ValueError):
+        # e.g. Integers too big for int64 or mixed timezones
+        pass
+        
+    return pandas.Series(values, dtype='object')
+
 @_assert_pandas
 def table_to_pandas(table):
-    ''' Takes a Table or PgTable and returns a pandas DataFrame '''
+    '''
+    Takes a Table or PgTable and returns a pandas DataFrame
+     * DataFrame columns are built directly from the Table's column types
+       instead of having pandas infer types from a list of rows
+    '''
+    
+    table.guess_type()
+    df = pandas.DataFrame({
+        i: _to_series([row[i] for row in table], pg_type) for i, pg_type \
+        in enumerate(table.columns.col_types_no_pkey)})
     
-    return pandas.DataFrame(
-        data = list(table),
-        columns = table.col_names
-    )
+    # Set names afterwards in case of duplicate column names
+    df.columns = table.col_names
+    return df
     
 @_assert_pandas
 def pandas_to_table(df, dialect='postgres', mutable=True):
@@ -58,40 +115,226 @@ def pandas_to_table(df, dialect='postgres', mutable=True):
     '''
     
     col_names = df.columns.values.tolist()
+    
+    # Series.tolist() converts whole columns to Python objects at once,
+    # which is much cheaper than boxing every row with itertuples()
+    columns = [df.iloc[:, i].tolist() for i in range(0, len(col_names))]
+    
+    if mutable:
+        row_values = [list(row) for row in zip(*columns)]
+    else:
+        row_values = list(zip(*columns))
+    
     new_table = Table(dialect=dialect,
         col_names=col_names,
+        row_values=row_values,
         name="pandas DataFrame")
-    
-    for row in df.itertuples(index=False):
-        if mutable:
-            new_table.append(list(row))
-        else:
-            new_table.append(row)
             
     new_table.guess_type()
     return new_table
+    
+def _guess_object_type(series):
+    '''
+    Infer the Postgres type of an object column using the same 
+    compatibility rules as Table.guess_type()
+    '''
+    
+    pg_type = None
+    
+    for type_ in set(type(i) for i in series.dropna()):
+        new_type = PY_TYPES['postgres'][type_.__name__]
+        
+        if pg_type is None:
+            pg_type = new_type
+        else:
+            pg_type = POSTGRES_COMPAT[new_type][pg_type]
+            
+    if (pg_type is None) or (pg_type == 'null'):
+        return 'text'
+    
+    return pg_type
+    
+def _dtypes_to_pg(df):
+    ''' Map the dtypes of a DataFrame to a list of Postgres types '''
+    
+    col_types = []
+    
+    for i in range(0, len(df.columns)):
+        dtype = df.dtypes.iloc[i]
+        
+        if dtype.kind == 'M':
+            if getattr(dtype, 'tz', None):
+                col_types.append('timestamp with time zone')
+            else:
+                col_types.append('timestamp')
+        elif dtype.name.lower() in NUMPY_TO_PG:
+            # Lowercase so nullable extension types (e.g. 'Int64') also match
+            col_types.append(NUMPY_TO_PG[dtype.name.lower()])
+        else:
+            col_types.append(_guess_object_type(df.iloc[:, i]))
+            
+    return col_types
+    
+def _df_to_csv(df, col_types):
+    '''
+    Return a DataFrame as a StringIO object for writing via copy()
+     * Missing values are written as `DF_NULL`, so they aren't confused
+       with empty strings
+     * jsonb columns are JSON encoded
+     * Float columns headed for integer columns (e.g. a later chunk with
+       missing values) are written as integers
+    '''
+    
+    jsonb_cols = [i for i, j in enumerate(col_types) if j == 'jsonb']
+    int_cols = [i for i, j in enumerate(col_types) if \
+        j in ('smallint', 'integer', 'bigint') and df.dtypes.iloc[i].kind == 'f']
+    
+    if jsonb_cols or int_cols:
+        dict_encoder = json.JSONEncoder()
+        df = df.copy(deep=False)
+        
+        for i in jsonb_cols:
+            df.isetitem(i, df.iloc[:, i].map(
+                lambda x: None if x is None else dict_encoder.encode(x)))
+        for i in int_cols:
+            df.isetitem(i, df.iloc[:, i].astype('Int64'))
+    
+    string = StringIO()
+    df.to_csv(string, header=False, index=False, na_rep=DF_NULL)
+    string.seek(0)
+    return string
+    
+def _iter_chunks(df, chunksize=None):
+    '''
+    Yield DataFrames from a DataFrame or an iterable of DataFrames
+     * If chunksize is specified, DataFrames are further split into slices
+       of at most chunksize rows
+    '''
+    
+    if isinstance(df, pandas.DataFrame):
+        if chunksize:
+            # Always yield at least once so empty DataFrames create a table
+            for i in range(0, max(len(df), 1), chunksize):
+                yield df.iloc[i: i + chunksize]
+        else:
+            yield df
+    else:
+        for chunk in df:
+            yield from _iter_chunks(chunk, chunksize)
+    
+def _create_df_table(df, name, p_key=None, conn=None):
+    '''
+    Create a table from a DataFrame's dtypes and return its ColumnList
+     * Column names are sanitized
+    '''
+    
+    columns = ColumnList(
+        col_names=[str(i) for i in df.columns.values.tolist()],
+        col_types=_dtypes_to_pg(df),
+        p_key=p_key)
+    new_table = Table(name=name, dialect='postgres', columns=columns)
+    
+    conn.cursor().execute(create_table(new_table))
+    return ColumnList(
+        col_names=new_table.col_names_sanitized,
+        col_types=columns.col_types_no_pkey)
+    
+def _copy_df(df, name, columns, conn, counts=None, progress=None):
+    '''
+    COPY a DataFrame into a table created by _create_df_table()
+     * Does not auto-commit
+     * If counts (a pgreaper.instrument.Phase) is specified, record the
+       number of rows and characters sent to Postgres
+     * progress: See `copy_table()`
+    '''
+    
+    copy_from = ("COPY {0} ({1}) FROM STDIN (FORMAT csv, DELIMITER ',', "
+        "NULL '{2}')").format(name, ', '.join(columns.col_names), DF_NULL)
+    
+    reader = copy_reader(_df_to_csv(df, columns.col_types), progress,
+        name=name, total_rows=len(df))
+    rows = get_driver(conn).copy_in(conn, copy_from, reader)
+    
+    if counts is not None:
+        counts.rows = rows
+        counts.bytes = reader.bytes
 
 @_assert_pandas
 @postgres_connect
-def copy_df(df, name, p_key=None, conn=None, **kwargs):
+def copy_df(df, name, p_key=None, chunksize=None, conn=None, **kwargs):
     '''
     Upload a pandas DataFrame to a PostgreSQL database
-     * This function uses PGReaper's schema inference procedures instead
-       of the DataFrame's dtypes
+     * New tables are created from the DataFrame's dtypes, and only 
+       `object` columns go through PGReaper's schema inference
+     * If the table already exists, the DataFrame is converted into a 
+       Table and loaded with `table_to_pg()`
+     * All chunks are loaded in one transaction
+     
+    **Loading DataFrames Larger than Memory**
+    
+     >>> import pandas
+     >>> import pgreaper
+     >>> chunks = pandas.read_csv('huge_file.csv', chunksize=100000)
+     >>> pgreaper.copy_df(chunks, name='huge_table', dbname='postgres')
+     
+    .. note:: When loading a new table in chunks, column types are
+       determined from the first chunk
 
     Args:
-        df:       pandas DataFrame
-                  A pandas DataFrame
-        name:     str
-                  Name of table to create
-        p_key:    int, str, or tuple
-                  Position or name of the primary key column. A tuple specifies a 
-                  composite primary key        
+        df:         pandas DataFrame or iterable of DataFrames
+                    A pandas DataFrame, or an iterator of DataFrames such as the 
+                    one returned by `read_csv(chunksize=...)`
+        name:       str
+                    Name of table to create
+        p_key:      int, str, or tuple
+                    Position or name of the primary key column. A tuple specifies a 
+                    composite primary key        
+        chunksize:  int (default: None)
+                    Serialize and load DataFrames in slices of at most 
+                    this many rows
+        hooks:      list (default: None)
+                    Functions called at the start and end of every phase
+                    of the load (see `pgreaper.add_hook()`)
+        progress:   None, True, or function (default: None)
+                    Show a progress bar or call a progress callback
+                    (see `copy_table()`)
+                    
+    Returns:
+        A `LoadReport` with timings for each phase of the load
     '''
     
-    table = pandas_to_table(df, dialect='postgres', mutable=True)
+    commit = kwargs.pop('commit', True)
+    report = LoadReport(name, hooks=kwargs.get('hooks'))
+    columns = None      # Set if this function created the table
     
-    if p_key:
-        table.p_key = p_key
+    for i, chunk in enumerate(_iter_chunks(df, chunksize)):
+        if i == 0:
+            with report.phase('schema'):
+                schema = get_table_schema(name, conn=conn)
+            
+            if not schema:
+                with report.phase('ddl'):
+                    columns = _create_df_table(chunk, name=name, p_key=p_key,
+                        conn=conn)
+                
+        if columns:
+            with report.phase('copy') as counts:
+                _copy_df(chunk, name=name, columns=columns, conn=conn,
+                    counts=counts, progress=kwargs.get('progress'))
+        else:
+            with report.phase('convert'):
+                table = pandas_to_table(chunk, dialect='postgres',
+                    mutable=True)
+            
+            if p_key:
+                table.p_key = p_key
+                
+            report.update(table_to_pg(table, name=name, null_values='nan',
+                conn=conn, find_rejects=False, commit=False, **kwargs))
+            
+    if commit:
+        with report.phase('commit'):
+            conn.commit()
+        conn.close()
         
-    table_to_pg(table, name=name, null_values='nan', conn=conn, find_rejects=False, **kwargs)
\ No newline at end of file
+    return report
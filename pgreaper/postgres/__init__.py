@@ -2,4 +2,6 @@ from .loader import copy_table, table_to_pg
 from .conn import postgres_connect
 from .csv_loader import copy_csv
 from .json_loader import copy_json
-from .database import *
\ No newline at end of file
+from .html_loader import copy_html
+from .database import *
+from .export import pg_to_csv_parallel
\ No newline at end of file
@@ -0,0 +1,330 @@
+'''
+Asynchronous Drivers
+=====================
+Drivers used by `pgreaper.aio`. They implement the same methods as the
+synchronous drivers in `pgreaper.postgres.drivers`, but as coroutines,
+and their `copy_in()` also accepts an iterable or an asynchronous
+iterable of blocks of data.
+
+ * psycopg: psycopg 3's AsyncConnection (default)
+ * asyncpg
+
+This module needs Python 3.6 or later (for asynchronous generators), so
+it's only imported by `pgreaper.aio`.
+'''
+
+from pgreaper._globals import import_package
+from .drivers import COLUMNS_QUERY, PKEY_QUERY, PsycopgDriver, _blocks, \
+    _lookup
+
+from io import TextIOBase
+import re
+psycopg = import_package('psycopg')
+asyncpg = import_package('asyncpg')
+
+def _encode(block):
+    ''' Return a block of COPY data as bytes '''
+    if isinstance(block, str):
+        return block.encode('utf-8')
+    return bytes(block)
+    
+async def _async_blocks(file):
+    ''' Like `_blocks()`, but also accepts an asynchronous iterable '''
+    if hasattr(file, '__aiter__'):
+        async for block in file:
+            yield block
+    else:
+        for block in _blocks(file):
+            yield block
+
+def _copy_rows(status):
+    ''' Number of rows in a command tag like 'COPY 42' '''
+    try:
+        return int(status.split()[-1])
+    except (AttributeError, IndexError, ValueError):
+        return -1
+
+COPY_FROM = re.compile(r'''^\s*COPY\s+(?P<table>[\w."]+)\s*
+    (?:\((?P<columns>[^)]*)\))?\s+FROM\s+STDIN\s*(?:WITH\s*)?
+    (?P<options>.*?)\s*;?\s*$''', re.I | re.S | re.X)
+COPY_TO = re.compile(r'''^\s*COPY\s+(?:\((?P<query>.*)\)|(?P<table>[\w."]+)
+    \s*(?:\((?P<columns>[^)]*)\))?)\s+TO\s+STDOUT\s*(?:WITH\s*)?
+    (?P<options>.*?)\s*;?\s*$''', re.I | re.S | re.X)
+
+# Options in parentheses, e.g. (FORMAT csv, NULL '', FORCE_NULL (a, b))
+COPY_OPTION = re.compile(r"(\w+)(?:\s+('(?:[^']|'')*'|\([^)]*\)|\w+))?")
+
+# Options in the old syntax, e.g. CSV HEADER DELIMITER AS ','
+COPY_OPTION_OLD = re.compile(r"(\w+)(?:\s+AS)?(?:\s+('(?:[^']|'')*'))?", re.I)
+
+def _identifier(name):
+    ''' Unquote an identifier, or fold it to lowercase like Postgres '''
+    if name.startswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name.lower()
+
+def _copy_options(options):
+    '''
+    Convert the options of a COPY statement, e.g. "(FORMAT csv, HEADER)"
+    or "CSV HEADER", to keyword arguments for asyncpg's COPY methods
+    '''
+
+    kwargs = {}
+
+    if options.startswith('('):
+        matches = COPY_OPTION.findall(options[1:-1])
+    else:
+        matches = COPY_OPTION_OLD.findall(options)
+
+    for name, value in matches:
+        name = name.lower()
+
+        if (not value) and (name in ('csv', 'binary')):
+            kwargs['format'] = name
+        elif not value:
+            kwargs[name] = True
+        elif value.startswith("'"):
+            kwargs[name] = value[1:-1].replace("''", "'")
+        elif value.startswith('('):
+            kwargs[name] = [_identifier(i.strip()) for i in \
+                value[1:-1].split(',')]
+        elif name == 'format':
+            kwargs[name] = value.lower()
+        else:
+            kwargs[name] = value.lower() not in ('false', 'off', '0')
+
+    return kwargs
+
+def _copy_target(match):
+    ''' Return keyword arguments for the table (and columns) of a COPY '''
+
+    kwargs = {}
+    table = match.group('table').split('.')
+
+    if len(table) > 1:
+        kwargs['schema_name'] = _identifier(table[0])
+    kwargs['table_name'] = _identifier(table[-1])
+
+    if match.group('columns'):
+        kwargs['columns'] = [_identifier(i.strip()) for i in \
+            match.group('columns').split(',')]
+
+    return kwargs
+
+class AsyncPsycopgDriver(PsycopgDriver):
+    ''' Asynchronous driver for psycopg 3 '''
+
+    @property
+    def connection_class(self):
+        return psycopg.AsyncConnection
+
+    async def connect(self, **kwargs):
+        self.assert_installed()
+        return await psycopg.AsyncConnection.connect(client_encoding='utf8',
+            **{k: v for k, v in kwargs.items() if v is not None})
+
+    async def execute(self, conn, sql, params=None):
+        cur = conn.cursor()
+        await cur.execute(sql, params)
+        return cur
+
+    async def fetch(self, conn, sql, params=None):
+        cur = await self.execute(conn, sql, params)
+        return [tuple(row) for row in await cur.fetchall()]
+
+    async def get_columns(self, conn, name):
+        return await self.fetch(conn, COLUMNS_QUERY.format('%s'), (name,))
+
+    async def get_pkey(self, conn, name):
+        rows = await self.fetch(conn, PKEY_QUERY.format('%s'), (name,))
+        return rows[0] if rows else None
+
+    async def copy_in(self, conn, copy_stmt, file):
+        cur = conn.cursor()
+
+        async with cur.copy(copy_stmt) as copy:
+            async for block in _async_blocks(file):
+                await copy.write(block)
+
+        return cur.rowcount
+
+    async def copy_out(self, conn, copy_stmt, file):
+        text = isinstance(file, TextIOBase)
+        cur = conn.cursor()
+
+        async with cur.copy(copy_stmt) as copy:
+            async for block in copy:
+                if text:
+                    file.write(bytes(block).decode(conn.info.encoding))
+                else:
+                    file.write(block)
+
+        return cur.rowcount
+
+    async def stream(self, conn, sql, name, itersize):
+        '''
+        Execute a query with a server-side cursor and yield its column
+        names followed by lists of at most itersize rows
+         * If name is None, a regular cursor is used instead
+        '''
+
+        # Named cursors need WITH HOLD outside of a transaction
+        cur = conn.cursor(name=name, withhold=conn.autocommit)
+
+        try:
+            await cur.execute(sql)
+            yield [col.name for col in cur.description]
+
+            while True:
+                rows = await cur.fetchmany(itersize)
+
+                if not rows:
+                    break
+
+                yield [list(row) for row in rows]
+        finally:
+            await cur.close()
+
+    async def commit(self, conn):
+        await conn.commit()
+
+    async def close(self, conn):
+        await conn.close()
+
+class AsyncpgDriver(object):
+    '''
+    Asynchronous driver for asyncpg
+     * asyncpg connections do not implicitly open transactions, so
+       `commit()` is a no-op unless the caller manages a transaction
+     * asyncpg doesn't run COPY statements directly, so they're translated
+       into calls to its COPY methods (only FROM STDIN and TO STDOUT
+       statements with a table, column list, or query are supported)
+    '''
+
+    name = 'asyncpg'
+    module = asyncpg
+
+    def is_connection(self, conn):
+        return bool(asyncpg) and isinstance(conn, asyncpg.Connection)
+
+    async def connect(self, dbname=None, **kwargs):
+        if not asyncpg:
+            raise ImportError('The asyncpg package must be installed to use '
+                'this driver.')
+
+        kwargs['database'] = dbname
+        return await asyncpg.connect(**{k: v for k, v in kwargs.items() \
+            if v is not None})
+
+    async def execute(self, conn, sql, params=None):
+        if params:
+            return await conn.execute(sql, *params)
+        return await conn.execute(sql)
+
+    async def fetch(self, conn, sql, params=()):
+        return [tuple(row) for row in await conn.fetch(sql, *params)]
+
+    async def get_columns(self, conn, name):
+        return await self.fetch(conn, COLUMNS_QUERY.format('$1').replace(
+            '%%', '%'), (name,))
+
+    async def get_pkey(self, conn, name):
+        rows = await self.fetch(conn, PKEY_QUERY.format('$1'), (name,))
+        return rows[0] if rows else None
+
+    async def copy_in(self, conn, copy_stmt, file):
+        '''
+        asyncpg's COPY methods build their own statements, so copy_stmt
+        is parsed into the arguments of `copy_to_table()`
+        '''
+
+        match = COPY_FROM.match(copy_stmt)
+        if not match:
+            raise ValueError('Not a COPY FROM STDIN statement: {}'.format(
+                copy_stmt))
+
+        async def blocks():
+            async for block in _async_blocks(file):
+                yield _encode(block)
+
+        kwargs = _copy_target(match)
+        kwargs.update(_copy_options(match.group('options')))
+        return _copy_rows(await conn.copy_to_table(source=blocks(),
+            **kwargs))
+
+    async def copy_out(self, conn, copy_stmt, file):
+        ''' See `copy_in()` '''
+
+        match = COPY_TO.match(copy_stmt)
+        if not match:
+            raise ValueError('Not a COPY TO STDOUT statement: {}'.format(
+                copy_stmt))
+
+        text = isinstance(file, TextIOBase)
+
+        async def write(block):
+            file.write(block.decode('utf-8') if text else block)
+
+        kwargs = _copy_options(match.group('options'))
+
+        if match.group('query'):
+            status = await conn.copy_from_query(match.group('query'),
+                output=write, **kwargs)
+        else:
+            kwargs.update(_copy_target(match))
+            status = await conn.copy_from_table(output=write, **kwargs)
+
+        return _copy_rows(status)
+
+    async def stream(self, conn, sql, name, itersize):
+        ''' See `AsyncPsycopgDriver.stream()` '''
+
+        if name is None:
+            statement = await conn.prepare(sql)
+            yield [col.name for col in statement.get_attributes()]
+            rows = await statement.fetch()
+
+            for i in range(0, len(rows), itersize):
+                yield [list(row) for row in rows[i: i + itersize]]
+            return
+
+        # Cursors can only be used inside of a transaction
+        transaction = None
+        if not conn.is_in_transaction():
+            transaction = conn.transaction()
+            await transaction.start()
+
+        try:
+            statement = await conn.prepare(sql)
+            yield [col.name for col in statement.get_attributes()]
+            cur = await statement.cursor()
+
+            while True:
+                rows = await cur.fetch(itersize)
+
+                if not rows:
+                    break
+
+                yield [list(row) for row in rows]
+        finally:
+            if transaction:
+                await transaction.rollback()
+
+    async def commit(self, conn):
+        pass
+
+    async def close(self, conn):
+        await conn.close()
+
+    def __repr__(self):
+        return '<{} driver>'.format(self.name)
+
+DEFAULT_ASYNC_DRIVER = 'psycopg'
+ASYNC_DRIVERS = {
+    'psycopg': AsyncPsycopgDriver(),
+    'asyncpg': AsyncpgDriver()
+}
+
+def get_async_driver(conn=None, name=None):
+    ''' Like `get_driver()` but for asynchronous drivers '''
+    return _lookup(ASYNC_DRIVERS, conn, name)
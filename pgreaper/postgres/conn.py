@@ -12,7 +12,8 @@ Argument structure for any function that needs to connect to a Postgres database
  * Other arguments: **kwargs
   * database, username, password, host
   
-Function can always expect the local variable `conn` to be a psycopg2 connection.
+Function can always expect the local variable `conn` to be a connection
+supported by one of the drivers in `drivers.py` (psycopg2 by default).
 Decorators will be implemented to ensure this.
   
 User can:
@@ -25,6 +26,7 @@ However, conn is mutually exclusive with other arguments
 '''
 
 from pgreaper.config import PG_DEFAULTS
+from .drivers import DEFAULT_DRIVER, get_driver
     
 from inspect import signature
 import copy
@@ -41,27 +43,27 @@ def postgres_connect_default():
 def postgres_connect(func):
     '''
     Makes sure the local variable `conn` in all functions this decorates
-    is a usable psycopg2 connection
+    is a usable connection
+     * The keyword argument `driver` chooses the driver used for new
+       connections (default: psycopg2)
     '''
        
     # Keyword arguments which indicate user wants to connect to a Postgres database
     pg_conn_args = set(['dbname', 'user', 'password', 'host'])
        
-    def connect(dbname, user, password, host):
+    def connect(dbname, user, password, host, driver=DEFAULT_DRIVER):
+        driver = get_driver(name=driver)
+        
         try:
-            with psycopg2.connect(
-                "dbname={0} user={1} password={2} host={3}".format(
-                dbname, user, password, host)) as conn:
-                return conn
-        except psycopg2.OperationalError:
+            return driver.connect(dbname=dbname, user=user,
+                password=password, host=host)
+        except driver.module.OperationalError:
             # Database doesn't exist --> Create it
             base_conn = postgres_connect_default()
             base_conn.execute('CREATE DATABASE {0}'.format(dbname))
             
-            with psycopg2.connect(
-                "dbname={0} user={1} password={2}".format(
-                dbname, user, password)) as conn:
-                return conn
+            return driver.connect(dbname=dbname, user=user,
+                password=password)
     
     @functools.wraps(func)
     def inner(*args, **kwargs):       
@@ -70,15 +72,15 @@ def postgres_connect(func):
         f_args.apply_defaults()
         conn_arg = f_args.arguments['conn']
     
-        if isinstance(conn_arg, psycopg2.extensions.connection):
+        if get_driver(conn_arg):
             return func(*args, **kwargs)
         else:
             if set(kwargs.keys()).intersection(pg_conn_args):
-                return func(conn=connect(**PG_DEFAULTS(**kwargs)),
-                    *args, **kwargs)
+                return func(conn=connect(driver=kwargs.get('driver',
+                    DEFAULT_DRIVER), **PG_DEFAULTS(**kwargs)), *args, **kwargs)
             else:
-                raise ValueError("Must either pass in a psycopg2 connection"
-                " object, or describe one or more of 'dbname', 'host',"
-                "'user', 'password'.")
+                raise ValueError("Must either pass in a connection object "
+                "(e.g. from psycopg2.connect()), or describe one or more of "
+                "'dbname', 'host', 'user', 'password'.")
   
     return inner
\ No newline at end of file
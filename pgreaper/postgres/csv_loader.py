@@ -1,18 +1,20 @@
 from pgreaper._globals import preprocess
 from pgreaper.core import Table, ColumnList
+from pgreaper.instrument import LoadReport, copy_reader
 from pgreaper.io import zip
 from .conn import postgres_connect
 from .database import _create_table, get_table_schema
+from .drivers import get_driver
 
 from csvmorph import to_csv, dtypes
-import psycopg2
 import csv
 import os
 
 @preprocess
 @postgres_connect
 def copy_csv(file, name, encoding=None, header=0, subset=[],
-    verbose=True, conn=None, compression=None, skiplines=0, **kwargs):
+    conn=None, compression=None, skiplines=0, hooks=None, progress=None,
+    **kwargs):
     '''
     Uploads a CSV (or other delimited-separated values) file to PostgreSQL.
     The delimiter is automatically inferred, so this function can be used to
@@ -52,9 +54,20 @@ def copy_csv(file, name, encoding=None, header=0, subset=[],
                          * No header should be specified with `header=False` or `header=None`                    
         skiplines:      int (default: 0)
                         How many lines after the header to skip  
+        progress:       None, True, or function (default: None)
+                        True shows a progress bar while copying, and a
+                        function is called periodically with a `Progress`
+                        tuple (see `pgreaper.instrument`)
+        hooks:          list (default: None)
+                        Functions called at the start and end of every 
+                        phase of the load (see `pgreaper.add_hook()`)
+                        
+    Returns:
+        A `LoadReport` with timings for each phase of the load
     '''
     
     cur = conn.cursor()
+    report = LoadReport(name, hooks=hooks)
 
     # COPY statement
     if encoding:
@@ -66,8 +79,10 @@ def copy_csv(file, name, encoding=None, header=0, subset=[],
                       "HEADER, DELIMITER ',')").format(name)
     
     # Clean the CSV and calculate statistics
-    csv_meta = to_csv(filename=file, output=file + '_temp.csv', header=header,
-        compression=compression, columns=subset, skiplines=skiplines)
+    with report.phase('clean'):
+        csv_meta = to_csv(filename=file, output=file + '_temp.csv',
+            header=header, compression=compression, columns=subset,
+            skiplines=skiplines)
     col_names = csv_meta['col_names']
     schema = csv_meta['dtypes']
 
@@ -84,13 +99,22 @@ def copy_csv(file, name, encoding=None, header=0, subset=[],
     
     with zip.open(file + '_temp.csv', mode='rb') as temp_file:
         # Clean column names and create table
-        cols = ColumnList(col_names, col_types)
-        cur.execute(_create_table(
-            name, col_names=cols.sanitize(), col_types=col_types))
+        with report.phase('ddl'):
+            cols = ColumnList(col_names, col_types)
+            cur.execute(_create_table(
+                name, col_names=cols.sanitize(), col_types=col_types))
 
         # COPY
-        cur.copy_expert(copy_stmt, temp_file)
+        with report.phase('copy') as counts:
+            reader = copy_reader(temp_file, progress, name=name,
+                total_bytes=os.path.getsize(file + '_temp.csv'))
+            counts.rows = get_driver(conn).copy_in(conn, copy_stmt, reader)
+            counts.bytes = reader.bytes
     
-    os.remove(file + '_temp.csv')    
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    os.remove(file + '_temp.csv')
+    
+    with report.phase('commit'):
+        conn.commit()
+    conn.close()
+    
+    return report
\ No newline at end of file
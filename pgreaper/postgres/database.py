@@ -4,16 +4,46 @@ from pgreaper._globals import PGREAPER_PATH
 from pgreaper.core import ColumnList
 from pgreaper.core.table import Table
 from .conn import postgres_connect
+from .drivers import get_driver
 
 from collections import deque, namedtuple
-from psycopg2 import sql, extras
-import psycopg2
+from io import StringIO
+import itertools
 import os
+import re
 import sys
 import csv
 
 SQL_DIR = os.path.join(PGREAPER_PATH, 'plpgsql')
 
+# Used to give each server-side cursor a unique name
+_CURSOR_IDS = itertools.count()
+
+# Statements which can be used in DECLARE CURSOR
+_CURSOR_STATEMENTS = re.compile(r'^[\s(]*(SELECT|VALUES|WITH|TABLE)\b', re.I)
+
+# Backslash sequences used by COPY TO's text format
+_COPY_ESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t',
+    'v': '\v'}
+_COPY_ESCAPE_RE = re.compile(r'\\(.)')
+
+# Types whose COPY text output can be converted by builtins
+_COPY_BUILTINS = {
+    20: int,        # bigint
+    21: int,        # smallint
+    23: int,        # integer
+    700: float,     # real
+    701: float,     # double precision
+}
+
+# Types whose COPY text output only needs to be unescaped
+_COPY_TEXT = set([
+    19,             # name
+    25,             # text
+    1042,           # character
+    1043,           # character varying
+])
+
 def load_sql(filename, conn):
     ''' Load SQL statements from a file in the plpgsql directory '''
     with open(os.path.join(SQL_DIR, filename + '.sql'), mode='r') as infile:
@@ -83,21 +113,21 @@ def get_schema(conn=None, columns=True, **kwargs):
     
     if columns:
         cur = conn.cursor()
-        cur.execute(sql.SQL('''
+        cur.execute('''
             SELECT table_name, column_name, data_type
             FROM information_schema.columns
             WHERE table_schema LIKE '%public%'
-        '''))
+        ''')
         return Table(
             dialect='postgres',
             name="Schema",
             col_names=["Table Name", "Column Name", "Data Type"],
             row_values=[list(i) for i in cur.fetchall()])
     else:
-        tables = read_pg(sql.SQL('''
+        tables = read_pg('''
             SELECT table_name from information_schema.tables
             WHERE table_schema LIKE '%public%'
-        '''), conn=conn)
+        ''', conn=conn)
         return tables['table_name']
         
 @postgres_connect
@@ -112,26 +142,12 @@ def get_pkey(table, conn=None, **kwargs):
     '''
     
     p_key = namedtuple('PrimaryKey', ['column', 'type'])
-    cur = conn.cursor()
+    data = get_driver(conn).get_pkey(conn, table)
     
-    try:
-        cur.execute(sql.SQL('''
-            SELECT a.attname, format_type(a.atttypid, a.atttypmod) AS data_type
-            FROM   pg_index i
-            JOIN   pg_attribute a ON a.attrelid = i.indrelid
-                                 AND a.attnum = ANY(i.indkey)
-            WHERE  i.indrelid = {}::regclass
-            AND    i.indisprimary;
-        ''').format(
-            sql.Literal(table)))
-        
-        data = cur.fetchall()[0]
+    if data:
         return p_key(column=data[0], type=data[1])
-    except IndexError:
-        return None
-    except (psycopg2.ProgrammingError, psycopg2.InternalError) as e:
-        conn.rollback()
-        return None
+    
+    return None
         
 @postgres_connect
 def get_primary_keys(table, conn) -> str:
@@ -178,19 +194,21 @@ def pg_to_csv(name, file=None, verbose=True, conn=None, **kwargs):
     if not file:
         file = name + '.csv'
     
-    cur = conn.cursor()
+    driver = get_driver(conn)
     
     with open(file, mode='w') as outfile:
         try:
             # Use this for regular tables
-            cur.copy_expert('''
+            driver.copy_out(conn, '''
                 COPY {} TO STDOUT WITH CSV HEADER
                 '''.format(name),
                 file=outfile)
-        except psycopg2.ProgrammingError:
+        except driver.module.ProgrammingError:
             # Need to use this form of COPY TO for views
             conn.rollback()
-            cur.copy_expert('''
+            outfile.seek(0)
+            outfile.truncate()
+            driver.copy_out(conn, '''
                 COPY (SELECT * FROM {}) TO STDOUT WITH CSV HEADER
                 '''.format(name),
                 file=outfile)
@@ -198,16 +216,195 @@ def pg_to_csv(name, file=None, verbose=True, conn=None, **kwargs):
     if verbose:
         print('Done exporting {} to {}.'.format(name, file))
 
-@postgres_connect
-def read_pg(sql, conn=None, **kwargs):
-    ''' Read a SQL query and return it as a Table '''
+def _unescape(field):
+    ''' Decode backslash sequences in a field from COPY's text format '''
+    return _COPY_ESCAPE_RE.sub(
+        lambda match: _COPY_ESCAPES.get(match.group(1), match.group(1)),
+        field)
+        
+def _copy_caster(type_code, cur, driver, escaped=False):
+    '''
+    Return a function for converting fields from COPY's text format
+    into the same Python types a regular cursor would return
+    '''
+    
+    if type_code in _COPY_BUILTINS:
+        return _COPY_BUILTINS[type_code]
+    elif type_code in _COPY_TEXT:
+        return _unescape if escaped else None
+    
+    caster = driver.text_caster(type_code, cur)
+    
+    if escaped:
+        if caster is None:
+            return _unescape
+        return lambda value: caster(_unescape(value))
+    
+    return caster
+    
+def _parse_copy_text(fields, casters):
+    '''
+    Given a flat list of fields from COPY's text format, return a 
+    list of rows
+    '''
+    
+    n_cols = len(casters)
+    columns = []
+    
+    for i, caster in enumerate(casters):
+        values = fields[i::n_cols]
+        
+        if '\\N' in values:
+            if caster is None:
+                values = [None if j == '\\N' else j for j in values]
+            else:
+                values = [None if j == '\\N' else caster(j) for j in values]
+        elif caster is not None:
+            values = list(map(caster, values))
+            
+        columns.append(values)
+    
+    return [list(row) for row in zip(*columns)]
 
-    cur = conn.cursor(cursor_factory=extras.RealDictCursor)
-    cur.execute(sql)
+def _copy_to_rows(sql, conn, chunksize=None):
+    '''
+    Run a query with COPY TO and return its column names and an
+    iterator over lists of at most chunksize rows
+     * The whole output of COPY is received and split into fields before
+       the first chunk is returned, so chunksize only limits the size of
+       each list of rows (not the memory used)
+    '''
+    
+    if not isinstance(sql, str):
+        sql = sql.as_string(conn)
+    sql = sql.strip().rstrip(';')
+    
+    # Get column names and types without running the whole query
+    driver = get_driver(conn)
+    cur = conn.cursor()
+    cur.execute('SELECT * FROM ({}) AS pgreaper_query LIMIT 0'.format(sql))
+    col_names = [col[0] for col in cur.description]
+    type_codes = [col[1] for col in cur.description]
+    
+    # Default text output: tab delimited, NULL as \N, no quoting, and
+    # tabs or newlines in data are escaped
+    buffer = StringIO()
+    driver.copy_out(conn, 'COPY ({}) TO STDOUT'.format(sql), buffer)
+    text = buffer.getvalue()
+    del buffer
+    
+    escaped = '\\' in text
+    casters = [_copy_caster(i, cur, driver, escaped) for i in type_codes]
+    
+    # Since every row has the same number of fields, the whole output 
+    # can be split at once
+    fields = text.replace('\n', '\t').split('\t')
+    fields.pop()   # Empty string after last newline
+    del text
+    
+    n_cols = max(len(casters), 1)
+    n_rows = len(fields) // n_cols
+    
+    if not chunksize:
+        chunksize = max(n_rows, 1)
+    
+    def chunks():
+        for i in range(0, n_rows, chunksize):
+            yield _parse_copy_text(
+                fields[i * n_cols: (i + chunksize) * n_cols], casters)
+        
+    return col_names, chunks()
+
+def _is_cursor_query(sql):
+    '''
+    Return True if a statement can be read through a server-side cursor
+    (otherwise, e.g. SHOW or INSERT ... RETURNING, it has to be run with
+    a regular cursor)
+    '''
+    return _CURSOR_STATEMENTS.match(sql) is not None
 
-    # Error occurs if a function is used in SQL query
-    # and column name is not explictly provided
-    new_table = Table(name='SQL Query', dialect='postgres')
-    new_table.add_dicts(list(cur))
+def _fetch_tables(cur, chunksize):
+    '''
+    Yield the results of an executed cursor as Tables of at most
+    chunksize rows each
+    '''
+    
+    try:
+        while True:
+            rows = cur.fetchmany(chunksize)
+            
+            if not rows:
+                break
+                
+            yield Table(name='SQL Query', dialect='postgres',
+                col_names=[col[0] for col in cur.description],
+                row_values=[list(row) for row in rows])
+    finally:
+        cur.close()
+        
+@postgres_connect
+def read_pg(sql, conn=None, method='cursor', itersize=2000, chunksize=None,
+    **kwargs):
+    '''
+    Read a SQL query and return it as a Table
+    
+    **Methods**
+    
+     * cursor: Results of SELECT, VALUES, WITH, and TABLE statements are
+       streamed through a server-side (named) cursor. Other statements 
+       which return rows (e.g. SHOW) are run with a regular cursor.
+     * copy: Results are exported with `COPY (query) TO STDOUT` and parsed
+       locally, which is much faster for large result sets. However,
+       the entire result set is held in memory (as text) even if 
+       `chunksize` is specified.
+       
+    To get a pandas DataFrame, pass the result to `table_to_pandas()`.
+    
+    Args:
+        sql:        str
+                    A SQL query
+        method:     'cursor' or 'copy' (default: 'cursor')
+                    How query results are transferred
+        itersize:   int (default: 2000)
+                    Number of rows to fetch from the server at a time
+                    (method='cursor' only)
+        chunksize:  int (default: None)
+                    If specified, return an iterator of Tables with at 
+                    most this many rows each instead of a single Table.
+                    Only method='cursor' also limits how many rows are 
+                    held in memory at once.
+    '''
+    
+    if method == 'copy':
+        col_names, chunks = _copy_to_rows(sql, conn, chunksize)
+        tables = (Table(name='SQL Query', dialect='postgres',
+            col_names=col_names, row_values=rows) for rows in chunks)
+        
+        if chunksize:
+            return tables
+        
+        return next(tables, Table(name='SQL Query', dialect='postgres',
+            col_names=col_names))
+    elif method != 'cursor':
+        raise ValueError("'method' should either be 'cursor' or 'copy'.")
 
-    return new_table
\ No newline at end of file
+    if _is_cursor_query(sql):
+        # Named cursors need WITH HOLD outside of a transaction
+        cur = conn.cursor(name='pgreaper_read_pg_{}'.format(next(_CURSOR_IDS)),
+            withhold=conn.autocommit)
+        cur.itersize = itersize
+    else:
+        cur = conn.cursor()
+        
+    cur.execute(sql)
+    
+    if chunksize:
+        return _fetch_tables(cur, chunksize)
+    
+    rows = [list(row) for row in cur]
+    new_table = Table(name='SQL Query', dialect='postgres',
+        col_names=[col[0] for col in cur.description],
+        row_values=rows)
+    cur.close()
+    
+    return new_table
@@ -0,0 +1,279 @@
+'''
+Database Drivers
+=================
+PGReaper talks to Postgres through a small driver layer so the same
+loaders can run on top of different client libraries. Every driver
+implements:
+
+ * connect(**kwargs):               Create a new connection
+ * clone(conn):                     Create a new connection to the same database
+ * execute(conn, sql, params=None): Execute a statement and return the cursor
+ * copy_in(conn, copy_stmt, file):  Stream a file-like object into COPY FROM
+ * copy_out(conn, copy_stmt, file): Stream the output of COPY TO into a file
+
+ (Both return the number of rows copied)
+ * get_columns(conn, name):         List of (column name, data type) tuples
+ * get_pkey(conn, name):            (column name, data type) of the primary key
+
+`copy_in()` and `copy_out()` accept both text and binary files.
+
+Synchronous Drivers
+--------------------
+ * psycopg2 (default)
+ * psycopg: psycopg 3
+
+Asynchronous drivers (used by `pgreaper.aio`) are in
+`pgreaper.postgres.async_drivers`, which is only imported by `pgreaper.aio`
+since it needs Python 3.6 or later.
+
+Drivers other than psycopg2 are optional dependencies. A driver can be
+selected by passing `driver='psycopg'` along with the connection arguments
+(`dbname`, `user`, ...) to any function which connects to Postgres, or by
+simply passing in a connection created by that library.
+'''
+
+from pgreaper._globals import import_package
+
+from io import TextIOBase
+import psycopg2
+psycopg = import_package('psycopg')
+
+# Number of characters or bytes read from a file per write to COPY
+COPY_BUFFER = 2 ** 16
+
+COLUMNS_QUERY = '''
+    SELECT column_name, data_type
+    FROM information_schema.columns
+    WHERE table_schema LIKE '%%public%%' AND table_name = {}
+    ORDER BY ordinal_position
+'''
+
+# Ref: https://wiki.postgresql.org/wiki/Retrieve_primary_key_columns
+PKEY_QUERY = '''
+    SELECT a.attname, format_type(a.atttypid, a.atttypmod) AS data_type
+    FROM   pg_index i
+    JOIN   pg_attribute a ON a.attrelid = i.indrelid
+                         AND a.attnum = ANY(i.indkey)
+    WHERE  i.indrelid = to_regclass({})
+    AND    i.indisprimary
+'''
+
+def _blocks(file):
+    ''' Iterate over a file-like object (or an iterable) in blocks '''
+    
+    if not hasattr(file, 'read'):
+        yield from file
+        return
+        
+    while True:
+        block = file.read(COPY_BUFFER)
+
+        if not block:
+            break
+
+        yield block
+
+class Driver(object):
+    '''
+    Base class for synchronous drivers
+     * Subclasses must provide `name`, `module`, `connection_class`,
+       `copy_in()` and `copy_out()`
+    '''
+
+    name = None
+
+    @property
+    def module(self):
+        raise NotImplementedError
+
+    @property
+    def connection_class(self):
+        raise NotImplementedError
+
+    def is_connection(self, conn):
+        return bool(self.module) and isinstance(conn, self.connection_class)
+
+    def assert_installed(self):
+        if not self.module:
+            raise ImportError('The {} package must be installed to use '
+                'this driver.'.format(self.name))
+
+    def connect(self, **kwargs):
+        self.assert_installed()
+        return self.module.connect(**{k: v for k, v in kwargs.items() \
+            if v is not None})
+
+    def execute(self, conn, sql, params=None):
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return cur
+
+    def get_columns(self, conn, name):
+        return [tuple(row) for row in self.execute(conn,
+            COLUMNS_QUERY.format('%s'), (name,)).fetchall()]
+
+    def get_pkey(self, conn, name):
+        row = self.execute(conn, PKEY_QUERY.format('%s'), (name,)).fetchone()
+        return tuple(row) if row else None
+
+    def get_session(self, conn):
+        '''
+        Return the (isolation_level, readonly) the next transactions use,
+        in a form `set_session()` accepts
+        '''
+        raise NotImplementedError
+
+    def set_session(self, conn, isolation_level=None, readonly=None):
+        '''
+        Set the characteristics of the next transactions
+         * None restores the server default
+        '''
+        raise NotImplementedError
+
+    def in_transaction(self, conn):
+        ''' Return True if conn has a transaction open '''
+        raise NotImplementedError
+
+    def text_caster(self, type_code, cur):
+        '''
+        Return a function which converts a value from COPY's text format
+        to the Python type a cursor would return, or None if no conversion
+        is needed
+        '''
+        raise NotImplementedError
+
+    def __repr__(self):
+        return '<{} driver>'.format(self.name)
+
+class Psycopg2Driver(Driver):
+    ''' Driver for psycopg2 (default) '''
+
+    name = 'psycopg2'
+    module = psycopg2
+    connection_class = psycopg2.extensions.connection
+
+    def clone(self, conn):
+        if conn.info.password:
+            return psycopg2.connect(conn.dsn, password=conn.info.password)
+        return psycopg2.connect(conn.dsn)
+
+    def copy_in(self, conn, copy_stmt, file):
+        cur = conn.cursor()
+        cur.copy_expert(copy_stmt, file)
+        return cur.rowcount
+
+    def copy_out(self, conn, copy_stmt, file):
+        cur = conn.cursor()
+        cur.copy_expert(copy_stmt, file)
+        return cur.rowcount
+
+    def get_session(self, conn):
+        return conn.isolation_level, conn.readonly
+
+    def set_session(self, conn, isolation_level=None, readonly=None):
+        conn.set_session(
+            isolation_level=isolation_level or 'DEFAULT',
+            readonly='DEFAULT' if readonly is None else readonly)
+
+    def in_transaction(self, conn):
+        return conn.get_transaction_status() != \
+            psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def text_caster(self, type_code, cur):
+        caster = psycopg2.extensions.string_types.get(type_code)
+
+        if caster is None:
+            return None
+        return lambda value: caster(value, cur)
+
+class PsycopgDriver(Driver):
+    ''' Driver for psycopg 3 '''
+
+    name = 'psycopg'
+    module = psycopg
+
+    @property
+    def connection_class(self):
+        return psycopg.Connection
+
+    def connect(self, **kwargs):
+        # psycopg returns bytes instead of str for SQL_ASCII databases
+        return super(PsycopgDriver, self).connect(client_encoding='utf8',
+            **kwargs)
+
+    def clone(self, conn):
+        return psycopg.connect(conn.info.dsn, password=conn.info.password,
+            client_encoding='utf8')
+
+    def copy_in(self, conn, copy_stmt, file):
+        cur = conn.cursor()
+
+        with cur.copy(copy_stmt) as copy:
+            for block in _blocks(file):
+                copy.write(block)
+
+        return cur.rowcount
+
+    def copy_out(self, conn, copy_stmt, file):
+        text = isinstance(file, TextIOBase)
+        cur = conn.cursor()
+
+        with cur.copy(copy_stmt) as copy:
+            for block in copy:
+                if text:
+                    file.write(bytes(block).decode(conn.info.encoding))
+                else:
+                    file.write(block)
+
+        return cur.rowcount
+
+    def get_session(self, conn):
+        return conn.isolation_level, conn.read_only
+
+    def set_session(self, conn, isolation_level=None, readonly=None):
+        if isinstance(isolation_level, str):
+            isolation_level = psycopg.IsolationLevel[
+                isolation_level.upper().replace(' ', '_')]
+
+        conn.isolation_level = isolation_level
+        conn.read_only = readonly
+
+    def in_transaction(self, conn):
+        return conn.info.transaction_status != \
+            psycopg.pq.TransactionStatus.IDLE
+
+    def text_caster(self, type_code, cur):
+        loader = cur.adapters.get_loader(type_code, psycopg.pq.Format.TEXT)
+
+        if loader is None:
+            return None
+
+        load = loader(type_code, cur).load
+        return lambda value: load(value.encode('utf-8'))
+
+DEFAULT_DRIVER = 'psycopg2'
+DRIVERS = {
+    'psycopg2': Psycopg2Driver(),
+    'psycopg': PsycopgDriver()
+}
+
+def _lookup(drivers, conn=None, name=None):
+    if name:
+        try:
+            return drivers[name]
+        except KeyError:
+            raise ValueError('Unknown driver {}. Valid options are {}.'.format(
+                repr(name), ', '.join(sorted(drivers))))
+
+    for driver in drivers.values():
+        if driver.is_connection(conn):
+            return driver
+
+    return None
+
+def get_driver(conn=None, name=None):
+    '''
+    Return the synchronous driver with the given name, or the driver
+    `conn` belongs to (None if it isn't a supported connection)
+    '''
+    return _lookup(DRIVERS, conn, name)
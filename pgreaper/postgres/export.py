@@ -0,0 +1,220 @@
+'''
+.. currentmodule:: pgreaper
+.. autofunction:: pg_to_csv_parallel
+'''
+
+from pgreaper._globals import import_package
+from pgreaper.io import zip
+from .conn import postgres_connect
+from .database import get_pkey
+from .drivers import get_driver
+
+from concurrent.futures import ThreadPoolExecutor
+import builtins
+import json
+import os
+zstandard = import_package('zstandard')
+
+# Primary key types that can be split into ranges
+INTEGER_TYPES = set(['smallint', 'integer', 'bigint'])
+
+# First server_version_num with TID range scans. Before that, a query on
+# a ctid range reads the whole table.
+TID_RANGE_SCAN_VERSION = 140000
+
+# File extensions for compressed shards
+COMPRESSION_EXT = {
+    None: '',
+    'gzip': '.gz',
+    'gz': '.gz',
+    'bz2': '.bz2',
+    'lzma': '.xz',
+    'zstd': '.zst'
+}
+
+def _open_shard(file, compression=None):
+    ''' Open a (possibly compressed) shard for binary writing '''
+
+    if compression == 'zstd':
+        if not zstandard:
+            raise ImportError('The zstandard package must be installed for '
+                'zstd compression.')
+        return zstandard.open(file, mode='wb')
+    elif compression:
+        return zip.open(file, compression=compression, mode='wb')
+    else:
+        return builtins.open(file, mode='wb')
+
+def _split_ranges(start, stop, n):
+    '''
+    Split the half-open interval [start, stop) into at most n
+    contiguous (start, stop) tuples
+    '''
+
+    step = max(-(-(stop - start) // n), 1)
+    return [(i, min(i + step, stop)) for i in range(start, stop, step)]
+
+def _partitions(name, n, conn):
+    '''
+    Return a list of WHERE clauses splitting a table into at most n
+    disjoint parts
+     * Tables with an integer primary key are split by key ranges
+     * Other tables are split by ranges of physical blocks (ctid), but
+       only on Postgres 14 or later
+     * Views are not split
+    '''
+
+    cur = conn.cursor()
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass",
+        (name,))
+
+    if cur.fetchone()[0] not in ('r', 'm'):
+        return ['true']
+
+    p_key = get_pkey(name, conn=conn)
+
+    if p_key and (p_key.type in INTEGER_TYPES):
+        cur.execute('SELECT min({0}), max({0}) FROM {1}'.format(
+            p_key.column, name))
+        low, high = cur.fetchone()
+
+        if low is None:
+            return ['true']
+
+        ranges = _split_ranges(low, high + 1, n)
+        where = ['{0} >= {1} AND {0} < {2}'.format(p_key.column, i, j) \
+            for i, j in ranges]
+    else:
+        cur.execute('SHOW server_version_num')
+        if int(cur.fetchone()[0]) < TID_RANGE_SCAN_VERSION:
+            return ['true']
+
+        cur.execute("SELECT pg_relation_size(%s) / "
+            "current_setting('block_size')::int", (name,))
+        n_blocks = cur.fetchone()[0]
+
+        ranges = _split_ranges(0, max(n_blocks, 1), n)
+        where = ["ctid >= '({0},0)'::tid AND ctid < '({1},0)'::tid".format(
+            i, j) for i, j in ranges]
+
+    # The last partition is open-ended so nothing is missed
+    where[-1] = where[-1].split(' AND ')[0]
+    return where
+
+def _export_shard(driver, conn, snapshot, query, file, compression, header):
+    '''
+    COPY one partition to a file using an exported snapshot
+     * conn is the coordinator's connection, which is cloned
+    '''
+
+    conn = driver.clone(conn)
+
+    try:
+        driver.set_session(conn, isolation_level='REPEATABLE READ',
+            readonly=True)
+        conn.cursor().execute("SET TRANSACTION SNAPSHOT '{}'".format(snapshot))
+
+        with _open_shard(file, compression) as outfile:
+            return driver.copy_out(conn, 'COPY ({}) TO STDOUT WITH CSV{}'.format(
+                query, ' HEADER' if header else ''), outfile)
+    finally:
+        conn.close()
+
+@postgres_connect
+def pg_to_csv_parallel(name, dir=None, n_jobs=4, compression='gzip',
+    header=True, verbose=True, conn=None, **kwargs):
+    '''
+    Export a Postgres table to several (compressed) CSV files in parallel
+
+     * The table is split into `n_jobs` parts by primary key ranges if it
+       has an integer primary key, or by physical location (ctid) otherwise.
+       Splitting by ctid requires Postgres 14 or later (older versions
+       would scan the whole table for every part), so other tables are
+       exported to one file on older servers.
+     * Each part is exported by its own connection, but all connections
+       share one snapshot so the export is consistent
+     * A `manifest.json` describing each file is written to `dir`
+     * conn can't have a transaction open. It's used for a read-only
+       transaction which is rolled back once the export is done, and its
+       session settings are then restored.
+
+    **Basic Usage:**
+     >>> import pgreaper
+     >>> pgreaper.pg_to_csv_parallel('tweets', dir='tweets_export',
+     ...    n_jobs=8, compression='zstd', dbname='twitter')
+
+    Args:
+        name:           str
+                        Name of the table or view
+        dir:            str (default: name of the table)
+                        Directory to write files to
+        n_jobs:         int (default: 4)
+                        Number of parts to export in parallel
+        compression:    'gzip', 'bz2', 'lzma', 'zstd' or None (default: 'gzip')
+                        How to compress each file. zstd requires the
+                        `zstandard` package.
+        header:         bool (default: True)
+                        Include column names as the first row of each file
+    '''
+
+    if compression not in COMPRESSION_EXT:
+        raise ValueError('Unsupported compression algorithm. Valid options '
+            'are "gzip", "bz2", "lzma", "zstd", and None.')
+
+    driver = get_driver(conn)
+    if driver.in_transaction(conn):
+        raise ValueError('conn has a transaction open. Commit or roll it '
+            'back before exporting.')
+
+    if not dir:
+        dir = name
+    os.makedirs(dir, exist_ok=True)
+
+    # Keep this transaction open until all workers are done
+    session = driver.get_session(conn)
+    driver.set_session(conn, isolation_level='REPEATABLE READ', readonly=True)
+    cur = conn.cursor()
+
+    try:
+        cur.execute('SELECT pg_export_snapshot()')
+        snapshot = cur.fetchone()[0]
+        partitions = _partitions(name, n_jobs, conn)
+
+        shards = []
+        for i, where in enumerate(partitions):
+            shards.append({
+                'file': '{0}_{1:04d}.csv{2}'.format(
+                    name, i, COMPRESSION_EXT[compression]),
+                'query': 'SELECT * FROM {0} WHERE {1}'.format(name, where)
+            })
+
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(_export_shard, driver, conn,
+                snapshot, shard['query'],
+                os.path.join(dir, shard['file']), compression, header) \
+                for shard in shards]
+
+            for i, shard in enumerate(shards):
+                shard['rows'] = futures[i].result()
+                shard['bytes'] = os.path.getsize(os.path.join(dir, shard['file']))
+    finally:
+        conn.rollback()
+        driver.set_session(conn, *session)
+
+    manifest = {
+        'table': name,
+        'snapshot': snapshot,
+        'compression': compression,
+        'header': header,
+        'rows': sum(shard['rows'] for shard in shards),
+        'shards': shards
+    }
+
+    with builtins.open(os.path.join(dir, 'manifest.json'), mode='w') as outfile:
+        json.dump(manifest, outfile, indent=4)
+
+    if verbose:
+        print('Done exporting {} to {} files in {}.'.format(
+            name, len(shards), dir))
+
+    return manifest
@@ -0,0 +1,88 @@
+'''
+.. currentmodule:: pgreaper
+.. autofunction:: copy_html
+'''
+
+from pgreaper._globals import strip, resolve_duplicate
+from pgreaper.html.batch import BatchResult, get_tables_from_files, \
+    group_tables
+from .conn import postgres_connect
+from .loader import copy_table
+
+from collections import OrderedDict
+
+def _target_names(tables, name=None):
+    '''
+    Return a unique Postgres table name for each group of tables
+     * Groups are named after name if given, otherwise after their
+       first table
+    '''
+
+    names = [strip(name or table.name or 'html_table').lower() \
+        for table in tables]
+    return resolve_duplicate(names)
+
+@postgres_connect
+def copy_html(files, name=None, n_procs=None, encoding='utf-8',
+    recursive=False, conn=None, hooks=None, progress=None, **kwargs):
+    '''
+    Parse many HTML files in a pool of processes and load their tables
+    into Postgres
+
+     * Tables with identical column names are merged and loaded into
+       the same Postgres table (see `pgreaper.html.group_tables()`)
+     * Groups are loaded one at a time, each in its own transaction.
+       If a Postgres table already exists, rows are added to it as
+       in `copy_table()`.
+     * A file which can't be read or parsed is skipped and recorded in
+       `errors`
+
+    Basic Usage:
+     >>> import pgreaper
+     >>> reports, errors = pgreaper.copy_html('reports/', dbname='scraped')
+
+    Args:
+        files:      str or list
+                    A directory, glob pattern, filename, or a list of any
+                    of these (see `pgreaper.html.from_files()`)
+        name:       str (default: None)
+                    Name of the Postgres table. If tables have several
+                    different headers, the first group is loaded into name,
+                    the second into name_1, and so on. By default, each
+                    group is named after its first table.
+        n_procs:    int (default: number of CPUs)
+                    Number of processes parsing files
+        encoding:   str (default: 'utf-8')
+        recursive:  bool (default: False)
+                    Search subdirectories of directories
+        hooks:      list (default: None)
+                    Functions called at the start and end of every
+                    phase of the load (see `pgreaper.add_hook()`)
+        progress:   None, True, or function (default: None)
+                    See `copy_table()`
+        **kwargs:   Other arguments for `copy_table()`, e.g. `expand_sql`
+
+    Returns:
+        A `BatchResult` whose results map Postgres table names to
+        `LoadReport`s
+    '''
+
+    kwargs.pop('commit', None)
+    parsed = get_tables_from_files(files, n_procs=n_procs,
+        encoding=encoding, recursive=recursive)
+    tables = [table for table in group_tables(parsed.results) if table]
+    result = BatchResult(OrderedDict(), parsed.errors)
+
+    try:
+        for table, target in zip(tables, _target_names(tables, name)):
+            report = copy_table(table, name=target, conn=conn,
+                commit=False, hooks=hooks, progress=progress, **kwargs)
+
+            with report.phase('commit'):
+                conn.commit()
+
+            result.results[target] = report
+    finally:
+        conn.close()
+
+    return result
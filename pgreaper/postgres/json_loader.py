@@ -4,14 +4,16 @@
 '''
 
 from pgreaper._globals import preprocess
+from pgreaper.instrument import LoadReport, copy_reader
 from pgreaper.io import JSONStreamingDecoder, zip
 from .conn import postgres_connect
 from .database import load_sql, get_table_schema
+from .drivers import get_driver
 from .loader import copy_table
 
 from io import BytesIO
-import psycopg2
 import json
+import os
 
 def _is_ndjson(file, compression=None):
     '''
@@ -42,7 +44,8 @@ def _is_ndjson(file, compression=None):
 @preprocess
 @postgres_connect
 def copy_json(file, name, compression=None,
-    flatten=None, conn=None, null_values=None, **kwargs):
+    flatten=None, conn=None, null_values=None, hooks=None, progress=None,
+    **kwargs):
     '''
     Stream a JSON and load it to Postgres
     
@@ -53,9 +56,21 @@ def copy_json(file, name, compression=None,
                         Name of the table
         compression:    str (default: None)
                         Compression algorithm to use                     
+        hooks:          list (default: None)
+                        Functions called at the start and end of every 
+                        phase of the load (see `pgreaper.add_hook()`)
+        progress:       None, True, or function (default: None)
+                        True shows a progress bar for the COPY, and a 
+                        function is called periodically with a `Progress`
+                        tuple (see `pgreaper.instrument`)
+                        
+    Returns:
+        A `LoadReport` with timings for each phase of the load
     '''
     
     cur = conn.cursor()
+    driver = get_driver(conn)
+    report = LoadReport(name, hooks=hooks)
         
     with zip.open(file, compression=compression, mode='rb') as infile:
         # Determine whether to (a) send JSON straight to Postgres or
@@ -63,25 +78,42 @@ def copy_json(file, name, compression=None,
         #  - Use option (a if JSON is actually newline-delimited JSON
         #  - Use option (b) otherwise
         
-        cur.execute("CREATE TABLE IF NOT EXISTS {0} (json_data jsonb)".format(name))
+        with report.phase('ddl'):
+            cur.execute("CREATE TABLE IF NOT EXISTS {0} (json_data jsonb)".format(name))
         copy_stmt = "COPY {0} FROM STDIN (FORMAT TEXT)".format(name)
         
         if _is_ndjson(file, compression=compression):
-            cur.copy_expert(copy_stmt, infile)
+            # Size is only known for uncompressed files
+            size = None
+            if isinstance(file, str) and not compression:
+                size = os.path.getsize(file)
+                
+            reader = copy_reader(infile, progress, name=name,
+                total_bytes=size)
         else:
-            tbl = BytesIO()
-            streamer = JSONStreamingDecoder(source=infile)
-            
-            for line in streamer:
-                tbl.write(line + b'\n')
+            with report.phase('clean'):
+                tbl = BytesIO()
+                streamer = JSONStreamingDecoder(source=infile)
                 
-            tbl.seek(0)
-            cur.copy_expert(copy_stmt, tbl)
+                for line in streamer:
+                    tbl.write(line + b'\n')
+                    
+                tbl.seek(0)
+            reader = copy_reader(tbl, progress, name=name,
+                total_bytes=tbl.getbuffer().nbytes)
+            
+        with report.phase('copy') as counts:
+            counts.rows = driver.copy_in(conn, copy_stmt, reader)
+            counts.bytes = reader.bytes
 
     if flatten == 'outer':
-        load_sql('sanitize_name', conn)
-        load_sql('flatten_json', conn)
-        cur.execute("SELECT flatten_json('{0}')".format(name))
+        with report.phase('flatten'):
+            load_sql('sanitize_name', conn)
+            load_sql('flatten_json', conn)
+            cur.execute("SELECT flatten_json('{0}')".format(name))
             
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    with report.phase('commit'):
+        conn.commit()
+    conn.close()
+    
+    return report
\ No newline at end of file
@@ -1,26 +1,47 @@
 from pgreaper._globals import SQLIFY_PATH, preprocess
 from pgreaper.core import assert_table, ColumnList, Table
+from pgreaper.core.serialize import to_csv
+from pgreaper.instrument import LoadReport, copy_reader
+from pgreaper.io.pipeline import PipelinedReader
 from pgreaper.io.zip import open, ZipReader
 from .conn import *
 from .database import add_column, create_table, get_schema, \
     get_table_schema, get_pkey, get_primary_keys
+from .drivers import get_driver
 
-from psycopg2 import sql as sql_string
-import psycopg2
 import json
 import csv
 import io
 
+# Tables with more rows than this are serialized in a background thread
+# in batches of this many rows while COPY sends the previous batch
+COPY_BATCH_SIZE = 10000
+
+# Maximum number of serialized batches waiting to be sent
+COPY_QUEUE_SIZE = 4
+
 ####################
 # Helper Functions #
 ####################
 
-def simple_copy(data, conn, name=None, null_values=None):
+def _csv_batches(table, batch_size=COPY_BATCH_SIZE, strict_null=False):
+    ''' Serialize a Table to CSV in batches of batch_size rows '''
+    
+    col_types = table.col_types
+    
+    for i in range(0, len(table), batch_size):
+        yield to_csv(table, col_types, i, i + batch_size,
+            strict_null=strict_null)
+
+def simple_copy(data, conn, name=None, null_values=None, counts=None,
+    progress=None, strict_null=False):
     '''
     Copy a Table into a Postgres database
      * Does not create table (should be done beforehand)
      * Does not make sure the schemas match (should be done beforehand)
      * Does not auto-commit
+     * Large Tables are serialized in a background thread, overlapping
+       CSV formatting with sending data to Postgres
      
     Parameters
     -----------
@@ -29,19 +50,40 @@ def simple_copy(data, conn, name=None, null_values=None):
                     Name of the Table to COPY to
     null_values:    str
                     String representing null values
-    conn:           psycopg2 connection
+    conn:           Connection supported by a driver (e.g. psycopg2)
+    counts:         pgreaper.instrument.Phase (default: None)
+                    If specified, record the number of rows and characters
+                    sent to Postgres
+    progress:       None, True, or function (default: None)
+                    Show a progress bar or call a progress callback
+                    (see `pgreaper.instrument`)
+    strict_null:    bool (default: False)
+                    Only load None as NULL, keeping empty strings
+                    (see `pgreaper.core.serialize`)
     '''
     
     name = data.name
-    stringio_ = data.to_string()
+    driver = get_driver(conn)
         
     if null_values:
         copy_from = "COPY {0} FROM STDIN (FORMAT csv, DELIMITER ',', NULL '{1}')".format(name, null_values)
     else:
         copy_from = "COPY {0} FROM STDIN (FORMAT csv, DELIMITER ',')".format(name)
         
-    stringio_.seek(0)
-    conn.cursor().copy_expert(copy_from, file=stringio_)
+    if len(data) > COPY_BATCH_SIZE:
+        with PipelinedReader(_csv_batches(data, strict_null=strict_null),
+            maxsize=COPY_QUEUE_SIZE) as pipeline:
+            reader = copy_reader(pipeline, progress, name=name,
+                total_rows=len(data))
+            rows = driver.copy_in(conn, copy_from, reader)
+    else:
+        reader = copy_reader(data.to_string(strict_null=strict_null),
+            progress, name=name, total_rows=len(data))
+        rows = driver.copy_in(conn, copy_from, reader)
+        
+    if counts is not None:
+        counts.rows = rows
+        counts.bytes = reader.bytes
 
 def _unnest(table):
     '''
@@ -68,10 +110,10 @@ def _unnest(table):
             unnest.append(base.format(
                 [dict_encoder.encode(i) for i in table[col]],
                 type=col_type))
-        elif col_type == 'datetime':
+        elif col_type.startswith('timestamp'):
             unnest.append(base.format(
-                [psycopg2.extensions.adapt(i) for i in table[col]]),
-                type=col_type)
+                [i.isoformat() if i else i for i in table[col]],
+                type=col_type))
         elif col_type == 'text':
             # Deal with embedded quotes like "Ted O'Donnell"
             unnest.append(base.format(
@@ -82,7 +124,8 @@ def _unnest(table):
                     
     return unnest
     
-def simple_upsert(table, conn, null_values=None, on_p_key='nothing'):
+def simple_upsert(table, conn, null_values=None, on_p_key='nothing',
+    counts=None):
     '''
     Like simple_copy() but performs an UPSERT
       
@@ -93,6 +136,9 @@ def simple_upsert(table, conn, null_values=None, on_p_key='nothing'):
                 'replace'     --> Replace all columns of existing entries
                 list of column names --> Replace all columns in list
     conn:       psycopg2 Connection
+    counts:     pgreaper.instrument.Phase (default: None)
+                If specified, record the number of rows inserted or updated,
+                and the number of rows skipped due to conflicts as rejects
     '''
     
     cur = conn.cursor()
@@ -132,6 +178,10 @@ def simple_upsert(table, conn, null_values=None, on_p_key='nothing'):
         raise ValueError("'on_p_key' should be 'replace', a list, or None.")
 
     cur.execute(upsert_statement.replace('None', 'null'))
+    
+    if counts is not None:
+        counts.rows = cur.rowcount
+        counts.rejects = len(table) - cur.rowcount
 
 def _modify_tables(table, sql_cols, reorder=False,
     expand_input=False, expand_sql=False, alter_types=False, conn=None):
@@ -218,7 +268,7 @@ def copy_table(
     table, name=None, null_values=None, conn=None, commit=True,
     on_p_key='nothing', append=False, reorder=False,
     expand_input=False, alter_types=False, expand_sql=False,
-    *args, **kwargs):
+    strict_null=False, hooks=None, progress=None, *args, **kwargs):
     '''
     Load a Table into a PostgreSQL database. Although the function has the word
     "copy" in it, it actually automatically performs an INSERT OR REPLACE or UPSERT
@@ -236,7 +286,8 @@ def copy_table(
         null_values:    str (default: None)
                         String representing null values
         conn:           psycopg2.extensions.connection
-                        A connection created by `psycopg2.connect()`.
+                        A connection created by `psycopg2.connect()` (or 
+                        by another supported driver, e.g. psycopg 3).
                         Alternatively, you can specify one or more of 
                         `dbname, host, user, and password`.
         commit:         bool (default: True)
@@ -261,6 +312,10 @@ def copy_table(
                         If the destination table already exists, use `COPY` to
                         upload append to it. This may fail due to primary key
                         conflicts and other constraints.
+        strict_null:    bool (default: False)
+                        By default, empty strings are loaded as NULL and None
+                        in jsonb columns as a JSON null. If True, only None
+                        is loaded as NULL and empty strings are kept.
                     
     INSERT OR REPLACE and UPSERT Arguments:
         on_p_key:       'nothing', 'replace' or list[str] (default: 'nothing')
@@ -268,6 +323,18 @@ def copy_table(
                          * nothing: INSERT... ON CONFLICT DO NOTHING
                          * replace: INSERT OR REPLACE
                          * list[str]: A list of column names to update (INSERT... ON CONFLICT SET...)
+                         
+    Instrumentation:
+        hooks:          list (default: None)
+                        Functions called at the start and end of every 
+                        phase of the load (see `pgreaper.add_hook()`)
+        progress:       None, True, or function (default: None)
+                        True shows a progress bar for COPYs, and a function 
+                        is called periodically with a `Progress` tuple
+                        (see `pgreaper.instrument`)
+                        
+    Returns:
+        A `LoadReport` with timings for each phase of the load
     '''
     
     '''
@@ -285,33 +352,44 @@ def copy_table(
     else:
         table.name = name
         
-    table.guess_type()
+    report = LoadReport(name, hooks=hooks)
+        
+    with report.phase('infer'):
+        table.guess_type()
         
     # Check schemas
-    schema = get_table_schema(name, conn=conn)
-    p_key = get_pkey(name, conn=conn)
+    with report.phase('schema'):
+        schema = get_table_schema(name, conn=conn)
+        p_key = get_pkey(name, conn=conn)
         
     # Create table if necessary
-    if not schema:
-        cur.execute(create_table(table))
-    else:
-        # Modify Table and or SQL table if necessary
-        table = _modify_tables(
-            table, schema, reorder=reorder,
-            expand_input=expand_input, expand_sql=expand_sql,
-            alter_types=alter_types, conn=conn)
+    with report.phase('ddl'):
+        if not schema:
+            cur.execute(create_table(table))
+        else:
+            # Modify Table and or SQL table if necessary
+            table = _modify_tables(
+                table, schema, reorder=reorder,
+                expand_input=expand_input, expand_sql=expand_sql,
+                alter_types=alter_types, conn=conn)
         
     # COPY or UPSERT
     if (not schema) or (not p_key) or append:
-        simple_copy(table, conn=conn, null_values=null_values)
+        with report.phase('copy') as counts:
+            simple_copy(table, conn=conn, null_values=null_values,
+                counts=counts, progress=progress, strict_null=strict_null)
     else:
-        simple_upsert(table, conn=conn, null_values=null_values,
-            on_p_key=on_p_key)
+        with report.phase('upsert') as counts:
+            simple_upsert(table, conn=conn, null_values=null_values,
+                on_p_key=on_p_key, counts=counts)
         
     if commit:
-        conn.commit()
+        with report.phase('commit'):
+            conn.commit()
         conn.close()
         
+    return report
+        
 def table_to_pg(*args, **kwargs):
     ''' Alias for `copy_table()` '''
-    copy_table(*args, **kwargs)
\ No newline at end of file
+    return copy_table(*args, **kwargs)
\ No newline at end of file
@@ -1,3 +1,3 @@
-__all__ = ['sqlite_to_postgres']
+__all__ = ['sqlite_to_postgres', 'sqlite_db_to_postgres']
 
-from .to_postgres import sqlite_to_postgres
\ No newline at end of file
+from .to_postgres import sqlite_to_postgres, sqlite_db_to_postgres
\ No newline at end of file
@@ -5,82 +5,693 @@ SQLite to PostgreSQL Conversion
 --------------------------------
 
 .. autofunction:: sqlite_to_postgres
+.. autofunction:: sqlite_db_to_postgres
 
 '''
 
-from pgreaper.core.table import Table
+from pgreaper.core import ColumnList
+from pgreaper.core.serialize import to_csv
+from pgreaper.instrument import LoadReport, copy_reader
+from pgreaper.io.pipeline import PipelinedReader
 from pgreaper.postgres.conn import postgres_connect
-from pgreaper.postgres import table_to_pg
+from pgreaper.postgres.database import create_table, get_pkey
+from pgreaper.postgres.drivers import get_driver
+from pgreaper.postgres.loader import COPY_BATCH_SIZE, COPY_QUEUE_SIZE
 
+from collections import deque, namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from urllib.request import pathname2url
+import itertools
+import multiprocessing
+import os
 import sqlite3
-import psycopg2
+import threading
+import warnings
+
+# SQLite settings for reading during migrations
+MMAP_SIZE = 2 ** 30         # Memory-map up to 1 GB of the database file
+CACHE_SIZE = 2 ** 16        # Page cache size in KB
+
+# Longest identifier Postgres keeps, in bytes (NAMEDATALEN - 1)
+PG_MAX_IDENTIFIER = 63
+
+# Tables spanning more rowids than this are read by several processes
+SPLIT_ROWS = 1000000
+
+# Names of relations in the current schema (which share one namespace
+# with indexes), except indexes on the tables given
+RELATIONS_QUERY = '''
+    SELECT c.relname
+    FROM   pg_class c
+    JOIN   pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_index i ON i.indexrelid = c.oid
+    LEFT JOIN pg_class t ON t.oid = i.indrelid
+    WHERE  n.nspname = current_schema()
+    AND    (t.relname IS NULL OR NOT t.relname = ANY(%s))
+'''
+
+# Storage classes found in a column, as returned by _storage_classes()
+BOOL_INT = 1        # Integers which are 0 or 1
+REAL = 2
+TEXT = 4
+BLOB = 8
+INT = 16            # Other integers
+
+'''
+A SQLite index
+ * name:    Name of the index
+ * unique:  Whether the index is unique
+ * columns: List of (column name, descending) tuples
+'''
+Index = namedtuple('Index', ['name', 'unique', 'columns'])
+
+def quote_ident(name):
+    ''' Quote a SQLite identifier '''
+    return '"{}"'.format(name.replace('"', '""'))
+
+def sqlite_connect(database, mmap_size=MMAP_SIZE, cache_size=CACHE_SIZE,
+    **kwargs):
+    '''
+    Open a SQLite database read-only, tuned for scanning whole tables
+     * The database file is memory-mapped (up to mmap_size bytes), so
+       pages are read without copying them into SQLite's cache
+     * query_only makes sure nothing is written, even to attached databases
+    '''
+
+    conn = sqlite3.connect('file:{}?mode=ro'.format(
+        pathname2url(os.path.abspath(database))), uri=True, **kwargs)
+    conn.execute('PRAGMA mmap_size = {:d}'.format(mmap_size))
+    conn.execute('PRAGMA cache_size = -{:d}'.format(cache_size))
+    conn.execute('PRAGMA query_only = ON')
+    return conn
 
 def get_schema(database, table):
     ''' Get the schema of a SQLite table
-    
+
     Arguments:
      * database:    Name of a file containing a SQLite database
      * table:       Name of a SQL table
-    
+
     Returns a dictionary:
      * col_names:   List of column names
      * col_types:   List of column types
     '''
-    
+
     col_names = []
     col_types = []
-    
-    conn = sqlite3.connect(database)
-    conn.row_factory = sqlite3.Row
-    
-    schema_query = "PRAGMA table_info({0})".format(table)
-    schema_results = conn.execute(schema_query).fetchall()
-        
+
+    with closing(sqlite_connect(database)) as conn:
+        conn.row_factory = sqlite3.Row
+
+        schema_query = "PRAGMA table_info({0})".format(quote_ident(table))
+        schema_results = conn.execute(schema_query).fetchall()
+
     for row in schema_results:
         col_names.append(row['name'])
         col_types.append(row['type'])
 
     return {'col_names': col_names, 'col_types': col_types}
 
+def get_p_key(database, table):
+    ''' Return the primary key columns of a SQLite table in key order '''
+    with closing(sqlite_connect(database)) as conn:
+        info = conn.execute('PRAGMA table_info({})'.format(
+            quote_ident(table))).fetchall()
+
+    # The 6th field is the column's position in the key (0 if not a key)
+    return [row[1] for row in sorted(info, key=lambda row: row[5]) \
+        if row[5]]
+
+def get_indexes(database, table):
+    '''
+    Return a list of `Index`es on a SQLite table, not including the
+    primary key
+     * Partial indexes and indexes on expressions can't be converted,
+       so they are skipped with a warning
+    '''
+
+    indexes = []
+
+    with closing(sqlite_connect(database)) as conn:
+        index_list = conn.execute('PRAGMA index_list({})'.format(
+            quote_ident(table))).fetchall()
+
+        for _, name, unique, origin, partial in index_list:
+            if origin == 'pk':
+                continue
+
+            # Fields: seqno, cid, name, desc, collation, key
+            columns = [(row[2], bool(row[3])) for row in conn.execute(
+                'PRAGMA index_xinfo({})'.format(quote_ident(name))) if row[5]]
+
+            if partial or any(col is None for col, _ in columns):
+                warnings.warn('Skipping index {} on {}: partial indexes and '
+                    'indexes on expressions are not supported.'.format(
+                        name, table))
+                continue
+
+            indexes.append(Index(name, bool(unique), columns))
+
+    return indexes
+
+def get_tables(database):
+    ''' Return the names of all tables in a SQLite database '''
+    with closing(sqlite_connect(database)) as conn:
+        return [row[0] for row in conn.execute("SELECT name FROM "
+            "sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+            "ORDER BY name")]
+
+def sqlite_type(col_type):
+    '''
+    Convert a declared SQLite type to a Postgres type, following
+    SQLite's rules for column affinity
+     * Columns without a declared type return None
+    '''
+
+    col_type = col_type.upper()
+
+    if not col_type:
+        return None
+    elif 'INT' in col_type:
+        return 'bigint'
+    elif ('CHAR' in col_type) or ('CLOB' in col_type) or ('TEXT' in col_type):
+        return 'text'
+    elif 'BLOB' in col_type:
+        return 'bytea'
+    elif ('REAL' in col_type) or ('FLOA' in col_type) or ('DOUB' in col_type):
+        return 'double precision'
+    elif 'BOOL' in col_type:
+        return 'boolean'
+    else:
+        return 'numeric'
+
+def _storage_classes(conn, table, col_names):
+    '''
+    Return a bitmask of the storage classes found in each column
+    with one scan of the table
+    '''
+
+    if not col_names:
+        return []
+
+    masks = ['total(DISTINCT CASE typeof({0}) '
+        "WHEN 'integer' THEN (CASE WHEN {0} IN (0, 1) THEN {1} ELSE {2} END) "
+        "WHEN 'real' THEN {3} WHEN 'text' THEN {4} WHEN 'blob' THEN {5} "
+        'ELSE 0 END)'.format(quote_ident(name), BOOL_INT, INT, REAL, TEXT,
+            BLOB) for name in col_names]
+
+    return [int(i) for i in conn.execute('SELECT {} FROM {}'.format(
+        ', '.join(masks), quote_ident(table))).fetchone()]
+
+def _fit_type(pg_type, mask):
+    '''
+    Widen a Postgres type if SQLite's dynamic typing let values of
+    other storage classes into a column
+    '''
+
+    if pg_type == 'text':
+        return 'text'
+    elif mask & BLOB:
+        return 'bytea' if mask == BLOB else 'text'
+    elif (mask & TEXT) or (pg_type == 'bytea' and mask):
+        return 'text'
+    elif mask & REAL:
+        return 'numeric' if pg_type == 'numeric' else 'double precision'
+    elif (mask & INT) and (pg_type == 'boolean'):
+        return 'bigint'
+    elif pg_type is None:
+        return 'bigint' if mask else 'text'
+
+    return pg_type
+
+def get_pg_schema(database, table):
+    '''
+    Return the column names and Postgres types for a SQLite table
+     * Types are converted from `PRAGMA table_info` once, and then checked
+       against the storage classes actually used (SQLite is dynamically
+       typed), e.g. an INTEGER column containing text becomes text
+    '''
+
+    schema = get_schema(database, table)
+    col_names = schema['col_names']
+    col_types = [sqlite_type(i) for i in schema['col_types']]
+
+    # Text columns accept anything, so only check the others
+    check = [i for i, j in enumerate(col_types) if j != 'text']
+
+    with closing(sqlite_connect(database)) as conn:
+        masks = _storage_classes(conn, table, [col_names[i] for i in check])
+
+    for i, mask in zip(check, masks):
+        col_types[i] = _fit_type(col_types[i], mask)
+
+    return col_names, col_types
+
+def _sqlite_batches(database, table, col_names, col_types,
+    batch_size=COPY_BATCH_SIZE):
+    '''
+    Serialize a SQLite table to CSV in batches of batch_size rows
+     * Runs in the background thread of a `PipelinedReader`, so it
+       opens its own connection
+    '''
+
+    with closing(sqlite_connect(database, check_same_thread=False)) as conn:
+        cur = conn.execute('SELECT {} FROM {}'.format(
+            ', '.join(quote_ident(i) for i in col_names), quote_ident(table)))
+
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+
+            yield to_csv(rows, col_types, strict_null=True)
+
+def _rowid_range(conn, table, col_names):
+    '''
+    Return (rowid alias, lowest rowid, highest rowid) for a table, or
+    None if it can't be split by rowid (it's empty, a WITHOUT ROWID
+    table, or its columns shadow every name for the rowid)
+    '''
+
+    names = set(i.lower() for i in col_names)
+    for alias in ('rowid', '_rowid_', 'oid'):
+        if alias not in names:
+            break
+    else:
+        return None
+
+    try:
+        low, high = conn.execute('SELECT min({0}), max({0}) FROM {1}'.format(
+            alias, quote_ident(table))).fetchone()
+    except sqlite3.OperationalError:
+        return None
+
+    if low is None:
+        return None
+    return alias, low, high
+
+# Connections opened by reader processes, by database
+_CONNECTIONS = {}
+
+def _read_range(database, query, col_types, start, stop):
+    ''' Serialize the rows with start <= rowid < stop in a reader process '''
+
+    if database not in _CONNECTIONS:
+        _CONNECTIONS[database] = sqlite_connect(database)
+
+    return to_csv(_CONNECTIONS[database].execute(query, (start, stop))\
+        .fetchall(), col_types, strict_null=True)
+
+class ReaderPool(object):
+    '''
+    Pool of processes reading large tables, which is only started
+    once it's needed
+
+    Args:
+        n_procs:    int
+                    Number of processes
+    '''
+
+    def __init__(self, n_procs):
+        self.n_procs = n_procs
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def apply_async(self, func, args):
+        with self.lock:
+            if self.pool is None:
+                self.pool = multiprocessing.get_context('spawn').Pool(
+                    self.n_procs)
+
+        return self.pool.apply_async(func, args)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+
+def _range_batches(database, table, col_names, col_types, rowids, pool,
+    batch_size=COPY_BATCH_SIZE):
+    '''
+    Serialize a SQLite table to CSV by reading ranges of batch_size
+    rowids in a `ReaderPool`
+     * Batches are yielded in rowid order
+     * At most two ranges per process are read ahead, so memory use
+       stays bounded even if Postgres is the bottleneck
+    '''
+
+    alias, low, high = rowids
+    query = 'SELECT {0} FROM {1} WHERE {2} >= ? AND {2} < ?'.format(
+        ', '.join(quote_ident(i) for i in col_names), quote_ident(table),
+        alias)
+
+    starts = iter(range(low, high + 1, batch_size))
+    pending = deque()
+
+    def submit(n):
+        for start in itertools.islice(starts, n):
+            pending.append(pool.apply_async(_read_range, (database, query,
+                col_types, start, start + batch_size)))
+
+    submit(2 * pool.n_procs)
+
+    while pending:
+        block = pending.popleft().get()
+        submit(1)
+        yield block
+
+def _reader_pool(n_procs=None):
+    ''' Return a `ReaderPool` if more than one process is wanted '''
+
+    n_procs = n_procs or os.cpu_count() or 1
+    return ReaderPool(n_procs) if n_procs > 1 else None
+
+def _migrate_table(sqlite_db, table, conn, hooks=None, progress=None,
+    pool=None):
+    '''
+    Create a Postgres table for a SQLite table and COPY its rows,
+    returning a `LoadReport`
+     * Tables spanning more than SPLIT_ROWS rowids are read by pool
+     * Does not commit
+    '''
+
+    report = LoadReport(table, hooks=hooks)
+    cur = conn.cursor()
+
+    with report.phase('schema'):
+        col_names, col_types = get_pg_schema(sqlite_db, table)
+        pg_names = ColumnList(col_names=col_names).sanitize()
+
+        total_rows = None
+        with closing(sqlite_connect(sqlite_db)) as sqlite_conn:
+            rowids = _rowid_range(sqlite_conn, table, col_names)
+
+            if progress:
+                total_rows = sqlite_conn.execute('SELECT count(*) FROM '
+                    '{}'.format(quote_ident(table))).fetchone()[0]
+
+    if pool and rowids and (rowids[2] - rowids[1] >= SPLIT_ROWS):
+        batches = _range_batches(sqlite_db, table, col_names, col_types,
+            rowids, pool)
+    else:
+        batches = _sqlite_batches(sqlite_db, table, col_names, col_types)
+
+    with report.phase('ddl'):
+        cur.execute(create_table(table, pg_names, col_types))
+
+    with report.phase('copy') as counts:
+        copy_from = "COPY {0} ({1}) FROM STDIN (FORMAT csv, DELIMITER ',')"\
+            .format(table, ', '.join(pg_names))
+
+        with PipelinedReader(batches, maxsize=COPY_QUEUE_SIZE) as pipeline:
+            reader = copy_reader(pipeline, progress, name=table,
+                total_rows=total_rows)
+            counts.rows = get_driver(conn).copy_in(conn, copy_from, reader)
+            counts.bytes = reader.bytes
+
+    return report
+
+def _index_names(table, indexes, used):
+    '''
+    Return Postgres style names for a table's indexes, e.g. orders_total_idx
+     * indexes: A list of (list of column names, unique) tuples
+     * used:    Set of names which are taken. The new names are added to it.
+     * Like in Postgres, long names are shortened before the suffix,
+       and duplicates are numbered (e.g. orders_total_idx1)
+    '''
+
+    names = []
+
+    for columns, unique in indexes:
+        label = '{}_{}'.format(table, '_'.join(columns)).encode('utf-8')
+        suffix = '_key' if unique else '_idx'
+        name = None
+        n = 0
+
+        while (name is None) or (name in used):
+            end = suffix + (str(n) if n else '')
+            name = label[:PG_MAX_IDENTIFIER - len(end)].decode('utf-8',
+                'ignore') + end
+            n += 1
+
+        used.add(name)
+        names.append(name)
+
+    return names
+
+def _plan_indexes(sqlite_db, tables, conn):
+    '''
+    Return a dict mapping each table to a list of
+    (Index, list of Postgres column names, index name) tuples
+
+    Index names are unique per schema in Postgres, so names are chosen
+    for every table at once and avoid every relation already in the
+    schema. Indexes already on the tables being migrated (i.e. from an
+    earlier run) are left out, so a re-run gets the same names and
+    `_build_indexes()` skips them.
+    '''
+
+    pg_tables = [table.lower() for table in tables]
+    used = set(pg_tables)
+    used.update(row[0] for row in get_driver(conn).execute(conn,
+        RELATIONS_QUERY, (pg_tables,)).fetchall())
+    plan = OrderedDict()
+
+    for table in tables:
+        col_names = get_schema(sqlite_db, table)['col_names']
+        pg_names = dict(zip(col_names,
+            ColumnList(col_names=col_names).sanitize()))
+
+        indexes = get_indexes(sqlite_db, table)
+        columns = [[pg_names[col] for col, _ in index.columns] for index \
+            in indexes]
+
+        # Auto-generated names (sqlite_autoindex_...) are replaced
+        # with Postgres style names
+        names = _index_names(table, [(cols, index.unique) for index, cols \
+            in zip(indexes, columns)], used)
+
+        plan[table] = list(zip(indexes, columns, names))
+
+    return plan
+
+def _build_indexes(sqlite_db, table, conn, report, indexes):
+    '''
+    Add a SQLite table's primary key and indexes to its Postgres copy
+     * indexes: The table's entry from `_plan_indexes()`
+     * An index whose name is already taken on this table is assumed
+       to be left over from an earlier run, and skipped
+     * Does not commit
+    '''
+
+    cur = conn.cursor()
+
+    with report.phase('index'):
+        col_names = get_schema(sqlite_db, table)['col_names']
+        pg_names = dict(zip(col_names,
+            ColumnList(col_names=col_names).sanitize()))
+
+        p_key = get_p_key(sqlite_db, table)
+        if p_key and not get_pkey(table, conn=conn):
+            cur.execute('ALTER TABLE {} ADD PRIMARY KEY ({})'.format(
+                table, ', '.join(pg_names[i] for i in p_key)))
+
+        for index, cols, name in indexes:
+            cur.execute('CREATE {unique}INDEX IF NOT EXISTS {name} ON {table} '
+                '({columns})'.format(
+                unique='UNIQUE ' if index.unique else '',
+                name=name,
+                table=table,
+                columns=', '.join(col + (' DESC' if desc else '') \
+                    for col, (_, desc) in zip(cols, index.columns))))
+
+def _migrate_worker(driver, conn, sqlite_db, table, indexes=None,
+    **kwargs):
+    '''
+    Migrate a table with a clone of conn and commit
+     * If indexes (the table's entry from `_plan_indexes()`) isn't None,
+       build the primary key and indexes after loading
+    '''
+
+    conn = driver.clone(conn)
+
+    try:
+        report = _migrate_table(sqlite_db, table, conn, **kwargs)
+
+        with report.phase('commit'):
+            conn.commit()
+
+        if indexes is not None:
+            _build_indexes(sqlite_db, table, conn, report, indexes)
+
+            with report.phase('commit'):
+                conn.commit()
+
+        return report
+    finally:
+        conn.close()
+
+def _migrate_tables(sqlite_db, tables, conn, n_jobs=4, indexes=False,
+    **kwargs):
+    '''
+    Migrate tables concurrently, returning a dict mapping table names
+    to `LoadReport`s
+     * If indexes, build each table's primary key and indexes after loading
+    '''
+
+    driver = get_driver(conn)
+    plan = _plan_indexes(sqlite_db, tables, conn) if indexes else {}
+
+    with ThreadPoolExecutor(max_workers=max(min(n_jobs, len(tables)),
+        1)) as executor:
+        futures = [executor.submit(_migrate_worker, driver, conn,
+            sqlite_db, table, indexes=plan.get(table), **kwargs) \
+            for table in tables]
+
+        return OrderedDict((table, future.result()) for table, future \
+            in zip(tables, futures))
+
 @postgres_connect
-def sqlite_to_postgres(sqlite_db, name, conn=None, **kwargs):
+def sqlite_to_postgres(sqlite_db, name=None, n_jobs=4, n_procs=None,
+    hooks=None, progress=None, conn=None, **kwargs):
     '''
+    Copy one or more tables from a SQLite database into Postgres
+
+     * Each table is streamed from SQLite straight into one `COPY`, so
+       memory use doesn't depend on the size of the table
+     * If several tables are copied, they are copied concurrently, each
+       with its own connection and transaction
+     * If a table already exists in Postgres, rows are appended to it
+     * NULLs and empty strings are kept apart, as in SQLite
+     * SQLite is opened read-only and memory-mapped. Tables spanning more
+       than a million rowids are read by `n_procs` processes (in rowid
+       ranges), so reading SQLite doesn't hold up COPY. Like any use of
+       `multiprocessing`, scripts should be guarded with
+       `if __name__ == '__main__'`.
+
     Parameters
     -----------
      * sqlite_db:   Name of the SQLite database
-     * name:        Name of the table
+     * name:        Name of a table, a list of names, or None for every table
+     * n_jobs:      Maximum number of tables copied at the same time
+     * n_procs:     Number of processes reading large tables
+                    (default: number of CPUs)
+     * hooks:       Functions called at the start and end of every
+                    phase of the load (see `pgreaper.add_hook()`)
+     * progress:    None, True, or function (see `pgreaper.instrument`)
      * host:        Host of the Postgres database
      * username:    Username for Postgres database
      * password:    Password for Postgres database
-     
+
     The original SQLite table schema will be used for the new PostgreSQL table, and original SQLite data types will be converted according to this conversion table:
 
-    +----------------+--------------------+
-    | SQLite Type    | PostgreSQL Type    |
-    +================+====================+
-    | TEXT           | TEXT               |
-    +----------------+--------------------+
-    | INTEGER        | BIGINT             |
-    +----------------+--------------------+
-    | REAL           | DOUBLE PRECISION   |
-    +----------------+--------------------+
-    '''
-    
-    sqlite_schema = get_schema(database=sqlite_db, table=name)
-    col_names = sqlite_schema['col_names']
-    
-    # Connect to SQL databases
-    with sqlite3.connect(sqlite_db) as sqlite_conn:       
-        sqlite_data = sqlite_conn.execute("SELECT * FROM {0}".format(name))
+    +----------------------------+--------------------+
+    | SQLite Type                | PostgreSQL Type    |
+    +============================+====================+
+    | Contains INT               | BIGINT             |
+    +----------------------------+--------------------+
+    | Contains CHAR, CLOB, TEXT  | TEXT               |
+    +----------------------------+--------------------+
+    | Contains BLOB              | BYTEA              |
+    +----------------------------+--------------------+
+    | Contains REAL, FLOA, DOUB  | DOUBLE PRECISION   |
+    +----------------------------+--------------------+
+    | Contains BOOL              | BOOLEAN            |
+    +----------------------------+--------------------+
+    | Anything else              | NUMERIC            |
+    +----------------------------+--------------------+
 
-        while True:
-            data_chunk = Table(dialect='postgres',
-                name=name, col_names=col_names,
-                # Apparently without a row argument fetchmany only 
-                # gets 1 row at a time
-                row_values=sqlite_data.fetchmany(10000))
-                
-            if data_chunk:
-                table_to_pg(data_chunk, conn=conn)
-            else:
-                break
\ No newline at end of file
+    Because SQLite is dynamically typed, a column holding values that
+    don't fit its type (e.g. text in an INTEGER column) is widened, usually
+    to TEXT. Columns without a declared type get the narrowest type which
+    fits their values.
+
+    Returns
+    --------
+    A `LoadReport` if name is a single table, or a dict mapping table
+    names to `LoadReport`s
+    '''
+
+    pool = _reader_pool(n_procs)
+
+    try:
+        if isinstance(name, str):
+            report = _migrate_table(sqlite_db, name, conn, hooks=hooks,
+                progress=progress, pool=pool)
+
+            with report.phase('commit'):
+                conn.commit()
+
+            return report
+
+        return _migrate_tables(sqlite_db,
+            list(name) if name else get_tables(sqlite_db), conn,
+            n_jobs=n_jobs, hooks=hooks, progress=progress, pool=pool)
+    finally:
+        conn.close()
+
+        if pool:
+            pool.close()
+
+@postgres_connect
+def sqlite_db_to_postgres(sqlite_db, n_jobs=4, n_procs=None, indexes=True,
+    hooks=None, progress=None, verbose=False, conn=None, **kwargs):
+    '''
+    Copy every table of a SQLite database into Postgres
+
+    Tables are loaded in the order that's fastest for bulk loads:
+     1. Tables are created without primary keys or indexes
+     2. Tables are loaded in parallel (see `sqlite_to_postgres()`)
+     3. Once a table is loaded, its primary key and indexes are built
+
+    Index names follow Postgres (e.g. albums_artistid_idx) and are unique
+    across the schema. When re-run against the same database, rows are
+    appended and indexes from the earlier run are kept.
+
+    **Basic Usage:**
+     >>> import pgreaper
+     >>> reports = pgreaper.sqlite_db_to_postgres('chinook.db', n_jobs=4,
+     ...    dbname='chinook', verbose=True)
+     >>> reports['albums'].rows
+     347
+
+    Parameters
+    -----------
+     * sqlite_db:   Name of the SQLite database
+     * n_jobs:      Maximum number of tables copied at the same time
+     * n_procs:     Number of processes reading large tables
+                    (default: number of CPUs)
+     * indexes:     Build primary keys and indexes after loading.
+                    Unique constraints become unique indexes, while
+                    partial indexes and indexes on expressions are skipped.
+     * hooks:       Functions called at the start and end of every
+                    phase of the load (see `pgreaper.add_hook()`)
+     * progress:    None, True, or function (see `pgreaper.instrument`)
+     * verbose:     Print the number of rows and time taken for each table
+
+    Returns
+    --------
+    A dict mapping table names to `LoadReport`s. Building the primary key
+    and indexes is timed as the 'index' phase.
+    '''
+
+    pool = _reader_pool(n_procs)
+
+    try:
+        reports = _migrate_tables(sqlite_db, get_tables(sqlite_db), conn,
+            n_jobs=n_jobs, indexes=indexes, hooks=hooks, progress=progress,
+            pool=pool)
+    finally:
+        conn.close()
+
+        if pool:
+            pool.close()
+
+    if verbose:
+        for table, report in reports.items():
+            print('{}: {:,} rows in {:.3f} s ({:.3f} s building '
+                'indexes)'.format(table, report.rows, report.seconds,
+                report.timings.get('index', 0)))
+
+    return reports
@@ -30,6 +30,10 @@ extensions = cython_or_c([
         "pgreaper.core.table",
         sources=["pgreaper/core/table.pyx"],
     ),
+    Extension(
+        "pgreaper.core.serialize",
+        sources=["pgreaper/core/serialize.pyx"],
+    ),
     Extension(
         "pgreaper.io.json_tools",
         sources=["pgreaper/io/json_tools.pyx"],
@@ -1,8 +1,13 @@
 ''' Tests for HTML Parsing '''
 
 import pgreaper
+from pgreaper.html.parser import html_to_tree
+from pgreaper.html.table import html_table
+from pgreaper.html.tree import HTMLNode
 
 import os
+import shutil
+import tempfile
 import unittest
 
 class HTMLTableTest(unittest.TestCase):
@@ -81,6 +86,29 @@ class HTMLTableTest(unittest.TestCase):
         self.assertEqual(table[0],
             HTMLTableTest.correct_first_row)
             
+    def test_copy(self):
+        ''' Test that changing a table doesn't change the original '''
+        table = HTMLTableTest.tables[1]
+        table[0][0] = 'Washington, D.C.'
+        table.delete('Population')
+        
+        self.assertEqual(HTMLTableTest.tables[1][0],
+            HTMLTableTest.correct_first_row)
+        self.assertEqual(HTMLTableTest.tables[1].col_names,
+            HTMLTableTest.correct_col_names)
+            
+    def test_rbind(self):
+        table = HTMLTableTest.tables.rbind(slice(1, 5), name='Leaders')
+        
+        self.assertEqual(table.name, 'Leaders')
+        self.assertEqual(len(table), 12)
+        self.assertEqual(table.col_names, HTMLTableTest.correct_col_names)
+        
+        table[0][0] = 'Washington, D.C.'
+        self.assertEqual(HTMLTableTest.tables[1][0],
+            HTMLTableTest.correct_first_row)
+        self.assertEqual(len(HTMLTableTest.tables.rbind(1, 2)), 6)
+            
     @unittest.skip("Not implemented")
     def test_direct_input(self):
         ''' Test that converting HTML from direct input works '''
@@ -128,6 +156,185 @@ class HTMLComplexTableTest(unittest.TestCase):
         self.assertEqual(table.name, "Your Parser Sucks")
         self.assertEqual(table.col_names, ['Apple', 'Banana', 'Guava', 'Orange'])
         self.assertEqual(table, correct)
+        
+class HTMLTreeTest(unittest.TestCase):
+    ''' Test the tree built by HTMLTreeParser '''
+    
+    def setUp(self):
+        self.tree = html_to_tree('<table id="t"><tr><th colspan="2">a</th>'
+            '<th>b</th></tr><tr><td>1</td><td rowspan="2">2</td></tr></table>')
+    
+    def test_attrs(self):
+        header = self.tree.get_child('tr')
+        
+        self.assertEqual(self.tree.tag, 'table')
+        self.assertEqual(self.tree.attrs, {'id': 't'})
+        self.assertEqual(header.children[0].span('colspan'), 2)
+        self.assertEqual(header.children[0].span('rowspan'), 1)
+        self.assertEqual(header.children[0].get_data(), 'a')
+        
+    def test_tag_index(self):
+        self.assertEqual(len(self.tree.search_tag('td')), 2)
+        self.assertIsNone(self.tree.get_child('tbody'))
+        
+        # Looking up tags shouldn't make them look like children
+        header = self.tree.get_child('tr')
+        self.assertEqual(header.get_child_tags(), {'th': 2})
+        
+        # Index is rebuilt when children are added
+        HTMLNode('tr', self.tree)
+        self.assertEqual(len(self.tree.search_tag('tr', recurse=False)), 3)
+        
+    def test_search_tag(self):
+        cells = self.tree.search_tag(['td', 'th'])
+        self.assertEqual([cell.get_data() for cell in cells],
+            ['a', 'b', '1', '2'])
+        self.assertEqual(len(self.tree.search_tag('td', n=1)), 1)
+        
+        # Trees built without a parser are searched by walking them
+        root = HTMLNode('table')
+        row = HTMLNode('tr', root)
+        HTMLNode('th', row)
+        HTMLNode('td', row)
+        self.assertEqual([node.tag for node in root.search_tag(['td', 'th'])],
+            ['th', 'td'])
+        
+    def test_document_order(self):
+        ''' Test that nested tables come right after the table they're in '''
+        
+        html_code = '''<h2>Outer</h2><table><tr><th>A</th></tr><tr><td>
+            <table><caption>Inner</caption><tr><td>1</td></tr></table>
+            </td></tr></table><p>Intro</p><h2>Last</h2>
+            <table><tr><td>2</td></tr></table>'''
+        
+        for stream in [False, True]:
+            tables = pgreaper.html.from_string(
+                '<html><body><p>Intro</p>' + html_code + '</body></html>',
+                stream=stream)
+            self.assertEqual([table.name for table in tables],
+                ['Outer', 'Inner', 'Last'])
+        
+class HTMLStreamTest(unittest.TestCase):
+    ''' Test parsing with stream=True '''
+    
+    def test_same_tables(self):
+        ''' Test that streaming finds the same tables as building a tree '''
+        
+        for file in ['table_test.html', 'complex_table_test.html']:
+            file = os.path.join('data', file)
+            tree = pgreaper.html.from_file(file)
+            stream = pgreaper.html.from_file(file, stream=True)
+            
+            self.assertEqual(len(tree), len(stream))
+            for x, y in zip(tree, stream):
+                self.assertEqual(x.name, y.name)
+                self.assertEqual(x.col_names, y.col_names)
+                self.assertEqual(x, y)
+                
+    def test_iter_file(self):
+        names = [table.name for table in pgreaper.html.iter_file(
+            os.path.join('data', 'table_test.html'))]
+        self.assertEqual(names, ['FDR', 'Winston Churchill', 'Joseph Stalin',
+            'Charles de Gaulle', 'Chiang Kai-shek'])
+            
+    def test_void_elements(self):
+        ''' Test that unclosed elements like <img> don't break streaming '''
+        
+        html_code = '''<html><head><meta charset="utf-8"></head><body>
+            <div><p>Intro</p><h2>Country Info</h2><img src="flag.png"><br><table>
+                <tr><th>Capital</th><th>Country</th></tr>
+                <tr><td>Washington</td><td>USA</td></tr>
+            </table></div>
+            <table><tr><td>Moscow</td><td>Russia</td></tr></table>
+        </body></html>'''
+        
+        tables = pgreaper.html.from_string(html_code, stream=True)
+        
+        self.assertEqual(len(tables), 2)
+        self.assertEqual(tables[0].name, 'Country Info')
+        self.assertEqual(tables[0].col_names, ['Capital', 'Country'])
+        self.assertEqual(tables[0], [['Washington', 'USA']])
+        self.assertEqual(tables[1], [['Moscow', 'Russia']])
+        
+    def test_implicit_close(self):
+        ''' Test tables whose cells and rows don't have end tags '''
+        
+        html_code = '''<html><body>
+            <table><tr><th>a<th>b<tr><td>1<td>2</table>
+            <p>Text</p>
+            <table><tr><th>c<th>d<tr><td>3<td>4
+        </body></html>'''
+        
+        tree = pgreaper.html.from_string(html_code)
+        tables = pgreaper.html.from_string(html_code, stream=True)
+        
+        self.assertEqual(len(tables), 2)
+        self.assertEqual(len(tree), len(tables))
+        for x, y in zip(tree, tables):
+            self.assertEqual(x.col_names, y.col_names)
+            self.assertEqual(x, y)
+        
+class HTMLBatchTest(unittest.TestCase):
+    ''' Test parsing many files with from_files() '''
+    
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for i in range(3):
+            shutil.copy(os.path.join('data', 'table_test.html'),
+                os.path.join(self.dir, 'report{}.html'.format(i)))
+        
+        os.mkdir(os.path.join(self.dir, 'old'))
+        shutil.copy(os.path.join('data', 'complex_table_test.html'),
+            os.path.join(self.dir, 'old', 'complex.htm'))
+        
+        with open(os.path.join(self.dir, 'broken.html'), mode='wb') as file:
+            file.write(b'<table><tr><td>\xff\xfe</td></tr></table>')
+    
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        
+    def test_from_files(self):
+        for n_procs in [1, 2]:
+            result = pgreaper.html.from_files(self.dir, n_procs=n_procs)
+            
+            self.assertEqual([os.path.basename(i) for i in result.results],
+                ['report0.html', 'report1.html', 'report2.html'])
+            self.assertEqual(len(result.results[os.path.join(self.dir,
+                'report1.html')]), 5)
+            
+            # Bad files shouldn't stop the batch
+            self.assertEqual(list(result.errors),
+                [os.path.join(self.dir, 'broken.html')])
+            self.assertIn('UnicodeDecodeError', result.errors[
+                os.path.join(self.dir, 'broken.html')])
+                
+    def test_recursive(self):
+        result = pgreaper.html.from_files(os.path.join(self.dir, '**',
+            '*.htm'), n_procs=1, recursive=True)
+        self.assertEqual(list(result.results),
+            [os.path.join(self.dir, 'old', 'complex.htm')])
+            
+    def test_group_tables(self):
+        result = pgreaper.html.from_files(self.dir, n_procs=1)
+        tables = pgreaper.html.group_tables(result.results)
+        
+        # Tables with the same header are merged
+        self.assertEqual([table.name for table in tables],
+            ['FDR', 'Winston Churchill'])
+        self.assertEqual([len(table) for table in tables], [12, 36])
+        self.assertEqual(tables[1].col_names,
+            ['Capital', 'Country', 'Population'])
+        self.assertEqual(tables[1][0], HTMLTableTest.correct_first_row)
+        
+    def test_group_tables_types(self):
+        ''' Test that column types are guessed for merged tables '''
+        
+        tables = [html_table(n_cols=2, col_names=['id', 'price'],
+            row_values=rows) for rows in ([[1, 2.5]], [[2, 4.0], [3, None]])]
+        group = pgreaper.html.group_tables(tables)[0]
+        
+        self.assertEqual(len(group), 3)
+        self.assertEqual(group.col_types, ['bigint', 'double precision'])
             
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
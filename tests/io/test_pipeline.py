@@ -0,0 +1,55 @@
+''' Tests for the pipelined file-like object used by COPY '''
+
+from pgreaper.io.pipeline import PipelinedReader
+
+import unittest
+
+class PipelinedReaderTest(unittest.TestCase):
+    def test_read_sized(self):
+        ''' Reading in small pieces returns every block in order '''
+        reader = PipelinedReader(('abc', 'de', '', 'fghij'), maxsize=1)
+        data = ''
+
+        while True:
+            piece = reader.read(2)
+            if not piece:
+                break
+            self.assertLessEqual(len(piece), 2)
+            data += piece
+
+        self.assertEqual(data, 'abcdefghij')
+
+    def test_read_all(self):
+        reader = PipelinedReader(str(i) for i in range(100))
+        first = reader.read(5)
+        self.assertEqual(first + reader.read(),
+            ''.join(str(i) for i in range(100)))
+        self.assertEqual(reader.read(), '')
+
+    def test_bytes(self):
+        reader = PipelinedReader([b'ab', b'cd'])
+        self.assertEqual(reader.read(3), b'ab')
+        self.assertEqual(reader.read(3), b'cd')
+        self.assertEqual(reader.read(3), b'')
+
+    def test_error(self):
+        ''' Errors in the producer are raised in the consumer '''
+        def blocks():
+            yield 'abc'
+            raise ValueError('Bad row')
+
+        reader = PipelinedReader(blocks())
+        self.assertEqual(reader.read(10), 'abc')
+
+        with self.assertRaises(ValueError):
+            reader.read(10)
+
+    def test_close_early(self):
+        ''' Closing the reader stops a producer blocked on a full queue '''
+        with PipelinedReader(('x' for i in range(1000)), maxsize=2) as reader:
+            reader.read(1)
+
+        self.assertFalse(reader.thread.is_alive())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,7 @@ try:
 except ImportError:
     pass
     
+import datetime
 import psycopg2
 import unittest
 
@@ -59,5 +60,135 @@ class FromPandas(PostgresTestCase):
         else:
             pass
 
+class ToPandasTest(unittest.TestCase):
+    ''' Test that Tables are converted to DataFrames with the right dtypes '''
+    
+    @unittest.skipUnless(TEST_OPTIONAL_DEPENDENCY, 'Skipping optional dependency')
+    def test_dtypes(self):
+        table = pgreaper.Table('Dtypes',
+            col_names=['Int', 'NullInt', 'Float', 'Text'],
+            row_values=[[1, 1, 1.5, 'a'], [2, None, None, 'b']])
+        df = pgreaper.table_to_pandas(table)
+        
+        self.assertEqual([str(i) for i in df.dtypes],
+            ['int64', 'Int64', 'float64', 'object'])
+        self.assertEqual(df['Int'].tolist(), [1, 2])
+        
+    @unittest.skipUnless(TEST_OPTIONAL_DEPENDENCY, 'Skipping optional dependency')
+    def test_timestamp(self):
+        table = pgreaper.Table('Dates', col_names=['Date'],
+            row_values=[[datetime.datetime(2017, 1, 1)], [None]])
+        df = pgreaper.table_to_pandas(table)
+        self.assertEqual(df['Date'].dtype.kind, 'M')
+        
+class DtypesTest(PostgresTestCase):
+    ''' Test that new tables are created from a DataFrame's dtypes '''
+    
+    drop_tables = ['df_dtypes']
+    
+    @classmethod
+    def setUpClass(cls):
+        if TEST_OPTIONAL_DEPENDENCY:
+            df = pandas.DataFrame({
+                'Int': [1, 2, 3],
+                'Float': [1.5, None, 3.5],
+                'Bool': [True, False, True],
+                'Text': ['a', None, 'c'],
+                'Json': [{'a': 1}, [1, 2], None],
+                'Date': pandas.to_datetime(
+                    ['2017-01-01 00:00', '2017-06-01 12:30', None])
+            })
+            
+            pgreaper.copy_df(df, name='df_dtypes', dbname=TEST_DB)
+            
+    @unittest.skipUnless(TEST_OPTIONAL_DEPENDENCY, 'Skipping optional dependency')
+    def test_col_types(self):
+        self.assertColumnTypes('df_dtypes', ['bigint', 'double precision',
+            'boolean', 'text', 'jsonb', 'timestamp without time zone'])
+            
+    @unittest.skipUnless(TEST_OPTIONAL_DEPENDENCY, 'Skipping optional dependency')
+    def test_nulls(self):
+        self.cursor.execute('SELECT count(*) FROM df_dtypes WHERE '
+            'float IS NULL AND text IS NULL AND date IS NOT NULL')
+        self.assertEqual(self.cursor.fetchone()[0], 1)
+        
+    @unittest.skipUnless(TEST_OPTIONAL_DEPENDENCY, 'Skipping optional dependency')
+    def test_jsonb(self):
+        self.cursor.execute("SELECT json->>'a' FROM df_dtypes WHERE int = 1")
+        self.assertEqual(self.cursor.fetchone()[0], '1')
+        
+    @classmethod
+    def tearDownClass(cls):
+        if TEST_OPTIONAL_DEPENDENCY:
+            super(DtypesTest, cls).tearDownClass()
+
+class EmptyStringTest(PostgresTestCase):
+    ''' Test that empty strings and missing values are loaded differently '''
+    
+    drop_tables = ['df_empty_one', 'df_empty_many']
+    
+    @classmethod
+    def setUpClass(cls):
+        if TEST_OPTIONAL_DEPENDENCY:
+            pgreaper.copy_df(pandas.DataFrame({'Text': ['a', '', None]}),
+                name='df_empty_one', dbname=TEST_DB)
+            pgreaper.copy_df(pandas.DataFrame({'Number': [1, 2, 3],
+                'Text': ['a', '', None], 'Other': ['', None, 'c']}),
+                name='df_empty_many', dbname=TEST_DB)
+            
+    def assertValues(self, query, values):
+        self.cursor.execute(query)
+        self.assertEqual([i[0] for i in self.cursor.fetchall()], values)
+                
+    @unittest.skipUnless(TEST_OPTIONAL_DEPENDENCY, 'Skipping optional dependency')
+    def test_one_column(self):
+        self.assertValues('SELECT text FROM df_empty_one', ['a', '', None])
+        
+    @unittest.skipUnless(TEST_OPTIONAL_DEPENDENCY, 'Skipping optional dependency')
+    def test_many_columns(self):
+        self.assertValues('SELECT text FROM df_empty_many ORDER BY number',
+            ['a', '', None])
+        self.assertValues('SELECT other FROM df_empty_many ORDER BY number',
+            ['', None, 'c'])
+        
+    @classmethod
+    def tearDownClass(cls):
+        if TEST_OPTIONAL_DEPENDENCY:
+            super(EmptyStringTest, cls).tearDownClass()
+
+class ChunksTest(PostgresTestCase):
+    ''' Test loading DataFrames in chunks '''
+    
+    drop_tables = ['df_chunksize', 'df_iterator']
+    
+    @classmethod
+    def setUpClass(cls):
+        if TEST_OPTIONAL_DEPENDENCY:
+            df = pandas.DataFrame({'Number': list(range(0, 5)),
+                'Letter': ['a', 'b', 'c', 'd', 'e']})
+            pgreaper.copy_df(df, name='df_chunksize', chunksize=2,
+                dbname=TEST_DB)
+            
+            # Missing values turn the second chunk's ints into floats
+            chunks = iter([
+                pandas.DataFrame({'Number': [1, 2]}),
+                pandas.DataFrame({'Number': [3, None, 5]})
+            ])
+            pgreaper.copy_df(chunks, name='df_iterator', dbname=TEST_DB)
+            
+    @unittest.skipUnless(TEST_OPTIONAL_DEPENDENCY, 'Skipping optional dependency')
+    def test_chunksize(self):
+        self.assertCount('df_chunksize', 5)
+        
+    @unittest.skipUnless(TEST_OPTIONAL_DEPENDENCY, 'Skipping optional dependency')
+    def test_iterator(self):
+        self.assertCount('df_iterator', 5)
+        self.assertColumnTypes('df_iterator', ['bigint'])
+        
+    @classmethod
+    def tearDownClass(cls):
+        if TEST_OPTIONAL_DEPENDENCY:
+            super(ChunksTest, cls).tearDownClass()
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,7 +1,7 @@
 ''' Integration tests for PostgreSQL '''
 
 import pgreaper
-from pgreaper.postgres.loader import _modify_tables
+from pgreaper.postgres.loader import _modify_tables, COPY_BATCH_SIZE
 from pgreaper.postgres import *
 from pgreaper.core import ColumnList
 from pgreaper.testing import *
@@ -155,5 +155,80 @@ class SubsetTest(PostgresTestCase):
     def test_count(self):
         self.assertCount('persons', 50000)
         
+class PipelinedCopyTest(PostgresTestCase):
+    ''' Test loading a Table large enough to be serialized in batches '''
+    
+    drop_tables = ['pipelined']
+    
+    def test_load(self):
+        n_rows = 2 * COPY_BATCH_SIZE + 1
+        table = pgreaper.Table('pipelined', col_names=['id', 'data'],
+            row_values=[[i, {'id': i}] for i in range(n_rows)])
+        pgreaper.copy_table(table, dbname=TEST_DB)
+        
+        self.assertCount('pipelined', n_rows)
+        self.cursor.execute("SELECT sum((data->>'id')::bigint) FROM pipelined")
+        self.assertEqual(self.cursor.fetchone()[0], sum(range(n_rows)))
+        
+        # Input rows should not have been modified
+        self.assertEqual(table[0][1], {'id': 0})
+        
+class LoadReportTest(PostgresTestCase):
+    ''' Test the timing reports returned by loaders '''
+    
+    drop_tables = ['load_report', 'load_report_progress']
+    
+    def test_copy_table(self):
+        events = []
+        table = pgreaper.Table('load_report', col_names=['id', 'name'],
+            row_values=[[1, 'Ted'], [2, 'Fred']], p_key=0)
+        report = pgreaper.copy_table(table, dbname=TEST_DB,
+            hooks=[events.append])
+        
+        self.assertEqual(list(report.timings),
+            ['infer', 'schema', 'ddl', 'copy', 'commit'])
+        self.assertEqual(report.rows, 2)
+        self.assertEqual(report.bytes, len('1,Ted\n2,Fred\n'))
+        self.assertEqual(len(events), 10)
+        
+        # Upsert with a conflict
+        table = pgreaper.Table('load_report', col_names=['id', 'name'],
+            row_values=[[2, 'Wilma'], [3, 'Barney']], p_key=0)
+        report = pgreaper.copy_table(table, dbname=TEST_DB)
+        self.assertEqual(report.counts['upsert'], (1, 0, 1))
+        self.assertCount('load_report', 3)
+        
+    def test_progress(self):
+        updates = []
+        table = pgreaper.Table('load_report_progress', col_names=['id'],
+            row_values=[[i] for i in range(COPY_BATCH_SIZE + 1)])
+        pgreaper.copy_table(table, dbname=TEST_DB, progress=updates.append)
+        
+        self.assertTrue(updates[-1].done)
+        self.assertEqual(updates[-1].rows, COPY_BATCH_SIZE + 1)
+        self.assertEqual(updates[-1].total_rows, COPY_BATCH_SIZE + 1)
+        
+class StrictNullTest(PostgresTestCase):
+    ''' Test how empty strings and None are loaded '''
+    
+    drop_tables = ['nulls_default', 'nulls_strict']
+    
+    def load(self, name, **kwargs):
+        table = pgreaper.Table(name, col_names=['name', 'data'],
+            row_values=[['Ted', {'a': 1}], ['', None]])
+        pgreaper.copy_table(table, dbname=TEST_DB, **kwargs)
+        self.cursor.execute("SELECT name IS NULL, data IS NULL, "
+            "data = 'null'::jsonb FROM {} WHERE name IS DISTINCT FROM "
+            "'Ted'".format(name))
+        return self.cursor.fetchone()
+    
+    def test_default(self):
+        ''' Like csv.writer, empty strings are NULL and None is JSON null '''
+        self.assertEqual(self.load('nulls_default'), (True, False, True))
+        
+    def test_strict_null(self):
+        self.assertEqual(self.load('nulls_strict', strict_null=True),
+            (False, True, None))
+        
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
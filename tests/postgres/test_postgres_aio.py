@@ -0,0 +1,140 @@
+''' Tests for the asynchronous loaders '''
+
+from pgreaper.testing import *
+
+import asyncio
+import json
+import tempfile
+from pgreaper import aio
+psycopg = import_package('psycopg')
+asyncpg = import_package('asyncpg')
+
+@unittest.skipUnless(psycopg, 'psycopg (version 3) is not installed')
+class AsyncTest(PostgresTestCase):
+    ''' Test the coroutine versions of copy_table, copy_json, and read_pg '''
+
+    driver = 'psycopg'
+    drop_tables = ['aio_table', 'aio_upsert', 'aio_ndjson', 'aio_json',
+        'aio_json_null']
+
+    data = Table('aio_table',
+        col_names=['id', 'name'],
+        row_values=[[1, 'Ted'], [2, "O'Donnell"], [3, 'Jack, "Jr"']])
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    async def connect(self):
+        return await aio.connect(dbname=TEST_DB, driver=self.driver)
+
+    def test_copy_table(self):
+        self.run_async(aio.copy_table(self.data, dbname=TEST_DB,
+            driver=self.driver))
+        self.assertCount('aio_table', 3)
+
+    def test_upsert(self):
+        self.cursor.execute('DROP TABLE IF EXISTS aio_upsert')
+        self.cursor.execute('CREATE TABLE aio_upsert (id bigint PRIMARY KEY, '
+            'name text)')
+        self.cursor.execute("INSERT INTO aio_upsert VALUES (1, 'Old')")
+        self.conn.commit()
+
+        self.run_async(aio.copy_table(self.data, name='aio_upsert',
+            on_p_key='replace', dbname=TEST_DB, driver=self.driver))
+        self.cursor.execute('SELECT name FROM aio_upsert WHERE id = 1')
+        self.assertEqual(self.cursor.fetchone()[0], 'Ted')
+        self.assertCount('aio_upsert', 3)
+
+    def test_copy_json(self):
+        rows = [{'id': i, 'value': 'abc'} for i in range(100)]
+
+        with tempfile.TemporaryDirectory() as dir:
+            ndjson = os.path.join(dir, 'data.ndjson')
+            with open(ndjson, mode='w') as outfile:
+                outfile.write('\n'.join(json.dumps(i) for i in rows))
+
+            array = os.path.join(dir, 'data.json')
+            with open(array, mode='w') as outfile:
+                json.dump(rows, outfile)
+
+            async def load():
+                await asyncio.gather(
+                    aio.copy_json(ndjson, name='aio_ndjson', dbname=TEST_DB,
+                        driver=self.driver),
+                    aio.copy_json(array, name='aio_json', dbname=TEST_DB,
+                        driver=self.driver))
+
+            self.run_async(load())
+
+        self.assertCount('aio_ndjson', 100)
+        self.assertCount('aio_json', 100)
+
+    def test_copy_json_options(self):
+        ''' null_values is used, and commit=False leaves conn open '''
+
+        with tempfile.TemporaryDirectory() as dir:
+            array = os.path.join(dir, 'data.json')
+            with open(array, mode='w') as outfile:
+                json.dump([{'id': 1}, {}, {'id': 2}], outfile)
+
+            async def load():
+                conn = await self.connect()
+                try:
+                    await aio.copy_json(array, name='aio_json_null',
+                        null_values='{}', commit=False, conn=conn)
+                    return await aio.read_pg('SELECT json_data IS NULL '
+                        'FROM aio_json_null', conn=conn)
+                finally:
+                    await conn.close()
+
+            table = self.run_async(load())
+
+        self.assertEqual([row[0] for row in table], [False, True, False])
+
+    def test_read_pg(self):
+        async def read():
+            conn = await self.connect()
+            try:
+                return await aio.read_pg(
+                    'SELECT i, i::text FROM generate_series(1, 10) AS i',
+                    conn=conn)
+            finally:
+                await conn.close()
+
+        table = self.run_async(read())
+        self.assertEqual(len(table), 10)
+        self.assertEqual(table[9], [10, '10'])
+
+    def test_read_pg_show(self):
+        async def read():
+            conn = await self.connect()
+            try:
+                return await aio.read_pg('SHOW client_encoding', conn=conn)
+            finally:
+                await conn.close()
+
+        table = self.run_async(read())
+        self.assertEqual(table.col_names, ['client_encoding'])
+        self.assertEqual(len(table), 1)
+
+    def test_read_pg_chunksize(self):
+        async def read():
+            conn = await self.connect()
+            try:
+                tables = await aio.read_pg(
+                    'SELECT * FROM generate_series(1, 25) AS i',
+                    chunksize=10, itersize=7, conn=conn)
+                return [len(table) async for table in tables]
+            finally:
+                await conn.close()
+
+        self.assertEqual(self.run_async(read()), [10, 10, 5])
+
+@unittest.skipUnless(asyncpg, 'asyncpg is not installed')
+class AsyncpgTest(AsyncTest):
+    ''' Same tests as above but using the asyncpg driver '''
+    
+    driver = 'asyncpg'
+
+if __name__ == '__main__':
+    unittest.main()
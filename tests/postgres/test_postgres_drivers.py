@@ -0,0 +1,99 @@
+''' Tests for loading and reading through the psycopg 3 driver '''
+
+from pgreaper.testing import *
+from pgreaper.postgres import copy_table, get_pkey, pg_to_csv, read_pg
+from pgreaper.postgres.drivers import get_driver
+
+import datetime
+import tempfile
+psycopg = import_package('psycopg')
+
+class GetDriverTest(unittest.TestCase):
+    def test_by_name(self):
+        self.assertEqual(get_driver(name='psycopg2').name, 'psycopg2')
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            get_driver(name='harambe')
+
+    def test_not_connection(self):
+        self.assertEqual(get_driver('dbname=pgreaper_test'), None)
+
+@unittest.skipUnless(psycopg, 'psycopg (version 3) is not installed')
+class PsycopgTest(PostgresTestCase):
+    ''' Run the synchronous API on top of a psycopg 3 connection '''
+
+    drop_tables = ['psycopg_table', 'psycopg_upsert']
+
+    data = Table('psycopg_table',
+        col_names=['id', 'name', 'joined'],
+        row_values=[
+            [1, 'Ted', datetime.datetime(2017, 1, 1)],
+            [2, "O'Donnell", None],
+            [3, 'Jack\t"Jr"', datetime.datetime(2017, 1, 3)]],
+        p_key=0)
+
+    def setUp(self):
+        super(PsycopgTest, self).setUp()
+        self.pg3 = get_driver(name='psycopg').connect(
+            **PG_DEFAULTS(dbname=TEST_DB))
+
+    def tearDown(self):
+        super(PsycopgTest, self).tearDown()
+        self.pg3.close()
+
+    def load(self):
+        self.cursor.execute('DROP TABLE IF EXISTS psycopg_table')
+        self.conn.commit()
+        copy_table(self.data, conn=self.pg3, commit=False)
+        self.pg3.commit()
+
+    def test_copy_table(self):
+        self.load()
+        self.assertCount('psycopg_table', 3)
+        self.assertEqual(get_pkey('psycopg_table', conn=self.pg3).column, 'id')
+
+    def test_upsert(self):
+        self.cursor.execute('DROP TABLE IF EXISTS psycopg_upsert')
+        self.cursor.execute('CREATE TABLE psycopg_upsert (id bigint PRIMARY KEY, '
+            'name text)')
+        self.cursor.execute("INSERT INTO psycopg_upsert VALUES (1, 'Ted')")
+        self.conn.commit()
+
+        copy_table(Table('psycopg_upsert', col_names=['id', 'name'],
+            row_values=[[1, 'Fred'], [4, 'Wilma']]),
+            conn=self.pg3, on_p_key='replace', commit=False)
+        self.pg3.commit()
+
+        self.cursor.execute('SELECT name FROM psycopg_upsert WHERE id = 1')
+        self.assertEqual(self.cursor.fetchone()[0], 'Fred')
+        self.assertCount('psycopg_upsert', 2)
+
+    def test_read_pg(self):
+        self.load()
+        sql = 'SELECT * FROM psycopg_table ORDER BY id'
+        cursor = read_pg(sql, conn=self.pg3)
+        copy = read_pg(sql, conn=self.pg3, method='copy')
+
+        self.assertEqual(list(cursor), list(copy))
+        self.assertEqual(copy[2], [3, 'Jack\t"Jr"',
+            datetime.datetime(2017, 1, 3)])
+
+    def test_driver_kwarg(self):
+        self.load()
+        table = read_pg('SELECT count(*) FROM psycopg_table', dbname=TEST_DB,
+            driver='psycopg')
+        self.assertEqual(table[0][0], 3)
+
+    def test_pg_to_csv(self):
+        self.load()
+
+        with tempfile.TemporaryDirectory() as dir:
+            file = os.path.join(dir, 'psycopg_table.csv')
+            pg_to_csv('psycopg_table', file=file, verbose=False, conn=self.pg3)
+
+            with open(file) as infile:
+                self.assertEqual(len(infile.readlines()), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+''' Tests for exporting Postgres tables '''
+
+from pgreaper.testing import *
+from pgreaper.postgres import pg_to_csv_parallel
+
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+
+class ParallelExportTest(PostgresTestCase):
+    ''' Test that pg_to_csv_parallel() exports every row exactly once '''
+
+    drop_tables = ['export_pkey', 'export_no_pkey']
+
+    @classmethod
+    def setUpClass(cls):
+        with psycopg2.connect(**PG_DEFAULTS(dbname=TEST_DB)) as conn:
+            cur = conn.cursor()
+            cur.execute('DROP TABLE IF EXISTS export_pkey, export_no_pkey')
+            cur.execute('CREATE TABLE export_pkey AS SELECT i AS id, '
+                'md5(i::text) AS hash FROM generate_series(1, 1000) AS i')
+            cur.execute('ALTER TABLE export_pkey ADD PRIMARY KEY (id)')
+            cur.execute('CREATE TABLE export_no_pkey AS SELECT * FROM export_pkey')
+            conn.commit()
+
+    def setUp(self):
+        super(ParallelExportTest, self).setUp()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(ParallelExportTest, self).tearDown()
+        shutil.rmtree(self.dir)
+
+    def read_ids(self, manifest):
+        ''' Read the ids from every shard listed in a manifest '''
+        ids = []
+
+        for shard in manifest['shards']:
+            with gzip.open(os.path.join(self.dir, shard['file']),
+                mode='rt') as infile:
+                reader = csv.reader(infile)
+                next(reader)   # Header
+                ids += [int(row[0]) for row in reader]
+
+        return ids
+
+    def test_pkey(self):
+        manifest = pg_to_csv_parallel('export_pkey', dir=self.dir, n_jobs=3,
+            verbose=False, conn=self.conn)
+
+        self.assertEqual(len(manifest['shards']), 3)
+        self.assertEqual(manifest['rows'], 1000)
+        self.assertEqual(sorted(self.read_ids(manifest)), list(range(1, 1001)))
+
+    def test_ctid(self):
+        manifest = pg_to_csv_parallel('export_no_pkey', dir=self.dir,
+            n_jobs=3, verbose=False, conn=self.conn)
+
+        # Only split if the server supports TID range scans
+        self.assertEqual(len(manifest['shards']),
+            3 if self.conn.server_version >= 140000 else 1)
+        self.assertEqual(manifest['rows'], 1000)
+        self.assertEqual(sorted(self.read_ids(manifest)), list(range(1, 1001)))
+
+    def test_manifest(self):
+        pg_to_csv_parallel('export_pkey', dir=self.dir, n_jobs=2,
+            verbose=False, conn=self.conn)
+
+        with open(os.path.join(self.dir, 'manifest.json')) as infile:
+            manifest = json.load(infile)
+
+        self.assertEqual(manifest['table'], 'export_pkey')
+        self.assertEqual(sum(i['rows'] for i in manifest['shards']), 1000)
+
+    def test_session_restored(self):
+        ''' The caller's session settings are kept '''
+        self.conn.set_session(isolation_level='SERIALIZABLE')
+
+        try:
+            pg_to_csv_parallel('export_pkey', dir=self.dir, n_jobs=2,
+                verbose=False, conn=self.conn)
+            self.assertEqual(self.conn.isolation_level,
+                psycopg2.extensions.ISOLATION_LEVEL_SERIALIZABLE)
+            self.assertIsNone(self.conn.readonly)
+        finally:
+            self.conn.set_session(isolation_level='DEFAULT')
+
+    def test_open_transaction(self):
+        ''' Pending work on conn isn't rolled back '''
+        self.cursor.execute('SELECT 1')
+
+        try:
+            with self.assertRaises(ValueError):
+                pg_to_csv_parallel('export_pkey', dir=self.dir,
+                    verbose=False, conn=self.conn)
+        finally:
+            self.conn.rollback()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -65,5 +65,53 @@ class DBPostgresTest(PostgresTestCase):
         schema = get_table_schema('sasquatch', conn=self.conn)
         self.assertEqual(schema, ColumnList())
         
+class ReadPGTest(PostgresTestCase):
+    ''' Test that read_pg() returns query results correctly '''
+    
+    query = 'SELECT i, i * 1.5 AS half FROM generate_series(1, 5) AS i'
+    
+    def test_read(self):
+        table = read_pg(self.query, conn=self.conn)
+        self.assertEqual(table.col_names, ['i', 'half'])
+        self.assertEqual(len(table), 5)
+        self.assertEqual(table[0][0], 1)
+        
+    def test_empty(self):
+        table = read_pg('SELECT 1 AS one WHERE false', conn=self.conn)
+        self.assertEqual(table.col_names, ['one'])
+        self.assertEqual(len(table), 0)
+        
+    def test_show(self):
+        ''' Test statements which can't be used in a cursor '''
+        table = read_pg('SHOW client_encoding', conn=self.conn)
+        self.assertEqual(table.col_names, ['client_encoding'])
+        self.assertEqual(len(table), 1)
+        
+    def test_chunksize(self):
+        chunks = list(read_pg(self.query, chunksize=2, itersize=1,
+            conn=self.conn))
+        self.assertEqual([len(i) for i in chunks], [2, 2, 1])
+        self.assertEqual(chunks[-1]['i'], [5])
+        
+    def test_copy(self):
+        ''' Test that COPY TO returns the same values as a cursor '''
+        query = '''SELECT i, i * 1.5 AS half, 'a' || chr(9) || 'b\\c' AS text,
+                CASE WHEN i > 2 THEN NULL ELSE true END AS bool,
+                '{"x": 1}'::jsonb AS json,
+                '2017-01-01 10:00:00'::timestamp AS date
+            FROM generate_series(1, 5) AS i;'''
+        
+        table = read_pg(query, method='copy', conn=self.conn)
+        self.assertEqual(table.col_names,
+            ['i', 'half', 'text', 'bool', 'json', 'date'])
+        self.assertEqual(list(table), list(read_pg(query, conn=self.conn)))
+        self.assertEqual(table[0][2], 'a\tb\\c')
+        self.assertEqual(table[4][3], None)
+        
+    def test_copy_chunksize(self):
+        chunks = list(read_pg(self.query, method='copy', chunksize=2,
+            conn=self.conn))
+        self.assertEqual([len(i) for i in chunks], [2, 2, 1])
+        
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,47 @@
+''' Integration tests for loading many HTML files '''
+
+import pgreaper
+from pgreaper.testing import *
+
+import shutil
+import tempfile
+
+class CopyHTMLTest(PostgresTestCase):
+    ''' Test that tables from many files are grouped by their headers '''
+    
+    drop_tables = ['reports', 'reports_1']
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.mkdtemp()
+        
+        for i in range(3):
+            shutil.copy(path.join(DATA_DIR, 'table_test.html'),
+                path.join(cls.dir, 'report{}.html'.format(i)))
+                
+        with open(path.join(cls.dir, 'broken.html'), mode='wb') as file:
+            file.write(b'<table><tr><td>\xff\xfe</td></tr></table>')
+    
+        cls.result = pgreaper.copy_html(cls.dir, name='reports', n_procs=2,
+            dbname=TEST_DB)
+            
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dir)
+        super(CopyHTMLTest, cls).tearDownClass()
+        
+    def test_reports(self):
+        self.assertEqual(list(self.result.results), ['reports', 'reports_1'])
+        self.assertEqual(self.result.results['reports_1'].rows, 36)
+        
+    def test_count(self):
+        self.assertCount('reports', 12)
+        self.assertCount('reports_1', 36)
+        
+    def test_schema(self):
+        self.assertColumnNames('reports_1',
+            ['capital', 'country', 'population'])
+            
+    def test_errors(self):
+        self.assertEqual(list(self.result.errors),
+            [path.join(self.dir, 'broken.html')])
@@ -5,7 +5,10 @@ from pgreaper.testing import *
 from pgreaper.postgres.conn import postgres_connect
 from pgreaper.sqlite import to_postgres
 
+from contextlib import closing
 import sqlite3
+import tempfile
+import warnings
             
 class SQLiteToPGTest(PostgresTestCase):
     ''' Test if SQLite to Postgres conversion works '''
@@ -29,6 +32,266 @@ class SQLiteToPGTest(PostgresTestCase):
         
     def test_col_types(self):
         self.assertColumnTypes('random_numbers', ['double precision'] * 5)
+        
+class SQLiteTypeTest(unittest.TestCase):
+    ''' Test converting SQLite types to Postgres types '''
+    
+    def test_affinity(self):
+        self.assertEqual([to_postgres.sqlite_type(i) for i in ['INTEGER',
+            'TINYINT', 'VARCHAR(255)', 'BLOB', 'FLOAT', 'BOOLEAN', 'DECIMAL',
+            '']], ['bigint', 'bigint', 'text', 'bytea', 'double precision',
+            'boolean', 'numeric', None])
+            
+    def test_fit_type(self):
+        fit = to_postgres._fit_type
+        self.assertEqual(fit('bigint', to_postgres.INT), 'bigint')
+        self.assertEqual(fit('bigint', to_postgres.INT | to_postgres.REAL),
+            'double precision')
+        self.assertEqual(fit('bigint', to_postgres.TEXT), 'text')
+        self.assertEqual(fit('boolean', to_postgres.BOOL_INT), 'boolean')
+        self.assertEqual(fit('boolean', to_postgres.INT), 'bigint')
+        self.assertEqual(fit(None, 0), 'text')
+        self.assertEqual(fit(None, to_postgres.BLOB), 'bytea')
+        
+class SQLiteConnectTest(unittest.TestCase):
+    ''' Test the read-only connections used for migrations '''
+    
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.sqlite_db = os.path.join(self.dir.name, 'test.db')
+        
+        with closing(sqlite3.connect(self.sqlite_db)) as conn:
+            conn.execute('CREATE TABLE numbers (x INTEGER)')
+            conn.execute('CREATE TABLE shadowed (rowid, _rowid_, oid)')
+            conn.execute('CREATE TABLE no_rowid (x INTEGER PRIMARY KEY) '
+                'WITHOUT ROWID')
+            conn.executemany('INSERT INTO numbers VALUES (?)',
+                [(i,) for i in range(10)])
+            conn.commit()
+            
+    def tearDown(self):
+        self.dir.cleanup()
+        
+    def test_read_only(self):
+        with closing(to_postgres.sqlite_connect(self.sqlite_db)) as conn:
+            self.assertEqual(conn.execute('PRAGMA query_only').fetchone(),
+                (1,))
+            
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute('INSERT INTO numbers VALUES (1)')
+                
+    def test_rowid_range(self):
+        with closing(to_postgres.sqlite_connect(self.sqlite_db)) as conn:
+            self.assertEqual(to_postgres._rowid_range(conn, 'numbers',
+                ['x']), ('rowid', 1, 10))
+            self.assertIsNone(to_postgres._rowid_range(conn, 'shadowed',
+                ['rowid', '_rowid_', 'oid']))
+            self.assertIsNone(to_postgres._rowid_range(conn, 'no_rowid',
+                ['x']))
+        
+class SQLiteSplitTest(PostgresTestCase):
+    ''' Test reading a large table in rowid ranges with several processes '''
+    
+    drop_tables = ['lite_split']
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.TemporaryDirectory()
+        cls.sqlite_db = os.path.join(cls.dir.name, 'test.db')
+        
+        with closing(sqlite3.connect(cls.sqlite_db)) as conn:
+            conn.execute('CREATE TABLE lite_split (x INTEGER, y TEXT)')
+            conn.executemany('INSERT INTO lite_split VALUES (?, ?)',
+                [(i, str(i)) for i in range(25000)])
+            
+            # Leave some gaps in the rowids
+            conn.execute('DELETE FROM lite_split WHERE x % 7 = 0')
+            conn.commit()
+            
+        split_rows = to_postgres.SPLIT_ROWS
+        to_postgres.SPLIT_ROWS = 1000
+        
+        try:
+            cls.report = pgreaper.sqlite_to_postgres(cls.sqlite_db,
+                'lite_split', n_procs=2, dbname=TEST_DB)
+        finally:
+            to_postgres.SPLIT_ROWS = split_rows
+            
+    @classmethod
+    def tearDownClass(cls):
+        super(SQLiteSplitTest, cls).tearDownClass()
+        cls.dir.cleanup()
+        
+    def test_count(self):
+        n = len([i for i in range(25000) if i % 7])
+        self.assertEqual(self.report.rows, n)
+        self.assertCount('lite_split', n)
+        
+    def test_values(self):
+        self.cursor.execute('SELECT sum(x), count(DISTINCT y) FROM lite_split '
+            'WHERE x::text = y')
+        self.assertEqual(self.cursor.fetchone(),
+            (sum(i for i in range(25000) if i % 7), 21428))
+        
+class SQLiteDBToPGTest(PostgresTestCase):
+    ''' Test copying every table of a SQLite database at once '''
+    
+    drop_tables = ['lite_people', 'lite_files']
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.TemporaryDirectory()
+        cls.sqlite_db = os.path.join(cls.dir.name, 'test.db')
+        
+        with closing(sqlite3.connect(cls.sqlite_db)) as conn:
+            conn.execute('CREATE TABLE lite_people (Name TEXT, Age INTEGER, '
+                'Score REAL, Active BOOLEAN, Misc)')
+            conn.executemany('INSERT INTO lite_people VALUES (?, ?, ?, ?, ?)',
+                [('Ted, Jr.', 30, 1.5, 1, 1), ('', None, 2, 0, 'text'),
+                 (None, 'unknown', None, None, None)])
+            conn.execute('CREATE TABLE lite_files (name TEXT, data BLOB)')
+            conn.executemany('INSERT INTO lite_files VALUES (?, ?)',
+                [('file{}'.format(i), bytes([i % 256, 255])) for i in range(20000)])
+            conn.commit()
+            
+        cls.reports = pgreaper.sqlite_to_postgres(cls.sqlite_db, n_jobs=2,
+            dbname=TEST_DB)
+            
+    @classmethod
+    def tearDownClass(cls):
+        super(SQLiteDBToPGTest, cls).tearDownClass()
+        cls.dir.cleanup()
+        
+    def test_reports(self):
+        self.assertEqual(list(self.reports), ['lite_files', 'lite_people'])
+        self.assertEqual(self.reports['lite_files'].rows, 20000)
+        
+    def test_col_types(self):
+        self.assertColumnTypes('lite_people', ['text', 'text',
+            'double precision', 'boolean', 'text'])
+        self.assertColumnTypes('lite_files', ['text', 'bytea'])
+        
+    def test_values(self):
+        self.cursor.execute('SELECT * FROM lite_people')
+        self.assertEqual(self.cursor.fetchall(), [
+            ('Ted, Jr.', '30', 1.5, True, '1'), ('', None, 2.0, False, 'text'),
+            (None, 'unknown', None, None, None)])
+            
+        self.cursor.execute("SELECT data FROM lite_files "
+            "WHERE name = 'file1'")
+        self.assertEqual(bytes(self.cursor.fetchone()[0]), b'\x01\xff')
+            
+class SQLiteIndexTest(PostgresTestCase):
+    ''' Test building primary keys and indexes after a migration '''
+    
+    drop_tables = ['lite_orders']
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.TemporaryDirectory()
+        cls.sqlite_db = os.path.join(cls.dir.name, 'test.db')
+        
+        with closing(sqlite3.connect(cls.sqlite_db)) as conn:
+            conn.execute('CREATE TABLE lite_orders (Customer TEXT, '
+                'id INTEGER, total REAL, code TEXT UNIQUE, '
+                'PRIMARY KEY (Customer, id))')
+            conn.execute('CREATE INDEX total_index ON lite_orders '
+                '(total DESC)')
+            conn.execute('CREATE INDEX total_asc ON lite_orders (total)')
+            conn.execute('CREATE INDEX lower_code ON lite_orders '
+                '(lower(code))')
+            conn.executemany('INSERT INTO lite_orders VALUES (?, ?, ?, ?)',
+                [('ted', i, i / 2, 'code{}'.format(i)) for i in range(100)])
+            conn.commit()
+            
+        with warnings.catch_warnings(record=True) as cls.warnings:
+            warnings.simplefilter('always')
+            cls.reports = pgreaper.sqlite_db_to_postgres(cls.sqlite_db,
+                dbname=TEST_DB)
+            
+    @classmethod
+    def tearDownClass(cls):
+        super(SQLiteIndexTest, cls).tearDownClass()
+        cls.dir.cleanup()
+        
+    def test_report(self):
+        report = self.reports['lite_orders']
+        self.assertEqual(report.rows, 100)
+        self.assertIn('index', report.timings)
+        
+    def test_p_key(self):
+        self.cursor.execute("SELECT a.attname FROM pg_index i JOIN "
+            "pg_attribute a ON a.attrelid = i.indrelid AND "
+            "a.attnum = ANY(i.indkey) WHERE i.indrelid = "
+            "'lite_orders'::regclass AND i.indisprimary ORDER BY a.attnum")
+        self.assertEqual([row[0] for row in self.cursor.fetchall()],
+            ['customer', 'id'])
+        
+    def test_indexes(self):
+        self.cursor.execute("SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE tablename = 'lite_orders' ORDER BY indexname")
+        indexes = dict(self.cursor.fetchall())
+        
+        self.assertIn('UNIQUE', indexes['lite_orders_code_key'])
+        self.assertEqual(len(indexes), 4)
+        
+        # Indexes on the same columns get different names
+        self.assertEqual(sorted('DESC' in indexes[i] for i in \
+            ['lite_orders_total_idx', 'lite_orders_total_idx1']), [False, True])
+        
+    def test_long_names(self):
+        names = to_postgres._index_names('t' * 60, [(['a'], False),
+            (['a'], False)], set())
+        self.assertEqual(names, ['t' * 59 + '_idx', 't' * 58 + '_idx1'])
+        
+    def test_skipped(self):
+        self.assertEqual(len(self.warnings), 1)
+        self.assertIn('lower_code', str(self.warnings[0].message))
+
+class SQLiteIndexNameTest(PostgresTestCase):
+    ''' Test that index names are unique across tables and re-runs '''
+    
+    drop_tables = ['lite_a', 'lite_a_b']
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.TemporaryDirectory()
+        cls.sqlite_db = os.path.join(cls.dir.name, 'test.db')
+        
+        # lite_a_b (c) and lite_a (b_c) both become lite_a_b_c_idx
+        with closing(sqlite3.connect(cls.sqlite_db)) as conn:
+            conn.execute('CREATE TABLE lite_a_b (c INTEGER)')
+            conn.execute('CREATE INDEX c_index ON lite_a_b (c)')
+            conn.execute('CREATE TABLE lite_a (b_c INTEGER)')
+            conn.execute('CREATE INDEX b_c_index ON lite_a (b_c)')
+            conn.executemany('INSERT INTO lite_a_b VALUES (?)',
+                [(i,) for i in range(10)])
+            conn.executemany('INSERT INTO lite_a VALUES (?)',
+                [(i,) for i in range(10)])
+            conn.commit()
+            
+        pgreaper.sqlite_db_to_postgres(cls.sqlite_db, dbname=TEST_DB)
+            
+    @classmethod
+    def tearDownClass(cls):
+        super(SQLiteIndexNameTest, cls).tearDownClass()
+        cls.dir.cleanup()
+        
+    def get_indexes(self):
+        self.cursor.execute("SELECT indexname FROM pg_indexes WHERE "
+            "tablename IN ('lite_a', 'lite_a_b') ORDER BY indexname")
+        return [row[0] for row in self.cursor.fetchall()]
+        
+    def test_clash(self):
+        self.assertEqual(self.get_indexes(),
+            ['lite_a_b_c_idx', 'lite_a_b_c_idx1'])
+            
+    def test_rerun(self):
+        ''' Indexes from an earlier run are kept, not duplicated '''
+        pgreaper.sqlite_db_to_postgres(self.sqlite_db, dbname=TEST_DB)
+        self.assertEqual(self.get_indexes(),
+            ['lite_a_b_c_idx', 'lite_a_b_c_idx1'])
+        self.assertCount('lite_a', 20)
             
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,6 @@
 ''' Test if ColumnList works '''
 
-from pgreaper._globals import PG_KEYWORDS
+from pgreaper._globals import PG_KEYWORDS, resolve_duplicate, strip
 from pgreaper.testing import *
 from pgreaper.core import ColumnList
 import pgreaper
@@ -37,6 +37,34 @@ class TestColumns(unittest.TestCase):
         with self.assertRaises(TypeError):
             self.columns1.p_key = set()       
             
+    def test_add_del_col(self):
+        ''' Test that indices stay in sync when columns change '''
+        self.columns1.add_col('Bush', 'bigint')
+        self.assertEqual(self.columns1.index('bush'), 2)
+        self.assertEqual(self.columns1.n_cols, 3)
+        
+        self.columns1.del_col(0)
+        self.assertEqual(self.columns1.col_names_lower, ['obama', 'bush'])
+        self.assertEqual(self.columns1.index('BUSH'), 1)
+        self.assertEqual(self.columns1.col_types, ['text', 'bigint'])
+        
+    def test_col_types_cache(self):
+        ''' Test that cached column types are updated '''
+        self.assertEqual(self.columns1.col_types, ['text', 'text'])
+        
+        self.columns1.p_key = 'obama'
+        self.assertEqual(self.columns1.col_types,
+            ['text', 'text primary key'])
+        
+        self.columns1.col_types = ['bigint', 'text']
+        self.assertEqual(self.columns1.col_types,
+            ['bigint', 'text primary key'])
+        self.assertEqual(self.columns1.col_types_no_pkey, ['bigint', 'text'])
+        
+        # Modifying the returned list doesn't affect the ColumnList
+        self.columns1.col_types.append('text')
+        self.assertEqual(len(self.columns1.col_types), 2)
+            
     #############################
     # "Mathematical Operations" #
     #############################
@@ -133,6 +161,32 @@ class TestSanitize(unittest.TestCase):
         ''' Test that trailing underscores were appended '''       
         self.assertEqual(self.data.col_names_sanitized,
             ['user_', 'table_', 'column_', 'check_', 'analyze_'])
+            
+    def test_strip(self):
+        self.assertEqual(strip(" 50% (Tom & Jerry's)  "),
+            '_50percent_Tom_and_Jerrys')
+        self.assertEqual(strip('a--b__c...'), 'a_b_c')
+        
+    def test_many_duplicates(self):
+        self.assertEqual(resolve_duplicate(['a'] * 3000)[-2:],
+            ['a_2998', 'a_2999'])
+        self.assertEqual(resolve_duplicate(['a', 'a_1', 'a', 'a']),
+            ['a', 'a_1', 'a_2', 'a_3'])
+            
+    def test_cache(self):
+        ''' Test that cached sanitized names are updated '''
+        columns = self.data.columns
+        self.assertEqual(columns.sanitize()[0], 'user')
+        
+        # Modifying the returned list doesn't affect the cache
+        columns.sanitize()[0] = 'modified'
+        self.assertEqual(columns.sanitize()[0], 'user')
+        
+        columns.add_col('User')
+        self.assertEqual(columns.sanitize()[-1], 'user_1')
+        
+        self.data.col_names = ['Country Name', 'a', 'b', 'c', 'd', 'e']
+        self.assertEqual(columns.sanitize()[0], 'country_name')
 
 #####################
 # Integration Tests #
@@ -170,6 +224,20 @@ class IntegrityTest(unittest.TestCase):
         new_table = self.table.reorder('Population', 'Year')
         self.assertEqual(new_table.col_types, ['bigint', 'bigint'])
         
+    def test_nulls(self):
+        ''' Test that missing values don't turn columns into text '''
+        self.table.dialect = 'postgres'
+        self.table.append(['Mexico City', 'Mexico', 'MXN', 'Mexican', None])
+        self.table.guess_type()
+        self.assertEqual(self.table.col_types[-1], 'bigint')
+        
+    def test_int_float(self):
+        ''' Test that integers and floats make a double precision column '''
+        self.table.dialect = 'postgres'
+        self.table.append(['Mexico City', 'Mexico', 'MXN', 'Mexican', 1.5])
+        self.table.guess_type()
+        self.assertEqual(self.table.col_types[-1], 'double precision')
+        
 class RenameTest(unittest.TestCase):
     ''' Test that column renaming doesn't affect type counter '''
     
@@ -0,0 +1,138 @@
+''' Tests for load timing reports and hooks '''
+
+from pgreaper.instrument import add_hook, remove_hook, copy_reader, \
+    CountingReader, LoadReport, ProgressBar, ProgressReader
+
+from io import BytesIO, StringIO
+import unittest
+
+class LoadReportTest(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.report = LoadReport('countries', hooks=[self.events.append])
+
+    def test_phases(self):
+        with self.report.phase('ddl'):
+            pass
+        with self.report.phase('copy') as counts:
+            counts.rows = 10
+            counts.bytes = 100
+        with self.report.phase('copy') as counts:
+            counts.rows = 5
+            counts.rejects = 1
+
+        self.assertEqual(list(self.report.timings), ['ddl', 'copy'])
+        self.assertEqual(self.report.counts['copy'], (15, 100, 1))
+        self.assertEqual((self.report.rows, self.report.bytes,
+            self.report.rejects), (15, 100, 1))
+        self.assertEqual(self.report.as_dict()['phases']['copy']['rows'], 15)
+        self.assertIn('copy', repr(self.report))
+
+    def test_events(self):
+        with self.report.phase('copy') as counts:
+            counts.rows = 3
+
+        start, end = self.events
+        self.assertEqual((start.kind, start.phase, start.table),
+            ('start', 'copy', 'countries'))
+        self.assertEqual((end.kind, end.rows), ('end', 3))
+        self.assertGreaterEqual(end.seconds, 0)
+
+    def test_error(self):
+        ''' Phases which raise are still recorded '''
+        with self.assertRaises(ValueError):
+            with self.report.phase('copy'):
+                raise ValueError
+
+        self.assertEqual(self.events[-1].kind, 'end')
+        self.assertIn('copy', self.report.timings)
+
+    def test_broken_hook(self):
+        def broken(event):
+            raise KeyError('harambe')
+
+        self.report.hooks.append(broken)
+        with self.assertWarns(UserWarning):
+            with self.report.phase('copy'):
+                pass
+
+    def test_global_hook(self):
+        events = []
+        add_hook(events.append)
+
+        try:
+            with LoadReport('countries').phase('commit'):
+                pass
+        finally:
+            remove_hook(events.append)
+
+        self.assertEqual([i.kind for i in events], ['start', 'end'])
+
+    def test_update(self):
+        other = LoadReport('countries')
+        with other.phase('upsert') as counts:
+            counts.rows = 2
+
+        self.report.update(other)
+        self.assertEqual(self.report.rows, 2)
+        self.assertIn('upsert', self.report.timings)
+
+class CountingReaderTest(unittest.TestCase):
+    def test_count(self):
+        reader = CountingReader(StringIO('abc\ndef\n'))
+        reader.readline()
+        reader.read(2)
+        reader.read()
+        self.assertEqual(reader.bytes, 8)
+
+class ProgressTest(unittest.TestCase):
+    def test_callback(self):
+        updates = []
+        reader = ProgressReader(StringIO('a,b\n' * 1000), updates.append,
+            total_rows=1000, interval=0)
+
+        while reader.read(100):
+            pass
+
+        self.assertEqual(updates[0].rows, 25)
+        self.assertEqual(updates[0].bytes, 100)
+        self.assertFalse(updates[0].done)
+
+        last = updates[-1]
+        self.assertTrue(last.done)
+        self.assertEqual((last.rows, last.bytes, last.eta), (1000, 4000, 0))
+
+        # Only one final update
+        reader.read(100)
+        self.assertIs(updates[-1], last)
+
+    def test_eta(self):
+        reader = ProgressReader(StringIO('abcd'), lambda p: None,
+            total_bytes=4)
+        reader.read(2)
+        progress = reader.progress()
+        self.assertAlmostEqual(progress.eta, progress.seconds, places=3)
+
+    def test_bytes(self):
+        updates = []
+        reader = ProgressReader(BytesIO(b'1\n2\n'), updates.append)
+        reader.read()
+        reader.read()
+        self.assertEqual(updates[-1].rows, 2)
+
+    def test_progress_bar(self):
+        output = StringIO()
+        reader = copy_reader(StringIO('x\n' * 10), ProgressBar('test',
+            file=output), total_rows=10)
+        reader.read()
+        reader.read()
+
+        self.assertIn('test [', output.getvalue())
+        self.assertIn('100.0%', output.getvalue())
+        self.assertTrue(output.getvalue().endswith('\n'))
+
+    def test_no_progress(self):
+        self.assertIs(type(copy_reader(StringIO())), CountingReader)
+
+if __name__ == '__main__':
+    unittest.main()
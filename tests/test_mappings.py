@@ -18,6 +18,9 @@ class CaseInsensitiveDictTest(unittest.TestCase):
         with self.assertRaises(KeyError):
             self.d['hello']
             
+    def test_contains(self):
+        self.assertIn('WORLD', self.d)
+            
 class SymmetricIndexTest(unittest.TestCase):
     def setUp(self):
         self.distances = SymmetricIndex()
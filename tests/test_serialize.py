@@ -0,0 +1,73 @@
+''' Tests for the CSV serializer used by Table.to_string() '''
+
+from pgreaper.testing import *
+from pgreaper.core.serialize import to_csv
+
+import csv
+import datetime
+from io import StringIO
+
+class ToCSVTest(unittest.TestCase):
+    def test_numbers(self):
+        self.assertEqual(to_csv([[1, 2.5, -3]],
+            ['bigint', 'double precision', 'integer']), '1,2.5,-3\n')
+
+    def test_special_floats(self):
+        self.assertEqual(to_csv([[float('inf'), float('-inf'), float('nan')]],
+            ['double precision'] * 3), 'Infinity,-Infinity,nan\n')
+
+    def test_quoting(self):
+        ''' Only fields with delimiters, quotes or line breaks are quoted '''
+        row = ['plain', 'a,b', 'say "hi"', 'line\nbreak', '\\.']
+        output = to_csv([row], ['text'] * 5)
+        self.assertEqual(output,
+            'plain,"a,b","say ""hi""","line\nbreak","\\."\n')
+        self.assertEqual(next(csv.reader(StringIO(output))), row)
+
+    def test_null(self):
+        ''' Like csv.writer, None and empty strings are NULL '''
+        self.assertEqual(to_csv([[None, '', '']], ['text', 'text', 'bigint']),
+            ',,\n')
+
+    def test_strict_null(self):
+        ''' Only None is NULL, empty strings in text columns are not '''
+        self.assertEqual(to_csv([[None, '', '']], ['text', 'text', 'bigint'],
+            strict_null=True), ',"",\n')
+
+    def test_jsonb(self):
+        ''' None in jsonb columns is a JSON null '''
+        data = {'name': 'Ted', 'tags': ['a', 'b']}
+        output = to_csv([[data, None]], ['jsonb', 'jsonb'])
+        self.assertEqual(output,
+            '"{""name"": ""Ted"", ""tags"": [""a"", ""b""]}","null"\n')
+
+    def test_jsonb_strict_null(self):
+        output = to_csv([[{'a': 1}, None]], ['jsonb', 'jsonb'],
+            strict_null=True)
+        self.assertEqual(output, '"{""a"": 1}",\n')
+
+    def test_timestamp(self):
+        self.assertEqual(to_csv([[datetime.datetime(2017, 1, 2, 3, 4, 5),
+            datetime.date(2017, 1, 2)]], ['timestamp', 'date']),
+            '2017-01-02 03:04:05,2017-01-02\n')
+
+    def test_bytea(self):
+        self.assertEqual(to_csv([[b'\x00\xff', b'']], ['bytea', 'bytea']),
+            '\\x00ff,\\x\n')
+
+    def test_slice(self):
+        rows = [[i] for i in range(5)]
+        self.assertEqual(to_csv(rows, ['bigint'], 1, 3), '1\n2\n')
+        self.assertEqual(to_csv(rows, ['bigint'], 4, 10), '4\n')
+        self.assertEqual(to_csv(rows, ['bigint'], 5), '')
+
+    def test_no_mutation(self):
+        table = Table('serialize_test', col_names=['data', 'joined'],
+            col_types=['jsonb', 'timestamp'],
+            row_values=[[{'a': 1}, datetime.datetime(2017, 1, 1)]])
+        table.to_string()
+        self.assertEqual(table[0],
+            [{'a': 1}, datetime.datetime(2017, 1, 1)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -57,6 +57,22 @@ class TableTest(unittest.TestCase):
         table = world_countries_table()
         table[1:3]
         
+    def test_copy(self):
+        ''' Test that changing a copy doesn't change the original '''
+        table = world_countries_table()
+        table.p_key = 'Country'
+        table._create_pk_index()
+        new_table = table.copy()
+        
+        new_table[0][0] = 'Washington, D.C.'
+        new_table.col_names = ['a', 'b', 'c', 'd', 'e']
+        new_table.append(world_countries()[0])
+        
+        self.assertEqual(table, world_countries())
+        self.assertEqual(table.col_names, world_countries_cols())
+        self.assertEqual(new_table.col_types, table.col_types)
+        self.assertEqual(new_table['Russia', ], world_countries()[1])
+        
 class ColumnIndexTest(unittest.TestCase):
     ''' Test that column name error handling works '''
     
@@ -130,6 +146,29 @@ class AppendTest(unittest.TestCase):
         # Test that extra "GDP" column was added
         self.assertEqual(table['GDP'], [None, None, None, "$23.2 trillion"])
         
+    def test_mixed_shapes(self):
+        ''' Dicts with different keys, key orders, and key cases '''
+        table = pgreaper.Table(name=None)
+        table.add_dicts([
+            {'a': 1, 'b': 2},
+            {'B': 3, 'A': 4},
+            {'c': 5},
+            {'a': 6, 'b': 7}])
+            
+        # New columns are added in the order they're first seen
+        self.assertEqual(table.col_names, ['a', 'b', 'c'])
+        self.assertEqual(list(table),
+            [[1, 2, None], [4, 3, None], [None, None, 5], [6, 7, None]])
+            
+    def test_extract_nested(self):
+        table = pgreaper.Table(name=None)
+        table.add_dicts([
+            {'id': 1, 'user': {'name': 'Ted'}},
+            {'id': 2, 'user': {}}],
+            extract={'user_name': ['user', 'name']})
+            
+        self.assertEqual(table['user_name'], ['Ted', None])
+        
 class TransformTest(unittest.TestCase):
     ''' Test if functions for transforming tables work properly '''
     